@@ -6,29 +6,25 @@ Handles LLM interactions for program generation
 import os
 import json
 from typing import Dict, List, Optional
-from openai import OpenAI
 from datetime import datetime
 
+try:
+    from ai_coach_service.openai_pool import get_sync_client
+except ImportError:
+    from .openai_pool import get_sync_client
+
 
 class AICoachClient:
     """Client for interacting with OpenAI API"""
 
     def __init__(self):
         """
-        Initialize OpenAI client
+        Initialize OpenAI client (shared, pooled - see openai_pool)
 
         Requires environment variable:
         - OPENAI_API_KEY: Your OpenAI API key
         """
-        api_key = os.environ.get("OPENAI_API_KEY")
-
-        if not api_key:
-            raise ValueError(
-                "OPENAI_API_KEY environment variable is required. "
-                "Set it in your .env file."
-            )
-
-        self.client = OpenAI(api_key=api_key)
+        self.client = get_sync_client()
         # Use GPT-4 Turbo for best quality, or gpt-3.5-turbo for faster/cheaper
         self.model = "gpt-4-turbo-preview"  # or "gpt-3.5-turbo"
 
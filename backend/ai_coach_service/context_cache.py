@@ -0,0 +1,194 @@
+"""
+Per-user Context Snapshot Cache for AI Coach chat
+Keeps each user's loaded context sections (and the rendered system prompt)
+between chat messages, so follow-up messages skip the context queries.
+
+Sections are grouped into scopes that are invalidated independently:
+- profile    profile, PRs              (POST /context/invalidate on profile edits)
+- workouts   user workout templates    (save-workout, app template saves)
+- nutrition  goal, today, weekly, anabolic window (also a short TTL - meals
+             are logged from the app without telling the backend)
+
+Invalidating a scope bumps its data version; only the sections of stale
+scopes are reloaded on the next message. A load that races with an
+invalidation is stored under the old version and is reloaded again.
+Shared sections (exercise catalog, public templates) live in shared_cache.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+
+SECTION_SCOPES = {
+    "profile": "profile",
+    "prs": "profile",
+    "workouts": "workouts",
+    "nutrition_goal": "nutrition",
+    "nutrition_today": "nutrition",
+    "nutrition_weekly": "nutrition",
+    "anabolic_window": "nutrition",
+}
+
+SCOPE_TTL_S = {
+    "profile": float(os.environ.get("AI_COACH_PROFILE_CONTEXT_TTL_S", "1800")),
+    "workouts": float(os.environ.get("AI_COACH_WORKOUT_CONTEXT_TTL_S", "1800")),
+    "nutrition": float(os.environ.get("AI_COACH_NUTRITION_CONTEXT_TTL_S", "120")),
+}
+
+MAX_USERS = int(os.environ.get("AI_COACH_CONTEXT_CACHE_USERS", "1000"))
+
+
+class _Snapshot:
+    __slots__ = ("sections", "loaded", "prompt")
+
+    def __init__(self):
+        self.sections: Dict[str, Any] = {}
+        self.loaded: Dict[str, tuple] = {}  # scope -> (version, loaded_at)
+        self.prompt: Optional[tuple] = None  # (prompt, shared sections it was rendered from)
+
+
+class UserContextCache:
+    """LRU of per-user context snapshots with scoped versioning"""
+
+    def __init__(self, max_users: int = MAX_USERS):
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._snapshots: "OrderedDict[str, _Snapshot]" = OrderedDict()
+        self._versions: Dict[str, Dict[str, int]] = {}
+
+        # Metrics
+        self.section_hits = 0
+        self.section_loads = 0
+        self.prompt_hits = 0
+        self.invalidations = 0
+
+    def _version(self, user_id: str, scope: str) -> int:
+        return self._versions.get(user_id, {}).get(scope, 0)
+
+    def versions(self, user_id: str) -> Dict[str, int]:
+        """Current data version per scope (capture BEFORE loading)"""
+        with self._lock:
+            return {scope: self._version(user_id, scope) for scope in SCOPE_TTL_S}
+
+    def get_sections(self, user_id: str) -> Dict[str, Any]:
+        """
+        Fresh cached sections for a user.
+
+        Returns:
+            section -> value for every section whose scope is still valid
+        """
+        now = time.monotonic()
+        with self._lock:
+            snapshot = self._snapshots.get(user_id)
+            if snapshot is None:
+                return {}
+            self._snapshots.move_to_end(user_id)
+
+            fresh_scopes = {
+                scope for scope, (version, loaded_at) in snapshot.loaded.items()
+                if version == self._version(user_id, scope) and now - loaded_at < SCOPE_TTL_S[scope]
+            }
+            fresh = {
+                name: value for name, value in snapshot.sections.items()
+                if SECTION_SCOPES[name] in fresh_scopes
+            }
+            self.section_hits += len(fresh)
+            return fresh
+
+    def store_sections(self, user_id: str, values: Dict[str, Any], versions: Dict[str, int]):
+        """
+        Store freshly loaded sections.
+
+        Only complete scopes are stored (a scope with a skipped section stays
+        stale). Any stored change drops the cached prompt.
+        """
+        now = time.monotonic()
+        with self._lock:
+            snapshot = self._snapshots.get(user_id)
+            if snapshot is None:
+                snapshot = self._snapshots[user_id] = _Snapshot()
+                while len(self._snapshots) > self.max_users:
+                    evicted, _ = self._snapshots.popitem(last=False)
+                    self._versions.pop(evicted, None)
+            self._snapshots.move_to_end(user_id)
+
+            for scope in SCOPE_TTL_S:
+                names = [name for name, s in SECTION_SCOPES.items() if s == scope]
+                if not all(name in values for name in names):
+                    continue
+                for name in names:
+                    snapshot.sections[name] = values[name]
+                snapshot.loaded[scope] = (versions.get(scope, 0), now)
+                snapshot.prompt = None
+                self.section_loads += len(names)
+
+    def get_prompt(self, user_id: str, shared_sections: Iterable[Any]) -> Optional[str]:
+        """Cached system prompt, if no section changed since it was rendered"""
+        with self._lock:
+            snapshot = self._snapshots.get(user_id)
+            if snapshot is None or snapshot.prompt is None:
+                return None
+            prompt, rendered_from = snapshot.prompt
+            # Shared cache entries keep their identity until they expire; the
+            # sources are kept referenced so their ids can't be reused
+            shared_sections = tuple(shared_sections)
+            if len(rendered_from) != len(shared_sections) or \
+                    not all(a is b for a, b in zip(rendered_from, shared_sections)):
+                return None
+            self.prompt_hits += 1
+            return prompt
+
+    def store_prompt(self, user_id: str, prompt: str, shared_sections: Iterable[Any]):
+        with self._lock:
+            snapshot = self._snapshots.get(user_id)
+            if snapshot is not None:
+                snapshot.prompt = (prompt, tuple(shared_sections))
+
+    def invalidate(self, user_id: str, scopes: Optional[List[str]] = None) -> List[str]:
+        """
+        Mark scopes of a user stale (all scopes if None).
+
+        Returns:
+            The invalidated scopes
+        """
+        targets = [s for s in (scopes or list(SCOPE_TTL_S)) if s in SCOPE_TTL_S]
+        with self._lock:
+            if len(self._versions) > 2 * self.max_users:
+                # Versions only matter for cached users (and loads in flight)
+                self._versions = {
+                    uid: v for uid, v in self._versions.items() if uid in self._snapshots
+                }
+            user_versions = self._versions.setdefault(user_id, {})
+            for scope in targets:
+                user_versions[scope] = user_versions.get(scope, 0) + 1
+            snapshot = self._snapshots.get(user_id)
+            if snapshot is not None and targets:
+                snapshot.prompt = None
+            self.invalidations += 1
+        return targets
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "users": len(self._snapshots),
+                "max_users": self.max_users,
+                "scope_ttl_seconds": SCOPE_TTL_S,
+                "section_hits": self.section_hits,
+                "section_loads": self.section_loads,
+                "prompt_hits": self.prompt_hits,
+                "invalidations": self.invalidations
+            }
+
+
+_user_context_cache: Optional[UserContextCache] = None
+
+
+def get_user_context_cache() -> UserContextCache:
+    """Process-wide user context cache"""
+    global _user_context_cache
+    if _user_context_cache is None:
+        _user_context_cache = UserContextCache()
+    return _user_context_cache
@@ -183,6 +183,97 @@ class ConversationManager:
             print(f"❌ Error getting recent messages: {str(e)}")
             return []
 
+    def get_history_window(
+        self,
+        conversation_id: str,
+        limit: int = 200
+    ) -> Optional[Dict]:
+        """
+        Get the rolling summary and the messages not yet folded into it
+
+        Args:
+            conversation_id: UUID of the conversation
+            limit: Max number of unsummarized messages (most recent)
+
+        Returns:
+            Dict with summary, summary_until, summary_message_count and
+            messages (oldest first), or None if the summary columns are
+            missing (ai_coach_summary_migration.sql not applied)
+        """
+        try:
+            conv_result = self.client.table("ai_coach_conversations")\
+                .select("summary, summary_until, summary_message_count")\
+                .eq("id", conversation_id)\
+                .limit(1)\
+                .execute()
+
+            conv = conv_result.data[0] if conv_result.data else {}
+            summary_until = conv.get("summary_until")
+
+            query = self.client.table("ai_coach_messages")\
+                .select("role, content, created_at")\
+                .eq("conversation_id", conversation_id)
+            if summary_until:
+                query = query.gt("created_at", summary_until)
+
+            result = query.order("created_at", desc=True)\
+                .limit(limit)\
+                .execute()
+
+            return {
+                "summary": conv.get("summary"),
+                "summary_until": summary_until,
+                "summary_message_count": conv.get("summary_message_count") or 0,
+                "messages": list(reversed(result.data or []))
+            }
+
+        except Exception as e:
+            print(f"❌ Error getting history window: {str(e)}")
+            return None
+
+    def update_summary(
+        self,
+        conversation_id: str,
+        summary: str,
+        summary_until: str,
+        summary_message_count: int,
+        previous_until: Optional[str]
+    ) -> bool:
+        """
+        Store a new rolling summary (only if nobody else moved it meanwhile)
+
+        Args:
+            conversation_id: UUID of the conversation
+            summary: Updated summary text
+            summary_until: created_at of the last message folded into it
+            summary_message_count: Total messages covered by the summary
+            previous_until: summary_until the update was computed from
+
+        Returns:
+            True if the summary was stored
+        """
+        try:
+            query = self.client.table("ai_coach_conversations")\
+                .update({
+                    "summary": summary,
+                    "summary_until": summary_until,
+                    "summary_message_count": summary_message_count,
+                    "summary_updated_at": datetime.utcnow().isoformat()
+                })\
+                .eq("id", conversation_id)
+
+            if previous_until:
+                query = query.eq("summary_until", previous_until)
+            else:
+                query = query.is_("summary_until", "null")
+
+            result = query.execute()
+            return bool(result.data)
+
+        except Exception as e:
+            print(f"❌ Error updating summary: {str(e)}")
+            return False
+
     def get_user_conversations(
         self,
         user_id: str,
@@ -200,6 +291,46 @@ class ConversationManager:
         Returns:
             List of conversation dicts with metadata
         """
+        try:
+            # message_count / last_message* are maintained by triggers
+            # (ai_coach_conversation_stats_migration.sql): one round-trip
+            query = self.client.table("ai_coach_conversations")\
+                .select("id, title, message_count, last_message, last_message_role, "
+                        "created_at, updated_at, archived")\
+                .eq("user_id", user_id)
+
+            if not include_archived:
+                query = query.eq("archived", False)
+
+            result = query.order("updated_at", desc=True)\
+                .limit(limit)\
+                .execute()
+
+        except Exception as e:
+            print(f"⚠️ Conversation stats columns unavailable, using per-conversation queries: {str(e)}")
+            return self._get_user_conversations_legacy(user_id, include_archived, limit)
+
+        return [
+            {
+                "id": conv["id"],
+                "title": conv.get("title") or "New Conversation",
+                "message_count": conv.get("message_count") or 0,
+                "last_message": conv.get("last_message"),
+                "last_message_role": conv.get("last_message_role"),
+                "created_at": conv["created_at"],
+                "updated_at": conv["updated_at"],
+                "archived": conv["archived"]
+            }
+            for conv in result.data or []
+        ]
+
+    def _get_user_conversations_legacy(
+        self,
+        user_id: str,
+        include_archived: bool,
+        limit: int
+    ) -> List[Dict]:
+        """get_user_conversations before the stats migration (queries per conversation)"""
         try:
             query = self.client.table("ai_coach_conversations")\
                 .select("*")\
@@ -7,6 +7,40 @@ import os
 from typing import List, Dict, Optional
 from supabase import create_client, Client
 
+try:
+    from ai_coach_service.shared_cache import exercise_catalog_cache
+except ImportError:
+    from .shared_cache import exercise_catalog_cache
+
+
+# exercises_new holds ~800 rows; load the whole catalog once per TTL
+CATALOG_LIMIT = 5000
+CATALOG_COLUMNS = 'id, name, category, equipment, notes'
+
+
+def get_exercise_catalog(client: Client) -> List[Dict]:
+    """Full exercises_new catalog (shared cache, one Supabase query per TTL)"""
+    def load() -> List[Dict]:
+        response = client.table('exercises_new')\
+            .select(CATALOG_COLUMNS)\
+            .limit(CATALOG_LIMIT)\
+            .execute()
+        print(f"📚 Loaded exercise catalog: {len(response.data or [])} exercises")
+        return response.data or []
+
+    return exercise_catalog_cache.get_or_load("catalog", load)
+
+
+def get_category_index(client: Client) -> Dict[str, List[Dict]]:
+    """Catalog grouped by lower-cased category (cached alongside the catalog)"""
+    def build() -> Dict[str, List[Dict]]:
+        index: Dict[str, List[Dict]] = {}
+        for ex in get_exercise_catalog(client):
+            index.setdefault((ex.get('category') or 'other').lower(), []).append(ex)
+        return index
+
+    return exercise_catalog_cache.get_or_load("category_index", build)
+
 
 class ExerciseDatabase:
     """Query and filter exercises from Supabase exercises_new table"""
@@ -41,38 +75,27 @@ class ExerciseDatabase:
             List of exercise dictionaries with id, name, equipment, muscle_group
         """
         try:
-            print(f"📚 Querying exercises from Supabase...")
-
-            # Build query
-            query = self.client.table('exercises_new').select(
-                'id, name, category, equipment, notes'
-            )
-
-            # Apply filters if provided
-            # Note: Supabase filtering on array fields is tricky, so we fetch all
-            # and filter in Python for better flexibility
-
-            response = query.limit(limit).execute()
+            # Note: Supabase filtering on array fields is tricky, so we filter
+            # the cached catalog in Python for better flexibility
+            if muscle_groups:
+                index = get_category_index(self.client)
+                exercises = [
+                    ex for mg in dict.fromkeys(mg.lower() for mg in muscle_groups)
+                    for ex in index.get(mg, [])
+                ]
+            else:
+                exercises = get_exercise_catalog(self.client)
 
-            if not response.data:
+            if not exercises:
                 print("⚠️ No exercises found")
                 return []
 
-            exercises = response.data
-
-            # Post-query filtering
             if equipment:
                 exercises = [
                     ex for ex in exercises
                     if any(eq.lower() in str(ex.get('equipment') or '').lower() for eq in equipment)
                 ]
 
-            if muscle_groups:
-                exercises = [
-                    ex for ex in exercises
-                    if (ex.get('category') or '').lower() in [mg.lower() for mg in muscle_groups]
-                ]
-
             # Note: 'level' column doesn't exist in current schema
             # Skip difficulty filtering for now
             # if difficulty:
@@ -81,6 +104,7 @@ class ExerciseDatabase:
             #         if (ex.get('level') or '').lower() in [d.lower() for d in difficulty]
             #     ]
 
+            exercises = exercises[:limit]
             print(f"✅ Found {len(exercises)} exercises matching criteria")
             return exercises
 
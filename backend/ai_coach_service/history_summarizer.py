@@ -0,0 +1,166 @@
+"""
+Rolling Conversation Summaries for AI Coach chat
+Keeps the per-turn history sent to OpenAI flat: recent messages are sent
+verbatim up to a token threshold; once the unsummarized history grows past
+it, the older turns are folded into a summary stored on the conversation
+row (ai_coach_conversations.summary, see ai_coach_summary_migration.sql).
+
+Folding runs in the background after the response is sent, so it never
+adds latency to a turn. Each fold only summarizes the new messages on top
+of the previous summary (incremental), and stores it with an optimistic
+check on summary_until so concurrent workers can't overwrite each other.
+
+Config (environment):
+    AI_COACH_HISTORY_TOKEN_THRESHOLD  verbatim history budget      (default 2000)
+    AI_COACH_HISTORY_KEEP_TOKENS      kept verbatim after a fold   (default 1000)
+    AI_COACH_SUMMARY_MODEL            summarization model          (default gpt-4o-mini)
+"""
+
+import asyncio
+import os
+from typing import Dict, List, Optional, Set
+
+try:
+    from ai_coach_service.openai_pool import chat_completion
+    from ai_coach_service.prompt_builder import count_tokens
+except ImportError:
+    from .openai_pool import chat_completion
+    from .prompt_builder import count_tokens
+
+
+HISTORY_TOKEN_THRESHOLD = int(os.environ.get("AI_COACH_HISTORY_TOKEN_THRESHOLD", "2000"))
+HISTORY_KEEP_TOKENS = int(os.environ.get("AI_COACH_HISTORY_KEEP_TOKENS", "1000"))
+SUMMARY_MODEL = os.environ.get("AI_COACH_SUMMARY_MODEL", "gpt-4o-mini")
+SUMMARY_MAX_TOKENS = 500
+
+MIN_RECENT_MESSAGES = 4  # Always sent verbatim, even if over the threshold
+MAX_FOLD_MESSAGES = 60  # Per summarization call; the rest is folded next turn
+MESSAGE_OVERHEAD_TOKENS = 4  # Role / separators per chat message
+
+SUMMARY_INSTRUCTIONS = """You maintain a running summary of a coaching chat between an athlete and their AI coach.
+Update the existing summary with the new messages. Keep facts the coach needs later:
+the athlete's goals, symptoms, injuries, preferences, plans and workouts discussed,
+advice given and open questions. Drop greetings and small talk.
+Write compact plain text in the language of the conversation, at most 250 words."""
+
+
+def _message_tokens(message: Dict) -> int:
+    return count_tokens(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+
+
+def _recent_start(tokens: List[int], budget: int) -> int:
+    """Index of the oldest message in the newest run that fits budget"""
+    used = 0
+    start = len(tokens)
+    for index in range(len(tokens) - 1, -1, -1):
+        if used + tokens[index] > budget and len(tokens) - index > MIN_RECENT_MESSAGES:
+            break
+        used += tokens[index]
+        start = index
+    return start
+
+
+def load_history(conv_manager, conversation_id: str) -> Dict:
+    """
+    History for the next turn
+
+    Args:
+        conv_manager: ConversationManager
+        conversation_id: UUID of the conversation
+
+    Returns:
+        Dict with summary (or None), messages [{role, content}] to send
+        verbatim (oldest first) and fold (pass to schedule_summary; None
+        if nothing needs summarizing)
+    """
+    window = conv_manager.get_history_window(conversation_id)
+    if window is None:
+        # Summary columns missing - previous behaviour
+        recent = conv_manager.get_recent_messages(conversation_id, count=20)
+        return {"summary": None, "messages": recent, "fold": None}
+
+    messages = window["messages"]
+    tokens = [_message_tokens(message) for message in messages]
+
+    send_from = _recent_start(tokens, HISTORY_TOKEN_THRESHOLD)
+
+    fold = None
+    if sum(tokens) > HISTORY_TOKEN_THRESHOLD:
+        keep_from = _recent_start(tokens, HISTORY_KEEP_TOKENS)
+        to_fold = messages[:keep_from][:MAX_FOLD_MESSAGES]
+        if to_fold:
+            fold = {
+                "conversation_id": conversation_id,
+                "summary": window["summary"],
+                "summary_until": window["summary_until"],
+                "summary_message_count": window["summary_message_count"],
+                "messages": to_fold
+            }
+
+    return {
+        "summary": window["summary"],
+        "messages": [
+            {"role": message["role"], "content": message["content"]}
+            for message in messages[send_from:]
+        ],
+        "fold": fold
+    }
+
+
+# ═══════════════════════════════════════════════════════════════
+# BACKGROUND SUMMARIZATION
+# ═══════════════════════════════════════════════════════════════
+
+_inflight: Set[str] = set()
+_tasks: Set[asyncio.Task] = set()
+
+
+def schedule_summary(conv_manager, fold: Optional[Dict]):
+    """Fold older messages into the summary in the background (one task per conversation)"""
+    if not fold or fold["conversation_id"] in _inflight:
+        return
+    _inflight.add(fold["conversation_id"])
+    task = asyncio.get_running_loop().create_task(_summarize(conv_manager, fold))
+    _tasks.add(task)  # Keep a reference until done
+    task.add_done_callback(_tasks.discard)
+
+
+async def _summarize(conv_manager, fold: Dict):
+    conversation_id = fold["conversation_id"]
+    messages = fold["messages"]
+    try:
+        transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+        response = await chat_completion(
+            "history_summary",
+            model=SUMMARY_MODEL,
+            messages=[
+                {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+                {
+                    "role": "user",
+                    "content": f"Current summary:\n{fold['summary'] or '(none)'}\n\nNew messages:\n{transcript}"
+                }
+            ],
+            max_tokens=SUMMARY_MAX_TOKENS,
+            temperature=0.2
+        )
+        summary = (response.choices[0].message.content or "").strip()
+        if not summary:
+            return
+
+        stored = await asyncio.to_thread(
+            conv_manager.update_summary,
+            conversation_id,
+            summary,
+            messages[-1]["created_at"],
+            fold["summary_message_count"] + len(messages),
+            fold["summary_until"]
+        )
+        if stored:
+            print(f"📝 Summarized {len(messages)} messages of conversation {conversation_id}")
+        else:
+            print(f"ℹ️ Summary of conversation {conversation_id} changed meanwhile, skipped")
+
+    except Exception as e:
+        print(f"⚠️ Error summarizing conversation {conversation_id}: {str(e)}")
+    finally:
+        _inflight.discard(conversation_id)
@@ -0,0 +1,345 @@
+"""
+Shared OpenAI Client Pool for AI Coach
+One process-wide AsyncOpenAI client (pooled keep-alive HTTP connections)
+for the async endpoints, plus a shared sync client for the remaining
+blocking code paths (program generation).
+
+Every async call goes through:
+- a global semaphore (concurrent requests in flight)
+- a token-bucket rate limiter (requests per minute of our API tier)
+- retries with exponential backoff + full jitter on 429 / 5xx / connection
+  errors (Retry-After is honoured when OpenAI sends it)
+- per-endpoint latency and token metrics (GET /api/v1/ai-coach/openai/stats)
+
+Config (environment):
+    OPENAI_MAX_CONCURRENCY      concurrent requests           (default 16)
+    OPENAI_REQUESTS_PER_MINUTE  rate limit, 0 disables        (default 500)
+    OPENAI_MAX_RETRIES          retries per call              (default 3)
+    OPENAI_TIMEOUT_S            request timeout               (default 60)
+    OPENAI_MAX_CONNECTIONS      HTTP connection pool size     (default 32)
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+from openai import (
+    APIConnectionError,
+    APIStatusError,
+    AsyncOpenAI,
+    OpenAI,
+    RateLimitError,
+)
+
+
+MAX_CONCURRENCY = int(os.environ.get("OPENAI_MAX_CONCURRENCY", "16"))
+REQUESTS_PER_MINUTE = float(os.environ.get("OPENAI_REQUESTS_PER_MINUTE", "500"))
+MAX_RETRIES = int(os.environ.get("OPENAI_MAX_RETRIES", "3"))
+TIMEOUT_S = float(os.environ.get("OPENAI_TIMEOUT_S", "60"))
+MAX_CONNECTIONS = int(os.environ.get("OPENAI_MAX_CONNECTIONS", "32"))
+
+BACKOFF_BASE_S = 0.5
+BACKOFF_MAX_S = 20.0
+
+
+def _api_key() -> str:
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError(
+            "OPENAI_API_KEY environment variable is required. "
+            "Set it in your .env file."
+        )
+    return api_key
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_CONNECTIONS,
+        keepalive_expiry=60.0
+    )
+
+
+# ═══════════════════════════════════════════════════════════════
+# CLIENTS
+# ═══════════════════════════════════════════════════════════════
+
+_async_client: Optional[AsyncOpenAI] = None
+_sync_client: Optional[OpenAI] = None
+_sync_lock = threading.Lock()
+
+
+def get_async_client() -> AsyncOpenAI:
+    """Process-wide AsyncOpenAI client (retries are done by chat_completion)"""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOpenAI(
+            api_key=_api_key(),
+            max_retries=0,
+            timeout=TIMEOUT_S,
+            http_client=httpx.AsyncClient(limits=_http_limits(), timeout=TIMEOUT_S)
+        )
+    return _async_client
+
+
+def get_sync_client() -> OpenAI:
+    """Process-wide sync OpenAI client for blocking code paths"""
+    global _sync_client
+    with _sync_lock:
+        if _sync_client is None:
+            _sync_client = OpenAI(
+                api_key=_api_key(),
+                max_retries=MAX_RETRIES,
+                timeout=TIMEOUT_S,
+                http_client=httpx.Client(limits=_http_limits(), timeout=TIMEOUT_S)
+            )
+    return _sync_client
+
+
+async def close_clients():
+    """Close pooled connections (app shutdown)"""
+    global _async_client, _sync_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+    with _sync_lock:
+        if _sync_client is not None:
+            _sync_client.close()
+            _sync_client = None
+
+
+# ═══════════════════════════════════════════════════════════════
+# CONCURRENCY + RATE LIMIT
+# ═══════════════════════════════════════════════════════════════
+
+class _TokenBucket:
+    """Async token bucket: rate_per_minute requests, bursts up to capacity"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or max(1.0, min(rate_per_minute / 6.0, float(MAX_CONCURRENCY)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        """Take one token, sleeping until one is available. Returns time waited (s)"""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+
+_semaphore: Optional[asyncio.Semaphore] = None
+_bucket: Optional[_TokenBucket] = None
+
+
+def _limits():
+    global _semaphore, _bucket
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+        _bucket = _TokenBucket(REQUESTS_PER_MINUTE)
+    return _semaphore, _bucket
+
+
+# ═══════════════════════════════════════════════════════════════
+# METRICS
+# ═══════════════════════════════════════════════════════════════
+
+class _EndpointMetrics:
+    """Latency window (last 512 calls) and token totals of one endpoint"""
+
+    def __init__(self):
+        self.latencies_ms = deque(maxlen=512)
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.rate_limit_wait_ms = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def record(self, latency_ms: float, usage: Any):
+        self.calls += 1
+        self.latencies_ms.append(latency_ms)
+        if usage is not None:
+            self.prompt_tokens += usage.prompt_tokens or 0
+            self.completion_tokens += usage.completion_tokens or 0
+
+    def stats(self) -> Dict:
+        ordered = sorted(self.latencies_ms)
+
+        def percentile(p: float) -> Optional[float]:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 1)
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "rate_limit_wait_ms": round(self.rate_limit_wait_ms, 1),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens
+        }
+
+
+_metrics: Dict[str, _EndpointMetrics] = {}
+_in_flight = 0
+
+
+def _endpoint_metrics(endpoint: str) -> _EndpointMetrics:
+    metrics = _metrics.get(endpoint)
+    if metrics is None:
+        metrics = _metrics[endpoint] = _EndpointMetrics()
+    return metrics
+
+
+def openai_stats() -> Dict:
+    return {
+        "max_concurrency": MAX_CONCURRENCY,
+        "requests_per_minute": REQUESTS_PER_MINUTE,
+        "in_flight": _in_flight,
+        "endpoints": {name: metrics.stats() for name, metrics in _metrics.items()}
+    }
+
+
+# ═══════════════════════════════════════════════════════════════
+# CALLS
+# ═══════════════════════════════════════════════════════════════
+
+def _retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """Backoff before the next attempt, or None if the error is not retryable"""
+    if isinstance(error, APIStatusError):
+        if not (isinstance(error, RateLimitError) or error.status_code >= 500):
+            return None
+        retry_after = error.response.headers.get("retry-after") if error.response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_MAX_S)
+            except ValueError:
+                pass
+    elif not isinstance(error, APIConnectionError):  # Includes APITimeoutError
+        return None
+    # Full jitter
+    return random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * (2 ** attempt)))
+
+
+async def _acquire(metrics: _EndpointMetrics):
+    semaphore, bucket = _limits()
+    await semaphore.acquire()
+    try:
+        metrics.rate_limit_wait_ms += await bucket.acquire() * 1000
+    except BaseException:
+        semaphore.release()
+        raise
+    return semaphore
+
+
+async def chat_completion(endpoint: str, **kwargs) -> Any:
+    """
+    chat.completions.create through the shared client
+
+    Args:
+        endpoint: Metrics label (e.g. "chat", "scan_wod")
+        **kwargs: chat.completions.create arguments
+
+    Returns:
+        The ChatCompletion response
+    """
+    global _in_flight
+    metrics = _endpoint_metrics(endpoint)
+    client = get_async_client()
+
+    attempt = 0
+    while True:
+        semaphore = await _acquire(metrics)
+        _in_flight += 1
+        start_time = time.perf_counter()
+        try:
+            response = await client.chat.completions.create(**kwargs)
+            metrics.record((time.perf_counter() - start_time) * 1000, response.usage)
+            return response
+        except Exception as e:
+            error = e
+            delay = _retry_delay(e, attempt) if attempt < MAX_RETRIES else None
+            if delay is None:
+                metrics.errors += 1
+                raise
+        finally:
+            _in_flight -= 1
+            semaphore.release()
+
+        attempt += 1
+        metrics.retries += 1
+        print(f"⚠️ OpenAI {endpoint} call failed ({type(error).__name__}), retry {attempt}/{MAX_RETRIES} in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+
+async def chat_completion_stream(endpoint: str, **kwargs) -> AsyncIterator[Any]:
+    """
+    Streaming chat.completions.create through the shared client
+
+    Retries only happen before the first chunk; the concurrency slot and the
+    HTTP connection are held until the stream ends or the generator is closed
+    (callers that stop early should aclose() it). Usage is recorded when the
+    stream includes it (stream_options={"include_usage": True}).
+
+    Yields:
+        ChatCompletionChunk objects
+    """
+    global _in_flight
+    metrics = _endpoint_metrics(endpoint)
+    client = get_async_client()
+
+    attempt = 0
+    while True:
+        semaphore = await _acquire(metrics)
+        _in_flight += 1
+        start_time = time.perf_counter()
+        started = False
+        usage = None
+        stream = None
+        try:
+            stream = await client.chat.completions.create(stream=True, **kwargs)
+            async for chunk in stream:
+                started = True
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                yield chunk
+            metrics.record((time.perf_counter() - start_time) * 1000, usage)
+            return
+        except Exception as e:
+            error = e
+            delay = _retry_delay(e, attempt) if not started and attempt < MAX_RETRIES else None
+            if delay is None:
+                metrics.errors += 1
+                raise
+        finally:
+            _in_flight -= 1
+            semaphore.release()
+            # Also on early exit (consumer closed the generator): return the
+            # HTTP connection to the pool
+            if stream is not None:
+                await stream.close()
+
+        attempt += 1
+        metrics.retries += 1
+        print(f"⚠️ OpenAI {endpoint} stream failed ({type(error).__name__}), retry {attempt}/{MAX_RETRIES} in {delay:.1f}s")
+        await asyncio.sleep(delay)
@@ -0,0 +1,275 @@
+"""
+Token-budgeted Prompt Builder for the AI Coach system prompt
+Sections are added in document order with a priority; the builder keeps
+required sections, then fills the rest by priority until the token budget
+(AI_COACH_PROMPT_TOKEN_BUDGET) is used up. List sections (exercises,
+templates) are cut item by item instead of being dropped whole.
+
+- Tokens are counted with tiktoken when installed (len/4 estimate otherwise)
+- Section renders and their token counts are cached per source value, so
+  unchanged context sections (see context_cache / shared_cache) are rendered
+  and counted once
+- Per-section token usage is aggregated for GET /api/v1/ai-coach/prompt/stats
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+TOKEN_BUDGET = int(os.environ.get("AI_COACH_PROMPT_TOKEN_BUDGET", "3000"))
+TOKENIZER_ENCODING = os.environ.get("AI_COACH_TOKENIZER_ENCODING", "cl100k_base")
+RENDER_CACHE_SIZE = 2048
+
+_encoding = None
+if tiktoken is not None:
+    try:
+        _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception as e:  # Encoding files are downloaded on first use
+        print(f"⚠️ tiktoken encoding {TOKENIZER_ENCODING} unavailable, estimating tokens: {e}")
+
+
+def count_tokens(text: str) -> int:
+    """Token count of text (tiktoken, or ~4 characters per token)"""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def tokenizer_name() -> str:
+    return TOKENIZER_ENCODING if _encoding is not None else "estimate"
+
+
+# ═══════════════════════════════════════════════════════════════
+# SECTION RENDER CACHE
+# ═══════════════════════════════════════════════════════════════
+
+class RenderedSection:
+    """Rendered text of one section (header, items, footer) with token counts"""
+
+    __slots__ = ("header", "items", "footer", "header_tokens", "item_tokens", "footer_tokens")
+
+    def __init__(self, header: str = "", items: Optional[List[str]] = None, footer: str = ""):
+        self.header = header
+        self.items = items or []
+        self.footer = footer
+        self.header_tokens = count_tokens(header)
+        self.item_tokens = [count_tokens(item) for item in self.items]
+        self.footer_tokens = count_tokens(footer)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.header_tokens + sum(self.item_tokens) + self.footer_tokens
+
+
+_render_lock = threading.Lock()
+_render_cache: "OrderedDict[tuple, Tuple[tuple, RenderedSection]]" = OrderedDict()
+render_hits = 0
+render_misses = 0
+
+
+def render_section(
+    name: str,
+    sources: tuple,
+    render: Callable[..., Tuple[str, List[str], str]]
+) -> RenderedSection:
+    """
+    Render a section once per set of source values.
+
+    Args:
+        name: Section name
+        sources: The context values the section is rendered from; cached
+            context sections keep their identity between messages
+        render: render(*sources) -> (header, items, footer)
+
+    Returns:
+        Cached RenderedSection
+    """
+    global render_hits, render_misses
+    key = (name,) + tuple(id(source) for source in sources)
+    with _render_lock:
+        entry = _render_cache.get(key)
+        # Compare identities too: ids can be reused after a value is freed
+        if entry is not None and all(a is b for a, b in zip(entry[0], sources)):
+            _render_cache.move_to_end(key)
+            render_hits += 1
+            return entry[1]
+
+    rendered = RenderedSection(*render(*sources))
+
+    with _render_lock:
+        render_misses += 1
+        _render_cache[key] = (sources, rendered)
+        while len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    return rendered
+
+
+# ═══════════════════════════════════════════════════════════════
+# BUDGETED ASSEMBLY
+# ═══════════════════════════════════════════════════════════════
+
+class PromptBuilder:
+    """Assembles sections in document order, filled by priority within a budget"""
+
+    def __init__(self, budget: int = TOKEN_BUDGET):
+        self.budget = budget
+        self._sections: List[Dict[str, Any]] = []
+
+    def add(
+        self,
+        name: str,
+        rendered: RenderedSection,
+        priority: int = 5,
+        required: bool = False,
+        overflow: Optional[str] = None
+    ):
+        """
+        Add a section.
+
+        Args:
+            name: Section name (report key)
+            rendered: From render_section() or RenderedSection(text)
+            priority: Lower fills first
+            required: Always included in full (base prompt, guidelines)
+            overflow: Line added when items are cut, formatted with {remaining}
+        """
+        if rendered.total_tokens == 0:
+            return
+        self._sections.append({
+            "name": name,
+            "rendered": rendered,
+            "priority": priority,
+            "required": required,
+            "overflow": overflow
+        })
+
+    def build(self) -> Tuple[str, Dict]:
+        """
+        Returns:
+            (prompt, report) - report has the budget, total tokens and
+            per-section tokens / items included
+        """
+        remaining = self.budget
+        chosen: Dict[int, int] = {}  # section index -> items included
+
+        for index, section in enumerate(self._sections):
+            if section["required"]:
+                chosen[index] = len(section["rendered"].items)
+                remaining -= section["rendered"].total_tokens
+
+        optional = [i for i, s in enumerate(self._sections) if not s["required"]]
+        for index in sorted(optional, key=lambda i: self._sections[i]["priority"]):
+            rendered = self._sections[index]["rendered"]
+            if rendered.total_tokens <= remaining:
+                chosen[index] = len(rendered.items)
+                remaining -= rendered.total_tokens
+                continue
+            if not rendered.items:
+                continue
+
+            # Partial list: frame + as many items as fit (at least one)
+            overflow_tokens = count_tokens(self._sections[index]["overflow"] or "")
+            used = rendered.header_tokens + rendered.footer_tokens + overflow_tokens
+            count = 0
+            for item_tokens in rendered.item_tokens:
+                if used + item_tokens > remaining:
+                    break
+                used += item_tokens
+                count += 1
+            if count:
+                chosen[index] = count
+                remaining -= used
+
+        parts = []
+        report_sections = {}
+        total = 0
+        for index, section in enumerate(self._sections):
+            rendered = section["rendered"]
+            entry = {
+                "tokens": 0,
+                "items": chosen.get(index, 0),
+                "items_total": len(rendered.items),
+                "priority": section["priority"]
+            }
+            report_sections[section["name"]] = entry
+            if index not in chosen:
+                entry["dropped"] = True
+                continue
+
+            count = chosen[index]
+            section_parts = [rendered.header] if rendered.header else []
+            section_parts.extend(rendered.items[:count])
+            tokens = rendered.header_tokens + sum(rendered.item_tokens[:count]) + rendered.footer_tokens
+            if count < len(rendered.items) and section["overflow"]:
+                overflow = section["overflow"].format(remaining=len(rendered.items) - count)
+                section_parts.append(overflow)
+                tokens += count_tokens(overflow)
+            if rendered.footer:
+                section_parts.append(rendered.footer)
+
+            parts.append("\n".join(section_parts))
+            entry["tokens"] = tokens
+            total += tokens
+
+        report = {
+            "budget": self.budget,
+            "total_tokens": total,
+            "tokenizer": tokenizer_name(),
+            "sections": report_sections
+        }
+        _record(report)
+        return "\n".join(parts), report
+
+
+# ═══════════════════════════════════════════════════════════════
+# STATS
+# ═══════════════════════════════════════════════════════════════
+
+_stats_lock = threading.Lock()
+_prompts_built = 0
+_total_tokens = 0
+_section_stats: Dict[str, Dict[str, int]] = {}
+
+
+def _record(report: Dict):
+    global _prompts_built, _total_tokens
+    with _stats_lock:
+        _prompts_built += 1
+        _total_tokens += report["total_tokens"]
+        for name, entry in report["sections"].items():
+            stats = _section_stats.setdefault(name, {"tokens": 0, "built": 0, "truncated": 0, "dropped": 0})
+            stats["built"] += 1
+            stats["tokens"] += entry["tokens"]
+            if entry.get("dropped"):
+                stats["dropped"] += 1
+            elif entry["items"] < entry["items_total"]:
+                stats["truncated"] += 1
+
+
+def prompt_stats() -> Dict:
+    with _stats_lock:
+        return {
+            "budget": TOKEN_BUDGET,
+            "tokenizer": tokenizer_name(),
+            "prompts_built": _prompts_built,
+            "avg_total_tokens": round(_total_tokens / _prompts_built, 1) if _prompts_built else None,
+            "render_cache": {"hits": render_hits, "misses": render_misses, "entries": len(_render_cache)},
+            "sections": {
+                name: {
+                    "avg_tokens": round(stats["tokens"] / stats["built"], 1),
+                    "truncated": stats["truncated"],
+                    "dropped": stats["dropped"],
+                    "built": stats["built"]
+                }
+                for name, stats in _section_stats.items()
+            }
+        }
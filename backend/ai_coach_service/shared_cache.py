@@ -0,0 +1,218 @@
+"""
+Shared TTL Cache for AI Coach reference data
+Process-wide caches for data that is the same for every user and changes
+rarely (public workout templates, the exercise catalog and its category
+index), so chat messages stop reloading it from Supabase. The nutrition
+rollup (past days of each user's week) uses the same machinery.
+
+- TTL expiry plus explicit invalidation (e.g. after a new exercise is created);
+  expired entries are evicted on insert, optionally with a size cap
+- Single-flight loading: concurrent misses for the same key wait for ONE
+  loader call instead of stampeding Supabase
+- Hit / miss / load metrics per cache for the stats endpoint
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future
+from itertools import islice
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """Thread-safe TTL cache with single-flight loading"""
+
+    def __init__(
+        self,
+        name: str,
+        ttl_seconds: float,
+        cache_empty: bool = False,
+        max_entries: Optional[int] = None
+    ):
+        """
+        Args:
+            name: Cache name (stats / invalidation key)
+            ttl_seconds: Lifetime of an entry
+            cache_empty: Also cache empty results (loaders in this service
+                return []/None on errors, which should not stick for a TTL)
+            max_entries: Size cap; the oldest entries are evicted first
+        """
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.cache_empty = cache_empty
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        # Insertion order == expiry order (one TTL, keys re-inserted at the end)
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._inflight: Dict[Hashable, Future] = {}
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_errors = 0
+        self.coalesced = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.last_load_ms = 0.0
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Cached value for key, loading it once if missing or expired.
+
+        Concurrent callers that miss on the same key share the first
+        caller's load (and its exception, if it raises).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                future = Future()
+                self._inflight[key] = future
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        start_time = time.time()
+        try:
+            value = loader()
+        except Exception as e:
+            with self._lock:
+                self.load_errors += 1
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self.loads += 1
+            self.last_load_ms = (time.time() - start_time) * 1000
+            # An invalidation during the load replaced/removed the in-flight
+            # marker: hand the value to waiters but don't cache stale data
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+                if value or self.cache_empty:
+                    self._store(key, value)
+        future.set_result(value)
+        return value
+
+    def _store(self, key: Hashable, value: Any):
+        """Insert under the lock, evicting expired (and over-cap) entries first"""
+        now = time.monotonic()
+        self._entries.pop(key, None)
+
+        expired = 0
+        for expires, _ in self._entries.values():
+            if expires > now:
+                break
+            expired += 1
+        over_cap = len(self._entries) + 1 - self.max_entries if self.max_entries else 0
+        stale = max(expired, over_cap)
+        if stale > 0:
+            for old_key in list(islice(self._entries, stale)):
+                del self._entries[old_key]
+            self.evictions += stale
+
+        self._entries[key] = (now + self.ttl_seconds, value)
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drop one key (or everything)"""
+        with self._lock:
+            self.invalidations += 1
+            if key is None:
+                self._entries.clear()
+                self._inflight.clear()
+            else:
+                self._entries.pop(key, None)
+                self._inflight.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]):
+        """Drop every key matching predicate (e.g. all keys of one user)"""
+        with self._lock:
+            self.invalidations += 1
+            for key in [k for k in self._entries if predicate(k)]:
+                del self._entries[key]
+            for key in [k for k in self._inflight if predicate(k)]:
+                del self._inflight[key]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            live = sum(1 for expires, _ in self._entries.values() if expires > now)
+            lookups = self.hits + self.misses
+            return {
+                "ttl_seconds": self.ttl_seconds,
+                "entries": live,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "loads": self.loads,
+                "load_errors": self.load_errors,
+                "coalesced_misses": self.coalesced,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "last_load_ms": round(self.last_load_ms, 1)
+            }
+
+
+# ═══════════════════════════════════════════════════════════════
+# PROCESS-WIDE CACHES
+# ═══════════════════════════════════════════════════════════════
+
+PUBLIC_TEMPLATES_TTL_S = float(os.environ.get("AI_COACH_TEMPLATE_CACHE_TTL_S", "600"))
+EXERCISE_CATALOG_TTL_S = float(os.environ.get("AI_COACH_EXERCISE_CACHE_TTL_S", "1800"))
+NUTRITION_ROLLUP_TTL_S = float(os.environ.get("AI_COACH_NUTRITION_ROLLUP_TTL_S", "3600"))
+NUTRITION_ROLLUP_MAX_ENTRIES = int(os.environ.get("AI_COACH_NUTRITION_ROLLUP_MAX_ENTRIES", "10000"))
+
+public_templates_cache = TTLCache("public_templates", PUBLIC_TEMPLATES_TTL_S)
+exercise_catalog_cache = TTLCache("exercise_catalog", EXERCISE_CATALOG_TTL_S)
+
+# Per-user daily totals of the completed days of the past week, keyed by
+# (user_id, last completed date) so the window rolls over at midnight;
+# yesterday's keys expire and are evicted, and the size is capped.
+# Its loader raises on errors, so "no meals logged" can be cached too.
+nutrition_rollup_cache = TTLCache(
+    "nutrition_rollup",
+    NUTRITION_ROLLUP_TTL_S,
+    cache_empty=True,
+    max_entries=NUTRITION_ROLLUP_MAX_ENTRIES
+)
+
+_caches: Dict[str, TTLCache] = {
+    cache.name: cache for cache in (public_templates_cache, exercise_catalog_cache, nutrition_rollup_cache)
+}
+
+
+def get_cache(name: str) -> Optional[TTLCache]:
+    return _caches.get(name)
+
+
+def invalidate(name: Optional[str] = None) -> list:
+    """
+    Invalidate one shared cache (or all of them).
+
+    Returns:
+        Names of the invalidated caches
+    """
+    targets = [name] if name else list(_caches)
+    invalidated = []
+    for target in targets:
+        cache = _caches.get(target)
+        if cache is not None:
+            cache.invalidate()
+            invalidated.append(target)
+    return invalidated
+
+
+def cache_stats() -> Dict[str, Dict]:
+    return {name: cache.stats() for name, cache in _caches.items()}
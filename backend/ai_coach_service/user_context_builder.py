@@ -3,11 +3,45 @@ User Context Builder for AI Coach
 Loads user data from Supabase to build rich, personalized prompts
 """
 
+import asyncio
 import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from supabase import create_client, Client
 
+try:
+    from ai_coach_service.context_cache import SECTION_SCOPES, get_user_context_cache
+    from ai_coach_service.exercise_database import get_exercise_catalog
+    from ai_coach_service.prompt_builder import PromptBuilder, render_section
+    from ai_coach_service.shared_cache import nutrition_rollup_cache, public_templates_cache
+except ImportError:
+    from .context_cache import SECTION_SCOPES, get_user_context_cache
+    from .exercise_database import get_exercise_catalog
+    from .prompt_builder import PromptBuilder, render_section
+    from .shared_cache import nutrition_rollup_cache, public_templates_cache
+
+
+# Each context query gets this long; slow sections are skipped, not awaited
+CONTEXT_QUERY_TIMEOUT_S = float(os.environ.get("AI_COACH_CONTEXT_TIMEOUT_S", "3.0"))
+
+# Shared pool for the blocking Supabase calls: one worker per context section
+# (see _context_sources) for each chat expected to build its context at once,
+# so queue wait doesn't eat into the per-query timeout
+CONTEXT_SECTIONS = 9
+CONTEXT_CONCURRENT_CHATS = int(os.environ.get("AI_COACH_CONTEXT_CONCURRENT_CHATS", "4"))
+_context_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get(
+        "AI_COACH_CONTEXT_WORKERS", str(CONTEXT_SECTIONS * CONTEXT_CONCURRENT_CHATS)
+    )),
+    thread_name_prefix="context-query"
+)
+
+# Cleared when the get_nutrition_daily_totals RPC turns out not to be installed
+_daily_totals_rpc_available = True
+
 
 class UserContextBuilder:
     """Builds rich context for AI Coach from Supabase data"""
@@ -21,79 +55,198 @@ class UserContextBuilder:
             raise ValueError("SUPABASE_URL and SUPABASE_KEY required")
 
         self.client: Client = create_client(supabase_url, supabase_key)
+        self.last_prompt_report: Optional[Dict] = None  # Token usage of the last built prompt
+
+    def _context_sources(self, user_id: str) -> Dict[str, Tuple[Callable[[], Any], Any]]:
+        """
+        Independent context queries: section -> (loader, value if skipped).
 
-    def build_user_context(self, user_id: str) -> Dict:
+        Per-user loaders raise on query errors, so a failed section is
+        skipped (and not cached) rather than stored as "no data".
         """
-        Build complete user context for AI prompt
+        return {
+            "profile": (lambda: self._get_user_profile(user_id), None),
+            "prs": (lambda: self._get_user_prs(user_id), []),
+            "exercises": (lambda: self._get_available_exercises(limit=100), []),
+            "workouts": (lambda: self._get_user_workouts(user_id, limit=10), []),
+            "public_templates": (lambda: self._get_public_workout_templates(limit=20), []),
+            "nutrition_goal": (lambda: self._get_nutrition_goal(user_id), None),
+            "nutrition_today": (lambda: self._get_nutrition_today(user_id), None),
+            "nutrition_weekly": (lambda: self._get_nutrition_weekly_summary(user_id), None),
+            "anabolic_window": (lambda: self._get_anabolic_window(user_id), None),
+        }
+
+    def _plan_sources(self, user_id: str, use_cache: bool):
+        """
+        Split the context sections into cached ones and ones to query.
+
+        Returns:
+            (sources to load, cached sections, scope versions before loading)
+        """
+        cache = get_user_context_cache()
+        versions = cache.versions(user_id)
+        cached = cache.get_sections(user_id) if use_cache else {}
+        sources = {
+            name: source for name, source in self._context_sources(user_id).items()
+            if name not in cached
+        }
+        return sources, cached, versions
+
+    def _finish_context(
+        self,
+        user_id: str,
+        values: Dict[str, Any],
+        skipped: List[str],
+        cached: Dict[str, Any],
+        versions: Dict[str, int],
+        start_time: float
+    ) -> Dict:
+        """Store freshly loaded per-user sections, merge in cached ones, assemble"""
+        get_user_context_cache().store_sections(
+            user_id,
+            {name: value for name, value in values.items() if name in SECTION_SCOPES and name not in skipped},
+            versions
+        )
+        values.update(cached)
+        context = self._assemble_context(values, skipped, start_time)
+        context["cached_sections"] = sorted(cached)
+        return context
+
+    def build_user_context(
+        self,
+        user_id: str,
+        timeout: float = CONTEXT_QUERY_TIMEOUT_S,
+        use_cache: bool = True
+    ) -> Dict:
+        """
+        Build complete user context for AI prompt (blocking variant)
 
         Args:
             user_id: User's UUID
+            timeout: Per-query timeout in seconds (queries run concurrently)
+            use_cache: Reuse fresh sections from the per-user snapshot cache
 
         Returns:
             Dict with user profile, PRs, exercises, nutrition, etc.
         """
-        try:
-            # Load all user data in parallel
-            profile = self._get_user_profile(user_id)
-            prs = self._get_user_prs(user_id)
-            exercises = self._get_available_exercises(limit=100)
-            workouts = self._get_user_workouts(user_id, limit=10)
-            public_templates = self._get_public_workout_templates(limit=20)
-
-            # Load nutrition data
-            nutrition_goal = self._get_nutrition_goal(user_id)
-            nutrition_today = self._get_nutrition_today(user_id)
-            nutrition_weekly = self._get_nutrition_weekly_summary(user_id)
-
-            # Load advanced nutrition data
-            macro_quality = self._calculate_macro_quality(nutrition_today)
-            anabolic_window = self._get_anabolic_window(user_id)
+        start_time = time.time()
+        sources, cached, versions = self._plan_sources(user_id, use_cache)
+        futures = {
+            name: _context_executor.submit(loader)
+            for name, (loader, _) in sources.items()
+        }
+        wait(futures.values(), timeout=timeout)
+
+        values, skipped = {}, []
+        for name, future in futures.items():
+            values[name], ok = self._section_result(name, future, sources[name][1], timeout)
+            if not ok:
+                skipped.append(name)
+                future.cancel()  # Drops it if still queued; a running query finishes
+
+        return self._finish_context(user_id, values, skipped, cached, versions, start_time)
+
+    async def build_user_context_async(
+        self,
+        user_id: str,
+        timeout: float = CONTEXT_QUERY_TIMEOUT_S,
+        use_cache: bool = True
+    ) -> Dict:
+        """
+        Build complete user context without blocking the event loop.
 
-            return {
-                "profile": profile,
-                "prs": prs,
-                "exercises": exercises,
-                "workouts": workouts,
-                "public_templates": public_templates,
-                "nutrition_goal": nutrition_goal,
-                "nutrition_today": nutrition_today,
-                "nutrition_weekly": nutrition_weekly,
-                "macro_quality": macro_quality,
-                "anabolic_window": anabolic_window,
-                "has_data": bool(profile or prs or exercises)
-            }
+        All queries are issued concurrently; a query that misses its timeout
+        (or fails) is skipped with its empty default, so latency tracks the
+        slowest query within the timeout instead of the sum of all queries.
+        Sections still fresh in the per-user snapshot cache are not queried.
 
+        Args:
+            user_id: User's UUID
+            timeout: Per-query timeout in seconds
+            use_cache: Reuse fresh sections from the per-user snapshot cache
+
+        Returns:
+            Same dict as build_user_context, plus "skipped_sections"
+        """
+        start_time = time.time()
+        loop = asyncio.get_running_loop()
+        sources, cached, versions = self._plan_sources(user_id, use_cache)
+        futures = {
+            name: asyncio.wrap_future(_context_executor.submit(loader), loop=loop)
+            for name, (loader, _) in sources.items()
+        }
+        await asyncio.wait(futures.values(), timeout=timeout)
+
+        values, skipped = {}, []
+        for name, future in futures.items():
+            values[name], ok = self._section_result(name, future, sources[name][1], timeout)
+            if not ok:
+                skipped.append(name)
+                # Cancels the pool future too: dropped if still queued, a
+                # running query finishes and its result is discarded
+                future.cancel()
+
+        return self._finish_context(user_id, values, skipped, cached, versions, start_time)
+
+    @staticmethod
+    def _section_result(name: str, future, default: Any, timeout: float) -> Tuple[Any, bool]:
+        """Result of one context query, or (default, False) if it was slow or failed"""
+        if not future.done():
+            print(f"⏱️ Context section '{name}' exceeded {timeout:.1f}s - skipped")
+            return default, False
+        try:
+            return future.result(), True
         except Exception as e:
-            print(f"❌ Error building user context: {str(e)}")
-            return {
-                "profile": None,
-                "prs": [],
-                "exercises": [],
-                "workouts": [],
-                "public_templates": [],
-                "nutrition_goal": None,
-                "nutrition_today": None,
-                "nutrition_weekly": None,
-                "has_data": False
-            }
+            print(f"⚠️ Context section '{name}' failed: {str(e)}")
+            return default, False
+
+    def _assemble_context(self, values: Dict[str, Any], skipped: List[str], start_time: float) -> Dict:
+        """Combine loaded sections into the context dict"""
+        profile = values["profile"]
+        prs = values["prs"]
+        exercises = values["exercises"]
+
+        # Derived from today's meals (no extra query)
+        macro_quality = self._calculate_macro_quality(values["nutrition_today"])
+
+        elapsed_ms = (time.time() - start_time) * 1000
+        print(f"✅ User context built in {elapsed_ms:.0f}ms"
+              + (f" (skipped: {', '.join(skipped)})" if skipped else ""))
+
+        return {
+            "profile": profile,
+            "prs": prs,
+            "exercises": exercises,
+            "workouts": values["workouts"],
+            "public_templates": values["public_templates"],
+            "nutrition_goal": values["nutrition_goal"],
+            "nutrition_today": values["nutrition_today"],
+            "nutrition_weekly": values["nutrition_weekly"],
+            "macro_quality": macro_quality,
+            "anabolic_window": values["anabolic_window"],
+            "has_data": bool(profile or prs or exercises),
+            "skipped_sections": skipped
+        }
 
     def _get_user_profile(self, user_id: str) -> Optional[Dict]:
         """Get user profile from Supabase"""
         try:
+            # limit(1), not single(): a missing profile is "no data", not an error
             result = self.client.table("user_profiles")\
                 .select("*")\
                 .eq("id", user_id)\
-                .single()\
+                .limit(1)\
                 .execute()
 
             if result.data:
-                print(f"✅ Loaded profile for user: {result.data.get('name', 'Unknown')}")
-                return result.data
+                profile = result.data[0]
+                print(f"✅ Loaded profile for user: {profile.get('name', 'Unknown')}")
+                return profile
             return None
 
         except Exception as e:
-            print(f"⚠️ No profile found: {str(e)}")
-            return None
+            print(f"⚠️ Error loading profile: {str(e)}")
+            raise
 
     def _get_user_prs(self, user_id: str) -> List[Dict]:
         """Get user's personal records"""
@@ -101,32 +254,26 @@ class UserContextBuilder:
             result = self.client.table("user_profiles")\
                 .select("personal_records")\
                 .eq("id", user_id)\
-                .single()\
+                .limit(1)\
                 .execute()
 
-            if result.data and result.data.get("personal_records"):
-                prs = result.data["personal_records"]
+            if result.data and result.data[0].get("personal_records"):
+                prs = result.data[0]["personal_records"]
                 print(f"✅ Loaded {len(prs)} PRs")
                 return prs
             return []
 
         except Exception as e:
-            print(f"⚠️ No PRs found: {str(e)}")
-            return []
+            print(f"⚠️ Error loading PRs: {str(e)}")
+            raise
 
     def _get_available_exercises(self, limit: int = 100) -> List[Dict]:
-        """Get available exercises from database (exercises_new table)"""
+        """Get available exercises from the shared exercise catalog (exercises_new)"""
         try:
-            # Try exercises_new first (main library)
-            result = self.client.table("exercises_new")\
-                .select("id, name, category, equipment")\
-                .limit(limit)\
-                .execute()
-
-            if result.data:
-                print(f"✅ Loaded {len(result.data)} exercises from exercises_new")
-                return result.data
-            return []
+            exercises = get_exercise_catalog(self.client)[:limit]
+            if exercises:
+                print(f"✅ Using {len(exercises)} exercises from exercise catalog")
+            return exercises
 
         except Exception as e:
             print(f"⚠️ Error loading exercises: {str(e)}")
@@ -148,178 +295,61 @@ class UserContextBuilder:
 
             print(f"✅ Found {len(result.data)} user workout templates")
 
-            # For each template, load exercises (same as public templates)
-            templates_with_exercises = []
-            for template in result.data:
-                try:
-                    # Load exercises for this template
-                    exercises_result = self.client.table("workout_template_exercises")\
-                        .select("id, exercise_id, order_index")\
-                        .eq("workout_template_id", template["id"])\
-                        .order("order_index")\
-                        .execute()
-
-                    # Load exercise details for each exercise
-                    exercises = []
-                    for ex in exercises_result.data or []:
-                        exercise_name = "Unknown Exercise"
-
-                        # Load from exercises_new (main library)
-                        try:
-                            exercise_details = self.client.table("exercises_new")\
-                                .select("name")\
-                                .eq("id", ex["exercise_id"])\
-                                .single()\
-                                .execute()
-
-                            if exercise_details.data:
-                                exercise_name = exercise_details.data.get("name", "Unknown Exercise")
-                        except Exception:
-                            # Fallback to exercises table
-                            try:
-                                exercise_details = self.client.table("exercises")\
-                                    .select("name")\
-                                    .eq("id", ex["exercise_id"])\
-                                    .single()\
-                                    .execute()
-
-                                if exercise_details.data:
-                                    exercise_name = exercise_details.data.get("name", "Unknown Exercise")
-                            except Exception:
-                                pass
-
-                        # Load sets
-                        sets_result = self.client.table("exercise_sets")\
-                            .select("target_reps, target_weight")\
-                            .eq("workout_exercise_id", ex["id"])\
-                            .execute()
-
-                        exercises.append({
-                            "name": exercise_name,
-                            "order": ex["order_index"],
-                            "sets_count": len(sets_result.data or []),
-                            "sets": sets_result.data or []
-                        })
-
-                    templates_with_exercises.append({
-                        "id": template["id"],
-                        "name": template["name"],
-                        "description": template.get("description", ""),
-                        "exercises": exercises
-                    })
+            exercises_by_template = self._load_template_exercises([t["id"] for t in result.data])
 
-                except Exception as e:
-                    print(f"⚠️ Error loading exercises for user template {template['id']}: {str(e)}")
-                    templates_with_exercises.append({
-                        "id": template["id"],
-                        "name": template["name"],
-                        "description": template.get("description", ""),
-                        "exercises": []
-                    })
+            templates_with_exercises = [
+                {
+                    "id": template["id"],
+                    "name": template["name"],
+                    "description": template.get("description", ""),
+                    "exercises": exercises_by_template.get(template["id"], [])
+                }
+                for template in result.data
+            ]
 
             print(f"✅ Loaded {len(templates_with_exercises)} user workout templates with exercises")
             return templates_with_exercises
 
         except Exception as e:
             print(f"⚠️ Error loading user workouts: {str(e)}")
-            return []
+            raise
 
     def _get_public_workout_templates(self, limit: int = 20) -> List[Dict]:
-        """Get public workout templates with exercises"""
+        """
+        Get public workout templates with exercises.
+
+        Shared by all users, so served from the process-wide cache; treat
+        the returned list as read-only.
+        """
+        return public_templates_cache.get_or_load(limit, lambda: self._load_public_workout_templates(limit))
+
+    def _load_public_workout_templates(self, limit: int) -> List[Dict]:
+        """Load public workout templates with exercises from Supabase"""
         try:
-            # Load ALL templates first (filtering NULL in Supabase query is tricky)
-            # Then filter in Python for user_id = None, same as Android app does
-            all_templates_result = self.client.table("workout_templates")\
+            # Public templates have no owner (user_id IS NULL), same as the Android app
+            result = self.client.table("workout_templates")\
                 .select("id, name, sports, user_id")\
+                .is_("user_id", "null")\
+                .limit(limit)\
                 .execute()
 
-            if not all_templates_result.data:
-                print("⚠️ No templates found in database at all")
-                return []
-
-            # Filter for public templates (user_id IS NULL) in Python
-            public_templates = [t for t in all_templates_result.data if t.get("user_id") is None]
-            print(f"🔍 Found {len(public_templates)} public templates out of {len(all_templates_result.data)} total templates")
-
-            # Limit after filtering
-            public_templates = public_templates[:limit]
-
+            public_templates = result.data or []
             if not public_templates:
-                print("⚠️ No public templates found after filtering")
+                print("⚠️ No public templates found")
                 return []
 
-            # For each template, load exercises
-            templates_with_exercises = []
-            for template in public_templates:
-                try:
-                    # Load exercises for this template
-                    exercises_result = self.client.table("workout_template_exercises")\
-                        .select("id, exercise_id, order_index")\
-                        .eq("workout_template_id", template["id"])\
-                        .order("order_index")\
-                        .execute()
-
-                    # Load sets and exercise details for each exercise
-                    exercises = []
-                    for ex in exercises_result.data or []:
-                        exercise_name = "Unknown Exercise"
-
-                        # Load from exercises_new (main library)
-                        try:
-                            exercise_details = self.client.table("exercises_new")\
-                                .select("name")\
-                                .eq("id", ex["exercise_id"])\
-                                .single()\
-                                .execute()
-
-                            if exercise_details.data:
-                                exercise_name = exercise_details.data.get("name", "Unknown Exercise")
-                        except Exception as e:
-                            # Fallback to exercises table
-                            try:
-                                exercise_details = self.client.table("exercises")\
-                                    .select("name")\
-                                    .eq("id", ex["exercise_id"])\
-                                    .single()\
-                                    .execute()
-
-                                if exercise_details.data:
-                                    exercise_name = exercise_details.data.get("name", "Unknown Exercise")
-                            except Exception:
-                                print(f"⚠️ Could not load exercise for id {ex['exercise_id']}: {e}")
-
-                        # Load sets using workout_exercise_id
-                        sets_result = self.client.table("exercise_sets")\
-                            .select("target_reps, target_weight")\
-                            .eq("workout_exercise_id", ex["id"])\
-                            .execute()
-
-                        exercises.append({
-                            "name": exercise_name,
-                            "order": ex["order_index"],
-                            "sets_count": len(sets_result.data or []),
-                            "sets": sets_result.data or []
-                        })
-
-                    templates_with_exercises.append({
-                        "id": template["id"],
-                        "name": template["name"],
-                        "description": template.get("description", ""),
-                        "sports": template.get("sports", []),
-                        "exercises": exercises
-                    })
+            exercises_by_template = self._load_template_exercises([t["id"] for t in public_templates])
 
-                except Exception as e:
-                    print(f"⚠️ Error loading exercises for template {template['id']}: {str(e)}")
-                    # Still add the template even if exercises failed to load
-                    templates_with_exercises.append({
-                        "id": template["id"],
-                        "name": template["name"],
-                        "description": template.get("description", ""),
-                        "sports": template.get("sports", []),
-                        "exercises": []
-                    })
-                    continue
+            templates_with_exercises = [
+                {
+                    "id": template["id"],
+                    "name": template["name"],
+                    "description": template.get("description", ""),
+                    "sports": template.get("sports", []),
+                    "exercises": exercises_by_template.get(template["id"], [])
+                }
+                for template in public_templates
+            ]
 
             print(f"✅ Loaded {len(templates_with_exercises)} public workout templates with exercises")
             return templates_with_exercises
@@ -328,6 +358,113 @@ class UserContextBuilder:
             print(f"⚠️ Error loading public templates: {str(e)}")
             return []
 
+    # ═══════════════════════════════════════════════════════════════
+    # BATCHED TEMPLATE LOADING
+    # ═══════════════════════════════════════════════════════════════
+
+    # Keep in_() filters well below URL length limits (UUIDs are ~37 chars)
+    IN_FILTER_CHUNK = 150
+
+    # exercises_new.id is a UUID; template exercise_id is TEXT and may hold
+    # legacy ids ("squat-back-barbell") that Postgres would reject in a UUID in_()
+    UUID_PATTERN = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.IGNORECASE)
+
+    def _select_in(self, table: str, columns: str, column: str, values: List, order: Optional[str] = None) -> List[Dict]:
+        """SELECT columns FROM table WHERE column IN values (chunked)"""
+        rows = []
+        unique_values = list(dict.fromkeys(v for v in values if v is not None))
+        for start in range(0, len(unique_values), self.IN_FILTER_CHUNK):
+            query = self.client.table(table)\
+                .select(columns)\
+                .in_(column, unique_values[start:start + self.IN_FILTER_CHUNK])
+            if order:
+                query = query.order(order)
+            rows.extend(query.execute().data or [])
+        return rows
+
+    def _load_template_exercises(self, template_ids: List[str]) -> Dict[str, List[Dict]]:
+        """
+        Load exercises (with names and sets) for many templates at once.
+
+        Three to four queries in total - template exercises, exercise names
+        (exercises_new for UUID ids, the legacy exercises table for the rest)
+        and sets - joined in memory, instead of several round-trips per
+        template exercise. A failed name or set lookup only drops those
+        details, not the exercises.
+
+        Args:
+            template_ids: workout_templates ids
+
+        Returns:
+            template_id -> exercises ordered by order_index (templates whose
+            exercises fail to load still appear, with no exercises)
+        """
+        if not template_ids:
+            return {}
+
+        try:
+            return self._join_template_exercises(template_ids)
+        except Exception as e:
+            print(f"⚠️ Error loading template exercises: {str(e)}")
+            return {}
+
+    def _join_template_exercises(self, template_ids: List[str]) -> Dict[str, List[Dict]]:
+        template_exercises = self._select_in(
+            "workout_template_exercises",
+            "id, workout_template_id, exercise_id, order_index",
+            "workout_template_id",
+            template_ids,
+            order="order_index"
+        )
+        if not template_exercises:
+            return {}
+
+        # Exercise names: UUIDs from the main library first, legacy table
+        # for non-UUID ids and UUIDs not found there
+        exercise_ids = [ex["exercise_id"] for ex in template_exercises if ex.get("exercise_id")]
+        uuid_ids = [ex_id for ex_id in exercise_ids if self.UUID_PATTERN.match(str(ex_id))]
+        names: Dict[str, Optional[str]] = {}
+        if uuid_ids:
+            try:
+                for row in self._select_in("exercises_new", "id, name", "id", uuid_ids):
+                    names[row["id"]] = row.get("name")
+            except Exception as e:
+                print(f"⚠️ Could not load exercises: {str(e)}")
+        missing = [ex_id for ex_id in exercise_ids if ex_id not in names]
+        if missing:
+            try:
+                for row in self._select_in("exercises", "id, name", "id", missing):
+                    names[row["id"]] = row.get("name")
+            except Exception as e:
+                print(f"⚠️ Could not load legacy exercises: {str(e)}")
+
+        sets_by_exercise: Dict[str, List[Dict]] = {}
+        try:
+            for row in self._select_in(
+                "exercise_sets",
+                "workout_exercise_id, target_reps, target_weight",
+                "workout_exercise_id",
+                [ex["id"] for ex in template_exercises]
+            ):
+                sets_by_exercise.setdefault(row["workout_exercise_id"], []).append({
+                    "target_reps": row.get("target_reps"),
+                    "target_weight": row.get("target_weight")
+                })
+        except Exception as e:
+            print(f"⚠️ Could not load template exercise sets: {str(e)}")
+
+        exercises_by_template: Dict[str, List[Dict]] = {}
+        for ex in sorted(template_exercises, key=lambda row: row.get("order_index") or 0):
+            sets = sets_by_exercise.get(ex["id"], [])
+            exercises_by_template.setdefault(ex["workout_template_id"], []).append({
+                "name": names.get(ex["exercise_id"]) or "Unknown Exercise",
+                "order": ex["order_index"],
+                "sets_count": len(sets),
+                "sets": sets
+            })
+
+        return exercises_by_template
+
     # ═══════════════════════════════════════════════════════════════
     # NUTRITION DATA METHODS
     # ═══════════════════════════════════════════════════════════════
@@ -349,17 +486,19 @@ class UserContextBuilder:
             return None
 
         except Exception as e:
-            print(f"⚠️ No nutrition goal found: {str(e)}")
-            return None
+            print(f"⚠️ Error loading nutrition goal: {str(e)}")
+            raise
 
     def _get_nutrition_today(self, user_id: str) -> Optional[Dict]:
-        """Get today's nutrition log with meals"""
+        """Get today's nutrition log with meals (one embedded select)"""
         try:
             today = datetime.now().strftime("%Y-%m-%d")
 
-            # Get nutrition log for today
+            # Log, meals and items in a single round-trip
             result = self.client.table("nutrition_logs")\
-                .select("id, date, target_calories, target_protein, target_carbs, target_fat")\
+                .select("id, date, target_calories, target_protein, target_carbs, target_fat, "
+                        "meals(id, meal_type, meal_name, time, "
+                        "meal_items(item_name, calories, protein, carbs, fat, quantity, quantity_unit))")\
                 .eq("user_id", user_id)\
                 .eq("date", today)\
                 .limit(1)\
@@ -370,13 +509,6 @@ class UserContextBuilder:
                 return None
 
             log = result.data[0]
-            log_id = log["id"]
-
-            # Get meals for this log
-            meals_result = self.client.table("meals")\
-                .select("id, meal_type, meal_name, time")\
-                .eq("nutrition_log_id", log_id)\
-                .execute()
 
             meals = []
             total_calories = 0
@@ -384,17 +516,12 @@ class UserContextBuilder:
             total_carbs = 0
             total_fat = 0
 
-            for meal in meals_result.data or []:
-                # Get meal items
-                items_result = self.client.table("meal_items")\
-                    .select("item_name, calories, protein, carbs, fat, quantity, quantity_unit")\
-                    .eq("meal_id", meal["id"])\
-                    .execute()
-
-                meal_calories = sum(item.get("calories", 0) for item in items_result.data or [])
-                meal_protein = sum(item.get("protein", 0) for item in items_result.data or [])
-                meal_carbs = sum(item.get("carbs", 0) for item in items_result.data or [])
-                meal_fat = sum(item.get("fat", 0) for item in items_result.data or [])
+            for meal in log.get("meals") or []:
+                items = meal.get("meal_items") or []
+                meal_calories = sum(item.get("calories") or 0 for item in items)
+                meal_protein = sum(item.get("protein") or 0 for item in items)
+                meal_carbs = sum(item.get("carbs") or 0 for item in items)
+                meal_fat = sum(item.get("fat") or 0 for item in items)
 
                 total_calories += meal_calories
                 total_protein += meal_protein
@@ -409,9 +536,12 @@ class UserContextBuilder:
                     "protein": meal_protein,
                     "carbs": meal_carbs,
                     "fat": meal_fat,
-                    "items": [item.get("item_name", "") for item in items_result.data or []]
+                    "items": [item.get("item_name", "") for item in items]
                 })
 
+            # Embedded rows come back unordered
+            meals.sort(key=lambda meal: meal["time"] or "")
+
             nutrition_today = {
                 "date": today,
                 "target_calories": log.get("target_calories", 2500),
@@ -431,70 +561,108 @@ class UserContextBuilder:
 
         except Exception as e:
             print(f"⚠️ Error loading today's nutrition: {str(e)}")
-            return None
+            raise
+
+    def _get_daily_nutrition_totals(self, user_id: str, start_date: str, end_date: str) -> List[Dict]:
+        """
+        Daily macro totals for a date range in one call.
+
+        Uses the get_nutrition_daily_totals RPC (supabase_nutrition_daily_totals_rpc.sql)
+        and falls back to a single embedded select summed here if the function
+        is not installed. Raises on query errors.
+
+        Returns:
+            [{date, calories, protein, carbs, fat, meals_count}] ordered by date
+        """
+        global _daily_totals_rpc_available
+
+        if _daily_totals_rpc_available:
+            try:
+                result = self.client.rpc("get_nutrition_daily_totals", {
+                    "p_user_id": user_id,
+                    "p_start_date": start_date,
+                    "p_end_date": end_date
+                }).execute()
+                return [{
+                    "date": row["date"],
+                    "calories": row.get("calories") or 0,
+                    "protein": row.get("protein") or 0,
+                    "carbs": row.get("carbs") or 0,
+                    "fat": row.get("fat") or 0,
+                    "meals_count": row.get("meals_count") or 0
+                } for row in result.data or []]
+            except Exception as e:
+                if "get_nutrition_daily_totals" in str(e) or "PGRST202" in str(e):
+                    _daily_totals_rpc_available = False
+                print(f"⚠️ Daily totals RPC failed, using embedded select: {str(e)}")
+
+        result = self.client.table("nutrition_logs")\
+            .select("date, meals(id, meal_items(calories, protein, carbs, fat))")\
+            .eq("user_id", user_id)\
+            .gte("date", start_date)\
+            .lte("date", end_date)\
+            .order("date")\
+            .execute()
+
+        days = []
+        for log in result.data or []:
+            meals = log.get("meals") or []
+            items = [item for meal in meals for item in meal.get("meal_items") or []]
+            days.append({
+                "date": log["date"],
+                "calories": sum(item.get("calories") or 0 for item in items),
+                "protein": sum(item.get("protein") or 0 for item in items),
+                "carbs": sum(item.get("carbs") or 0 for item in items),
+                "fat": sum(item.get("fat") or 0 for item in items),
+                "meals_count": len(meals)
+            })
+        return days
 
     def _get_nutrition_weekly_summary(self, user_id: str) -> Optional[Dict]:
-        """Get nutrition summary for the past 7 days"""
+        """
+        Get nutrition summary for the past 7 days
+
+        Completed days are served from the shared rollup cache; only today's
+        totals are queried on a cache hit.
+        """
         try:
             today = datetime.now()
-            week_ago = today - timedelta(days=7)
             today_str = today.strftime("%Y-%m-%d")
-            week_ago_str = week_ago.strftime("%Y-%m-%d")
+            yesterday_str = (today - timedelta(days=1)).strftime("%Y-%m-%d")
+            week_ago_str = (today - timedelta(days=7)).strftime("%Y-%m-%d")
 
-            # Get nutrition logs for the past week
-            result = self.client.table("nutrition_logs")\
-                .select("id, date")\
-                .eq("user_id", user_id)\
-                .gte("date", week_ago_str)\
-                .lte("date", today_str)\
-                .execute()
+            fetched = {}
 
-            if not result.data:
-                print(f"ℹ️ No nutrition logs for the past week")
-                return None
+            def load_completed_days() -> List[Dict]:
+                # Cold cache: fetch the whole week at once, keep today aside
+                days = self._get_daily_nutrition_totals(user_id, week_ago_str, today_str)
+                fetched["today"] = [day for day in days if day["date"] == today_str]
+                return [day for day in days if day["date"] != today_str]
+
+            completed_days = nutrition_rollup_cache.get_or_load((user_id, yesterday_str), load_completed_days)
+            if "today" in fetched:
+                today_days = fetched["today"]
+            else:
+                today_days = self._get_daily_nutrition_totals(user_id, today_str, today_str)
 
-            days_with_data = []
-            total_calories_week = 0
-            total_protein_week = 0
-
-            for log in result.data:
-                log_id = log["id"]
-
-                # Get meals for this log
-                meals_result = self.client.table("meals")\
-                    .select("id")\
-                    .eq("nutrition_log_id", log_id)\
-                    .execute()
-
-                if meals_result.data and len(meals_result.data) > 0:
-                    day_calories = 0
-                    day_protein = 0
-
-                    for meal in meals_result.data:
-                        items_result = self.client.table("meal_items")\
-                            .select("calories, protein")\
-                            .eq("meal_id", meal["id"])\
-                            .execute()
-
-                        day_calories += sum(item.get("calories", 0) for item in items_result.data or [])
-                        day_protein += sum(item.get("protein", 0) for item in items_result.data or [])
-
-                    if day_calories > 0:  # Only count days with actual food logged
-                        days_with_data.append({
-                            "date": log["date"],
-                            "calories": day_calories,
-                            "protein": day_protein
-                        })
-                        total_calories_week += day_calories
-                        total_protein_week += day_protein
+            # Only count days with actual food logged
+            days_with_data = [
+                {"date": day["date"], "calories": day["calories"], "protein": day["protein"]}
+                for day in completed_days + today_days
+                if day["calories"] > 0
+            ]
 
             if not days_with_data:
+                print(f"ℹ️ No nutrition logs for the past week")
                 return None
 
+            total_calories_week = sum(day["calories"] for day in days_with_data)
+            total_protein_week = sum(day["protein"] for day in days_with_data)
+
             weekly_summary = {
                 "days_logged": len(days_with_data),
-                "avg_daily_calories": total_calories_week / len(days_with_data) if days_with_data else 0,
-                "avg_daily_protein": total_protein_week / len(days_with_data) if days_with_data else 0,
+                "avg_daily_calories": total_calories_week / len(days_with_data),
+                "avg_daily_protein": total_protein_week / len(days_with_data),
                 "total_calories_week": total_calories_week,
                 "total_protein_week": total_protein_week,
                 "daily_breakdown": days_with_data
@@ -505,7 +673,7 @@ class UserContextBuilder:
 
         except Exception as e:
             print(f"⚠️ Error loading weekly nutrition: {str(e)}")
-            return None
+            raise
 
     def _calculate_macro_quality(self, nutrition_today: Optional[Dict]) -> Optional[Dict]:
         """
@@ -768,12 +936,32 @@ class UserContextBuilder:
 
         except Exception as e:
             print(f"⚠️ Error checking anabolic window: {str(e)}")
-            return None
+            raise
+
+    def get_system_prompt(self, user_id: str, user_context: Dict) -> str:
+        """
+        format_system_prompt, reusing the previous render when none of the
+        user's sections (or the shared catalog / templates) changed.
+        """
+        cache = get_user_context_cache()
+        shared = (user_context.get("exercises"), user_context.get("public_templates"))
+        if not user_context.get("skipped_sections"):
+            prompt = cache.get_prompt(user_id, shared)
+            if prompt is not None:
+                return prompt
+
+        prompt = self.format_system_prompt(user_context)
+        if not user_context.get("skipped_sections"):
+            cache.store_prompt(user_id, prompt, shared)
+        return prompt
 
     def format_system_prompt(self, user_context: Dict) -> str:
         """
         Build rich system prompt with user context
 
+        Sections are rendered once per context value and filled by priority
+        within the prompt token budget (see prompt_builder).
+
         Args:
             user_context: Dict from build_user_context()
 
@@ -791,23 +979,73 @@ class UserContextBuilder:
         macro_quality = user_context.get("macro_quality")
         anabolic_window = user_context.get("anabolic_window")
 
-        # DETAILED DEBUG LOGGING
-        print(f"\n{'='*60}")
-        print(f"🔍 BUILDING SYSTEM PROMPT - DEBUG INFO")
-        print(f"{'='*60}")
-        print(f"Profile exists: {profile is not None}")
-        print(f"PRs count: {len(prs) if isinstance(prs, list) else 'N/A'}")
-        print(f"Exercises count: {len(exercises)}")
-        print(f"User's own templates count: {len(user_workouts) if user_workouts else 0}")
-        if user_workouts and len(user_workouts) > 0:
-            print(f"User's templates: {[t.get('name', 'NO NAME') for t in user_workouts[:5]]}")
-        print(f"Public templates count: {len(public_templates) if public_templates else 0}")
-        if public_templates and len(public_templates) > 0:
-            print(f"First public template: {public_templates[0].get('name', 'NO NAME')}")
-        print(f"{'='*60}\n")
-
-        # Basic coach style - Menopause Wellness Coach
-        base_prompt = """Du bist eine erfahrene Menopause-Wellness-Beraterin, die mit ihrer Klientin spricht.
+        # Add user-specific context if available
+        if not profile:
+            return COACH_BASE_PROMPT
+
+        builder = PromptBuilder()
+
+        # Priority: 0 = always, then lower fills first
+        builder.add("base", render_section("base", (COACH_BASE_PROMPT,), _render_text), required=True)
+        builder.add("profile", render_section("profile", (profile,), _render_profile), required=True)
+        if prs:
+            builder.add("prs", render_section("prs", (prs,), _render_prs), priority=1)
+        builder.add("limitations", render_section("limitations", (profile,), _render_limitations), priority=1)
+        if exercises:
+            builder.add("exercises", render_section("exercises", (exercises,), _render_exercises), priority=5)
+        if user_workouts:
+            builder.add(
+                "user_templates",
+                render_section("user_templates", (user_workouts,), _render_user_templates),
+                priority=3,
+                overflow="\n... and {remaining} more of the athlete's templates"
+            )
+        if public_templates:
+            builder.add(
+                "public_templates",
+                render_section("public_templates", (public_templates,), _render_public_templates),
+                priority=4,
+                overflow="\n... and {remaining} more templates available"
+            )
+
+        nutrition_sources = (nutrition_goal, nutrition_today, nutrition_weekly)
+        if any(nutrition_sources):
+            builder.add("nutrition", render_section("nutrition", nutrition_sources, _render_nutrition), priority=2)
+        if macro_quality:
+            builder.add("macro_quality", render_section("macro_quality", (macro_quality,), _render_macro_quality), priority=6)
+        if anabolic_window:
+            builder.add("anabolic_window", render_section("anabolic_window", (anabolic_window,), _render_anabolic_window), priority=1)
+        if any(nutrition_sources):
+            builder.add("nutrition_guidelines", render_section("nutrition_guidelines", (NUTRITION_GUIDELINES,), _render_text), priority=2)
+        if anabolic_window and anabolic_window.get("urgency") in ["CRITICAL", "HIGH"]:
+            builder.add("post_workout", render_section("post_workout", (POST_WORKOUT_GUIDELINES,), _render_text), priority=1)
+        builder.add("coaching_guidelines", render_section("coaching_guidelines", (COACHING_GUIDELINES,), _render_text), required=True)
+
+        final_prompt, report = builder.build()
+        self.last_prompt_report = report
+
+        dropped = [name for name, entry in report["sections"].items() if entry.get("dropped")]
+        truncated = [
+            f"{name} {entry['items']}/{entry['items_total']}"
+            for name, entry in report["sections"].items()
+            if not entry.get("dropped") and entry["items"] < entry["items_total"]
+        ]
+        print(f"✅ System prompt: {report['total_tokens']}/{report['budget']} tokens ({report['tokenizer']}), "
+              f"{len(final_prompt)} chars"
+              + (f", truncated: {', '.join(truncated)}" if truncated else "")
+              + (f", dropped: {', '.join(dropped)}" if dropped else ""))
+
+        return final_prompt
+
+
+# ═══════════════════════════════════════════════════════════════
+# SYSTEM PROMPT SECTIONS
+# Renderers return (header, items, footer); items are what the token
+# budget cuts when a list section doesn't fit.
+# ═══════════════════════════════════════════════════════════════
+
+# Basic coach style - Menopause Wellness Coach
+COACH_BASE_PROMPT = """Du bist eine erfahrene Menopause-Wellness-Beraterin, die mit ihrer Klientin spricht.
 
 Deine Expertise:
 - Perimenopause und Menopause Symptom-Management
@@ -825,282 +1063,8 @@ Dein Coaching-Stil:
 - Halte Antworten kurz und fokussiert (2-4 Sätze für Begrüssungen, 4-8 Sätze für Gesundheitsfragen)
 - Antworte IMMER auf Deutsch"""
 
-        # Add user-specific context if available
-        if not profile:
-            return base_prompt
-
-        user_name = profile.get("name", "athlete")
-        experience = profile.get("training_experience", 1)
-        training_days = profile.get("training_days_per_week", 3)
-        goals = profile.get("goals", [])
-        injuries = profile.get("injuries", [])
-        equipment = profile.get("equipment_access", [])
-        preferred_sports = profile.get("preferred_sports", [])
-
-        # Build rich context
-        context_parts = [base_prompt, f"\nATHLETE PROFILE:"]
-        context_parts.append(f"- Name: {user_name}")
-        context_parts.append(f"- Training experience: {experience} years")
-        context_parts.append(f"- Training frequency: {training_days} days/week")
-
-        if goals:
-            context_parts.append(f"- Primary goals: {', '.join(goals)}")
-
-        if preferred_sports:
-            context_parts.append(f"- Preferred sports: {', '.join(preferred_sports)}")
-
-        # Add PRs if available
-        if prs:
-            context_parts.append("\nPERSONAL RECORDS:")
-            for exercise_name, pr_data in prs.items():
-                weight = pr_data.get("weight", 0)
-                reps = pr_data.get("reps", 1)
-                context_parts.append(f"- {exercise_name}: {weight}kg x {reps} reps")
-
-        # Add injuries/limitations
-        if injuries:
-            context_parts.append("\nINJURIES & LIMITATIONS:")
-            for injury in injuries:
-                injury_type = injury.get("type", "Unknown")
-                notes = injury.get("notes", "")
-                context_parts.append(f"- {injury_type}: {notes}")
-
-        # Add equipment access
-        if equipment:
-            context_parts.append(f"\nAVAILABLE EQUIPMENT: {', '.join(equipment)}")
-
-        # Add exercise library (sample)
-        if exercises:
-            context_parts.append(f"\nAVAILABLE EXERCISES (you can recommend these):")
-            # Group by category
-            by_category = {}
-            for ex in exercises[:50]:  # Limit to prevent token overflow
-                cat = ex.get("category", "Other")
-                if cat not in by_category:
-                    by_category[cat] = []
-                by_category[cat].append(ex)
-
-            for category, exs in list(by_category.items())[:6]:  # Max 6 categories
-                context_parts.append(f"\n{category.upper()}:")
-                for ex in exs[:8]:  # Max 8 per category
-                    eq = ', '.join(ex.get("equipment", [])) if ex.get("equipment") else "Bodyweight"
-                    context_parts.append(f"  - {ex['name']} ({eq})")
-
-        # Add USER'S OWN workout templates (My Workout Templates)
-        print(f"🔍 DEBUG: user_workouts type={type(user_workouts)}, len={len(user_workouts) if user_workouts else 0}")
-        if user_workouts and len(user_workouts) > 0:
-            print(f"✅ Adding {len(user_workouts)} USER templates to system prompt")
-            context_parts.append(f"\nATHLETE'S OWN WORKOUT TEMPLATES ({len(user_workouts)} templates):")
-            context_parts.append("These are workouts the athlete has saved or created. You should prioritize these when they ask about 'my workouts' or 'my templates':")
-
-            for template in user_workouts[:10]:  # Show max 10 user templates
-                context_parts.append(f"\n• {template['name']}")
-                if template.get('description'):
-                    context_parts.append(f"  Description: {template['description']}")
-
-                # Show exercises
-                template_exercises = template.get('exercises', [])
-                for ex in template_exercises[:5]:
-                    sets_info = f"{ex['sets_count']} sets"
-                    context_parts.append(f"  - {ex['name']}: {sets_info}")
-
-                if len(template_exercises) > 5:
-                    context_parts.append(f"  ... and {len(template_exercises) - 5} more exercises")
-
-            context_parts.append("\nWhen the athlete asks about 'my workouts', 'my templates', or similar, refer to these templates.")
-        else:
-            print(f"⚠️ No user workout templates available")
-
-        # Add public workout templates
-        print(f"🔍 DEBUG: public_templates type={type(public_templates)}, len={len(public_templates) if public_templates else 0}")
-        if public_templates and len(public_templates) > 0:
-            print(f"✅ Adding {len(public_templates)} templates to system prompt")
-            context_parts.append(f"\nPUBLIC WORKOUT TEMPLATES LIBRARY ({len(public_templates)} templates available):")
-            context_parts.append("You can recommend these pre-built workouts to the athlete:")
-
-            for template in public_templates[:15]:  # Show max 15 templates
-                sports_str = f" ({', '.join(template.get('sports', []))})" if template.get('sports') else ""
-                template_id = template.get('id', '')
-                context_parts.append(f"\n• {template['name']}{sports_str} [ID: {template_id}]")
-
-                # Show first 5 exercises
-                exercises = template.get('exercises', [])
-                for ex in exercises[:5]:
-                    sets_info = f"{ex['sets_count']} sets"
-                    context_parts.append(f"  - {ex['name']}: {sets_info}")
-
-                if len(exercises) > 5:
-                    context_parts.append(f"  ... and {len(exercises) - 5} more exercises")
-
-            if len(public_templates) > 15:
-                context_parts.append(f"\n... and {len(public_templates) - 15} more templates available")
-
-            context_parts.append("\n🎯 YOU CAN RECOMMEND WORKOUTS! When the athlete asks for a workout, you MUST:")
-            context_parts.append("1. Look at the templates above and pick one that matches their goals/sports")
-            context_parts.append("2. Tell them about the workout (what it targets, exercises included)")
-            context_parts.append("3. Add the special marker at the END of your message so they can start it directly")
-
-            context_parts.append("\n⚠️ CRITICAL - TEMPLATE RECOMMENDATION FORMAT:")
-            context_parts.append("When you recommend ANY template, you MUST add this marker at the END of your message:")
-            context_parts.append("[RECOMMEND_TEMPLATE:template_id:Template Name]")
-            context_parts.append("")
-            context_parts.append("EXAMPLE: If recommending 'Push Day A' with ID 'abc-123-def', your message should end with:")
-            context_parts.append("[RECOMMEND_TEMPLATE:abc-123-def:Push Day A]")
-            context_parts.append("")
-            context_parts.append("The app will show a clickable card with a 'Start Workout' button.")
-            context_parts.append("You HAVE access to workout templates - you are NOT just a text assistant!")
-            context_parts.append("Always recommend a template when the user asks for a workout or exercise routine.")
-        else:
-            print(f"⚠️ No public templates available to add to system prompt")
-
-        # ═══════════════════════════════════════════════════════════════
-        # NUTRITION SECTION
-        # ═══════════════════════════════════════════════════════════════
-        nutrition_section_added = False
-
-        if nutrition_goal or nutrition_today or nutrition_weekly:
-            context_parts.append("\n" + "="*50)
-            context_parts.append("NUTRITION DATA")
-            context_parts.append("="*50)
-            nutrition_section_added = True
-
-        # Nutrition Goal
-        if nutrition_goal:
-            goal_type = nutrition_goal.get("goal_type", "maintenance") or "maintenance"
-            target_cal = nutrition_goal.get("target_calories") or 2500
-            target_pro = nutrition_goal.get("target_protein") or 180
-            target_carbs = nutrition_goal.get("target_carbs") or 280
-            target_fat = nutrition_goal.get("target_fat") or 80
-
-            context_parts.append(f"\nNUTRITION GOAL: {goal_type.upper()}")
-            context_parts.append(f"- Daily targets: {int(target_cal)} kcal | {int(target_pro)}g protein | {int(target_carbs)}g carbs | {int(target_fat)}g fat")
-
-        # Today's Nutrition
-        if nutrition_today:
-            consumed_cal = nutrition_today.get("consumed_calories") or 0
-            consumed_pro = nutrition_today.get("consumed_protein") or 0
-            consumed_carbs = nutrition_today.get("consumed_carbs") or 0
-            consumed_fat = nutrition_today.get("consumed_fat") or 0
-            target_cal = nutrition_today.get("target_calories") or 2500
-            target_pro = nutrition_today.get("target_protein") or 180
-            meals = nutrition_today.get("meals", [])
-
-            context_parts.append(f"\nTODAY'S NUTRITION STATUS:")
-            context_parts.append(f"- Calories: {int(consumed_cal)}/{int(target_cal)} kcal ({int(target_cal - consumed_cal)} remaining)")
-            context_parts.append(f"- Protein: {int(consumed_pro)}/{int(target_pro)}g ({int(target_pro - consumed_pro)}g remaining)")
-            context_parts.append(f"- Carbs: {int(consumed_carbs)}g | Fat: {int(consumed_fat)}g")
-            context_parts.append(f"- Meals logged today: {len(meals)}")
-
-            if meals:
-                context_parts.append("\nMeals eaten today:")
-                for meal in meals:
-                    meal_type = (meal.get("meal_type") or "meal").capitalize()
-                    meal_name = meal.get("meal_name") or "Unknown"
-                    meal_cal = meal.get("calories") or 0
-                    meal_pro = meal.get("protein") or 0
-                    items = meal.get("items", [])
-                    items_str = ", ".join(items[:3]) if items else "various items"
-                    if len(items) > 3:
-                        items_str += f" +{len(items)-3} more"
-                    context_parts.append(f"  • {meal_type}: {meal_name} ({int(meal_cal)} kcal, {int(meal_pro)}g protein) - {items_str}")
-
-        # Weekly Summary
-        if nutrition_weekly:
-            days_logged = nutrition_weekly.get("days_logged") or 0
-            avg_cal = nutrition_weekly.get("avg_daily_calories") or 0
-            avg_pro = nutrition_weekly.get("avg_daily_protein") or 0
-
-            context_parts.append(f"\nWEEKLY NUTRITION SUMMARY (last 7 days):")
-            context_parts.append(f"- Days with food logged: {days_logged}/7")
-            context_parts.append(f"- Average daily intake: {int(avg_cal)} kcal, {int(avg_pro)}g protein")
-
-            # Consistency feedback
-            if days_logged >= 5:
-                context_parts.append("- Tracking consistency: EXCELLENT")
-            elif days_logged >= 3:
-                context_parts.append("- Tracking consistency: GOOD")
-            else:
-                context_parts.append("- Tracking consistency: NEEDS IMPROVEMENT")
-
-        # ═══════════════════════════════════════════════════════════════
-        # MACRO QUALITY SECTION (DIAAS, Glycemic Index)
-        # ═══════════════════════════════════════════════════════════════
-        if macro_quality:
-            context_parts.append("\nMACRO QUALITY ANALYSIS:")
-
-            # Protein Quality
-            pq = macro_quality.get("protein_quality", {})
-            if pq:
-                diaas = pq.get("weighted_diaas", 0)
-                pq_level = pq.get("quality_level", "MODERATE")
-                hq_percent = pq.get("high_quality_percent", 0)
-                pq_suggestion = pq.get("suggestion")
-
-                context_parts.append(f"\nPROTEIN QUALITY: {pq_level}")
-                context_parts.append(f"- DIAAS Score: {diaas:.2f} (1.0+ = excellent bioavailability)")
-                context_parts.append(f"- High-quality protein: {hq_percent:.0f}% of total")
-                if pq_suggestion:
-                    context_parts.append(f"- Suggestion: {pq_suggestion}")
-
-                # Top protein sources
-                top_sources = pq.get("top_sources", [])
-                if top_sources:
-                    sources_str = ", ".join([f"{s['name']} ({s['quality']})" for s in top_sources[:3]])
-                    context_parts.append(f"- Top sources today: {sources_str}")
-
-            # Carb Quality
-            cq = macro_quality.get("carb_quality", {})
-            if cq:
-                avg_gi = cq.get("average_gi", 55)
-                cq_level = cq.get("quality_level", "MODERATE")
-                low_gi_percent = cq.get("low_gi_percent", 50)
-                cq_suggestion = cq.get("suggestion")
-
-                context_parts.append(f"\nCARB QUALITY: {cq_level}")
-                context_parts.append(f"- Average Glycemic Index: {avg_gi:.0f} (<55=low, 55-70=medium, >70=high)")
-                context_parts.append(f"- Low-GI carbs: {low_gi_percent:.0f}% of total")
-                if cq_suggestion:
-                    context_parts.append(f"- Suggestion: {cq_suggestion}")
-
-            overall = macro_quality.get("overall_quality", "MODERATE")
-            context_parts.append(f"\nOVERALL NUTRITION QUALITY: {overall}")
-
-        # ═══════════════════════════════════════════════════════════════
-        # ANABOLIC WINDOW SECTION
-        # ═══════════════════════════════════════════════════════════════
-        if anabolic_window:
-            urgency = anabolic_window.get("urgency", "MODERATE")
-            remaining = anabolic_window.get("minutes_remaining", 0)
-            extended_remaining = anabolic_window.get("extended_minutes_remaining", 0)
-            was_fasted = anabolic_window.get("was_fasted", False)
-            workout_type = anabolic_window.get("workout_type", "strength")
-
-            context_parts.append("\n" + "!"*50)
-            context_parts.append("ANABOLIC WINDOW ACTIVE!")
-            context_parts.append("!"*50)
-
-            if remaining > 0:
-                context_parts.append(f"⏰ PRIMARY WINDOW: {remaining} minutes remaining")
-                context_parts.append(f"Urgency: {urgency}")
-            else:
-                context_parts.append(f"⏰ EXTENDED WINDOW: {extended_remaining} minutes remaining")
-                context_parts.append("Primary window closed, but protein intake still beneficial")
-
-            if was_fasted:
-                context_parts.append("⚠️ FASTED WORKOUT - protein intake is CRITICAL within 30min!")
-
-            context_parts.append(f"Workout type: {workout_type}")
-            context_parts.append("Recommendation: 30-40g complete protein (whey, eggs, chicken)")
-
-            # Urgency-specific messaging
-            if urgency == "CRITICAL":
-                context_parts.append("\n🚨 CRITICAL: Less than 10 minutes left! Prioritize immediate protein intake!")
-            elif urgency == "HIGH":
-                context_parts.append("\n⚡ HIGH PRIORITY: Window closing soon. Suggest quick protein options.")
-
-        # Add nutrition coaching guidelines - Menopause-focused
-        if nutrition_section_added:
-            context_parts.append("""
+# Nutrition coaching guidelines - Menopause-focused
+NUTRITION_GUIDELINES = """
 MENOPAUSE-ERNÄHRUNGSBERATUNG:
 - Beziehe dich auf die tatsächliche Nahrungsaufnahme
 - Sei spezifisch: "Ich sehe, du hast heute {x}mg Calcium bekommen, du brauchst noch etwa {y}mg"
@@ -1126,18 +1090,17 @@ PHYTOÖSTROGEN-QUELLEN empfehlen:
 - Vollkornprodukte: Hafer, Gerste
 
 Verbinde Ernährung mit Symptomen: "Wenn du mehr Leinsamen isst, kann das bei Hitzewallungen helfen."
-Sei ermutigend, nicht belehrend - gib praktische, umsetzbare Tipps.""")
+Sei ermutigend, nicht belehrend - gib praktische, umsetzbare Tipps."""
 
-        # Add post-workout nutrition guidelines if active
-        if anabolic_window and anabolic_window.get("urgency") in ["CRITICAL", "HIGH"]:
-            context_parts.append("""
+# Post-workout nutrition guidelines (anabolic window CRITICAL / HIGH)
+POST_WORKOUT_GUIDELINES = """
 ⚠️ POST-WORKOUT ERNÄHRUNG PRIORITÄT:
 Wenn die Klientin dir schreibt, erwähne SOFORT das Ernährungsfenster nach dem Training!
 Beispiel: "Hey [Name], ich sehe du hast gerade trainiert - jetzt ist der perfekte Zeitpunkt für eine proteinreiche Mahlzeit. Hast du schon etwas gegessen? Ein Quark mit Beeren oder Eier wären jetzt ideal für Muskelerhalt und Knochengesundheit."
-Für Frauen in der Menopause ist Post-Workout Protein besonders wichtig für den Muskelerhalt!""")
+Für Frauen in der Menopause ist Post-Workout Protein besonders wichtig für den Muskelerhalt!"""
 
-        # Add coaching guidelines - Menopause-focused
-        context_parts.append("""
+# Coaching guidelines - Menopause-focused
+COACHING_GUIDELINES = """
 
 COACHING-RICHTLINIEN FÜR MENOPAUSE-WELLNESS:
 - Du KENNST diese Klientin persönlich - verwende ihren Namen und ihre Geschichte
@@ -1158,22 +1121,283 @@ SYMPTOM-BASIERTE EMPFEHLUNGEN:
 - Bei Brain Fog: Ausreichend Schlaf, Hydration, Omega-3
 - Bei Gelenkschmerzen: Sanfte Bewegung, Anti-entzündliche Ernährung
 
-KEINE generischen Ratschläge - alles muss personalisiert sein für {user_name}.""")
+KEINE generischen Ratschläge - alles muss personalisiert sein für {user_name}."""
 
-        final_prompt = "\n".join(context_parts)
 
-        # FINAL DEBUG LOGGING
-        print(f"\n{'='*60}")
-        print(f"✅ SYSTEM PROMPT COMPLETED")
-        print(f"{'='*60}")
-        print(f"Total prompt length: {len(final_prompt)} characters")
-        print(f"Contains 'PUBLIC WORKOUT TEMPLATES': {'PUBLIC WORKOUT TEMPLATES' in final_prompt}")
-        print(f"Number of template mentions: {final_prompt.count('WORKOUT:')}")
-        if 'PUBLIC WORKOUT TEMPLATES' in final_prompt:
-            # Show a snippet of the templates section
-            start_idx = final_prompt.find('PUBLIC WORKOUT TEMPLATES')
-            snippet = final_prompt[start_idx:start_idx+500]
-            print(f"Template section preview:\n{snippet}...")
-        print(f"{'='*60}\n")
+def _render_text(text: str) -> Tuple[str, List[str], str]:
+    return text, [], ""
 
-        return final_prompt
+
+def _render_profile(profile: Dict) -> Tuple[str, List[str], str]:
+    lines = ["\nATHLETE PROFILE:"]
+    lines.append(f"- Name: {profile.get('name', 'athlete')}")
+    lines.append(f"- Training experience: {profile.get('training_experience', 1)} years")
+    lines.append(f"- Training frequency: {profile.get('training_days_per_week', 3)} days/week")
+
+    goals = profile.get("goals", [])
+    if goals:
+        lines.append(f"- Primary goals: {', '.join(goals)}")
+
+    preferred_sports = profile.get("preferred_sports", [])
+    if preferred_sports:
+        lines.append(f"- Preferred sports: {', '.join(preferred_sports)}")
+
+    return "\n".join(lines), [], ""
+
+
+def _render_prs(prs: Dict) -> Tuple[str, List[str], str]:
+    items = []
+    for exercise_name, pr_data in prs.items():
+        weight = pr_data.get("weight", 0)
+        reps = pr_data.get("reps", 1)
+        items.append(f"- {exercise_name}: {weight}kg x {reps} reps")
+    return "\nPERSONAL RECORDS:", items, ""
+
+
+def _render_limitations(profile: Dict) -> Tuple[str, List[str], str]:
+    lines = []
+
+    injuries = profile.get("injuries", [])
+    if injuries:
+        lines.append("\nINJURIES & LIMITATIONS:")
+        for injury in injuries:
+            injury_type = injury.get("type", "Unknown")
+            notes = injury.get("notes", "")
+            lines.append(f"- {injury_type}: {notes}")
+
+    equipment = profile.get("equipment_access", [])
+    if equipment:
+        lines.append(f"\nAVAILABLE EQUIPMENT: {', '.join(equipment)}")
+
+    return "\n".join(lines), [], ""
+
+
+def _render_exercises(exercises: List[Dict]) -> Tuple[str, List[str], str]:
+    # Group by category; one item per category block
+    by_category = {}
+    for ex in exercises:
+        by_category.setdefault(ex.get("category", "Other"), []).append(ex)
+
+    items = []
+    for category, exs in by_category.items():
+        lines = [f"\n{category.upper()}:"]
+        for ex in exs[:8]:  # Max 8 per category keeps the list varied
+            eq = ', '.join(ex.get("equipment", [])) if ex.get("equipment") else "Bodyweight"
+            lines.append(f"  - {ex['name']} ({eq})")
+        items.append("\n".join(lines))
+
+    return "\nAVAILABLE EXERCISES (you can recommend these):", items, ""
+
+
+def _render_template_exercises(template: Dict) -> List[str]:
+    lines = []
+    template_exercises = template.get('exercises', [])
+    for ex in template_exercises[:5]:
+        sets_info = f"{ex['sets_count']} sets"
+        lines.append(f"  - {ex['name']}: {sets_info}")
+
+    if len(template_exercises) > 5:
+        lines.append(f"  ... and {len(template_exercises) - 5} more exercises")
+    return lines
+
+
+def _render_user_templates(user_workouts: List[Dict]) -> Tuple[str, List[str], str]:
+    header = "\n".join([
+        f"\nATHLETE'S OWN WORKOUT TEMPLATES ({len(user_workouts)} templates):",
+        "These are workouts the athlete has saved or created. You should prioritize these when they ask about 'my workouts' or 'my templates':"
+    ])
+
+    items = []
+    for template in user_workouts:
+        lines = [f"\n• {template['name']}"]
+        if template.get('description'):
+            lines.append(f"  Description: {template['description']}")
+        lines.extend(_render_template_exercises(template))
+        items.append("\n".join(lines))
+
+    footer = "\nWhen the athlete asks about 'my workouts', 'my templates', or similar, refer to these templates."
+    return header, items, footer
+
+
+def _render_public_templates(public_templates: List[Dict]) -> Tuple[str, List[str], str]:
+    header = "\n".join([
+        f"\nPUBLIC WORKOUT TEMPLATES LIBRARY ({len(public_templates)} templates available):",
+        "You can recommend these pre-built workouts to the athlete:"
+    ])
+
+    items = []
+    for template in public_templates:
+        sports_str = f" ({', '.join(template.get('sports', []))})" if template.get('sports') else ""
+        template_id = template.get('id', '')
+        lines = [f"\n• {template['name']}{sports_str} [ID: {template_id}]"]
+        lines.extend(_render_template_exercises(template))
+        items.append("\n".join(lines))
+
+    footer = "\n".join([
+        "\n🎯 YOU CAN RECOMMEND WORKOUTS! When the athlete asks for a workout, you MUST:",
+        "1. Look at the templates above and pick one that matches their goals/sports",
+        "2. Tell them about the workout (what it targets, exercises included)",
+        "3. Add the special marker at the END of your message so they can start it directly",
+        "\n⚠️ CRITICAL - TEMPLATE RECOMMENDATION FORMAT:",
+        "When you recommend ANY template, you MUST add this marker at the END of your message:",
+        "[RECOMMEND_TEMPLATE:template_id:Template Name]",
+        "",
+        "EXAMPLE: If recommending 'Push Day A' with ID 'abc-123-def', your message should end with:",
+        "[RECOMMEND_TEMPLATE:abc-123-def:Push Day A]",
+        "",
+        "The app will show a clickable card with a 'Start Workout' button.",
+        "You HAVE access to workout templates - you are NOT just a text assistant!",
+        "Always recommend a template when the user asks for a workout or exercise routine."
+    ])
+    return header, items, footer
+
+
+def _render_nutrition(
+    nutrition_goal: Optional[Dict],
+    nutrition_today: Optional[Dict],
+    nutrition_weekly: Optional[Dict]
+) -> Tuple[str, List[str], str]:
+    header = "\n".join(["\n" + "="*50, "NUTRITION DATA", "="*50])
+    items = []
+
+    # Nutrition Goal
+    if nutrition_goal:
+        goal_type = nutrition_goal.get("goal_type", "maintenance") or "maintenance"
+        target_cal = nutrition_goal.get("target_calories") or 2500
+        target_pro = nutrition_goal.get("target_protein") or 180
+        target_carbs = nutrition_goal.get("target_carbs") or 280
+        target_fat = nutrition_goal.get("target_fat") or 80
+
+        items.append("\n".join([
+            f"\nNUTRITION GOAL: {goal_type.upper()}",
+            f"- Daily targets: {int(target_cal)} kcal | {int(target_pro)}g protein | {int(target_carbs)}g carbs | {int(target_fat)}g fat"
+        ]))
+
+    # Today's Nutrition
+    if nutrition_today:
+        consumed_cal = nutrition_today.get("consumed_calories") or 0
+        consumed_pro = nutrition_today.get("consumed_protein") or 0
+        consumed_carbs = nutrition_today.get("consumed_carbs") or 0
+        consumed_fat = nutrition_today.get("consumed_fat") or 0
+        target_cal = nutrition_today.get("target_calories") or 2500
+        target_pro = nutrition_today.get("target_protein") or 180
+        meals = nutrition_today.get("meals", [])
+
+        lines = [
+            f"\nTODAY'S NUTRITION STATUS:",
+            f"- Calories: {int(consumed_cal)}/{int(target_cal)} kcal ({int(target_cal - consumed_cal)} remaining)",
+            f"- Protein: {int(consumed_pro)}/{int(target_pro)}g ({int(target_pro - consumed_pro)}g remaining)",
+            f"- Carbs: {int(consumed_carbs)}g | Fat: {int(consumed_fat)}g",
+            f"- Meals logged today: {len(meals)}"
+        ]
+
+        if meals:
+            lines.append("\nMeals eaten today:")
+            for meal in meals:
+                meal_type = (meal.get("meal_type") or "meal").capitalize()
+                meal_name = meal.get("meal_name") or "Unknown"
+                meal_cal = meal.get("calories") or 0
+                meal_pro = meal.get("protein") or 0
+                meal_items = meal.get("items", [])
+                items_str = ", ".join(meal_items[:3]) if meal_items else "various items"
+                if len(meal_items) > 3:
+                    items_str += f" +{len(meal_items)-3} more"
+                lines.append(f"  • {meal_type}: {meal_name} ({int(meal_cal)} kcal, {int(meal_pro)}g protein) - {items_str}")
+        items.append("\n".join(lines))
+
+    # Weekly Summary
+    if nutrition_weekly:
+        days_logged = nutrition_weekly.get("days_logged") or 0
+        avg_cal = nutrition_weekly.get("avg_daily_calories") or 0
+        avg_pro = nutrition_weekly.get("avg_daily_protein") or 0
+
+        lines = [
+            f"\nWEEKLY NUTRITION SUMMARY (last 7 days):",
+            f"- Days with food logged: {days_logged}/7",
+            f"- Average daily intake: {int(avg_cal)} kcal, {int(avg_pro)}g protein"
+        ]
+
+        # Consistency feedback
+        if days_logged >= 5:
+            lines.append("- Tracking consistency: EXCELLENT")
+        elif days_logged >= 3:
+            lines.append("- Tracking consistency: GOOD")
+        else:
+            lines.append("- Tracking consistency: NEEDS IMPROVEMENT")
+        items.append("\n".join(lines))
+
+    return header, items, ""
+
+
+def _render_macro_quality(macro_quality: Dict) -> Tuple[str, List[str], str]:
+    lines = ["\nMACRO QUALITY ANALYSIS:"]
+
+    # Protein Quality
+    pq = macro_quality.get("protein_quality", {})
+    if pq:
+        diaas = pq.get("weighted_diaas", 0)
+        pq_level = pq.get("quality_level", "MODERATE")
+        hq_percent = pq.get("high_quality_percent", 0)
+        pq_suggestion = pq.get("suggestion")
+
+        lines.append(f"\nPROTEIN QUALITY: {pq_level}")
+        lines.append(f"- DIAAS Score: {diaas:.2f} (1.0+ = excellent bioavailability)")
+        lines.append(f"- High-quality protein: {hq_percent:.0f}% of total")
+        if pq_suggestion:
+            lines.append(f"- Suggestion: {pq_suggestion}")
+
+        # Top protein sources
+        top_sources = pq.get("top_sources", [])
+        if top_sources:
+            sources_str = ", ".join([f"{s['name']} ({s['quality']})" for s in top_sources[:3]])
+            lines.append(f"- Top sources today: {sources_str}")
+
+    # Carb Quality
+    cq = macro_quality.get("carb_quality", {})
+    if cq:
+        avg_gi = cq.get("average_gi", 55)
+        cq_level = cq.get("quality_level", "MODERATE")
+        low_gi_percent = cq.get("low_gi_percent", 50)
+        cq_suggestion = cq.get("suggestion")
+
+        lines.append(f"\nCARB QUALITY: {cq_level}")
+        lines.append(f"- Average Glycemic Index: {avg_gi:.0f} (<55=low, 55-70=medium, >70=high)")
+        lines.append(f"- Low-GI carbs: {low_gi_percent:.0f}% of total")
+        if cq_suggestion:
+            lines.append(f"- Suggestion: {cq_suggestion}")
+
+    overall = macro_quality.get("overall_quality", "MODERATE")
+    lines.append(f"\nOVERALL NUTRITION QUALITY: {overall}")
+
+    return "\n".join(lines), [], ""
+
+
+def _render_anabolic_window(anabolic_window: Dict) -> Tuple[str, List[str], str]:
+    urgency = anabolic_window.get("urgency", "MODERATE")
+    remaining = anabolic_window.get("minutes_remaining", 0)
+    extended_remaining = anabolic_window.get("extended_minutes_remaining", 0)
+    was_fasted = anabolic_window.get("was_fasted", False)
+    workout_type = anabolic_window.get("workout_type", "strength")
+
+    lines = ["\n" + "!"*50, "ANABOLIC WINDOW ACTIVE!", "!"*50]
+
+    if remaining > 0:
+        lines.append(f"⏰ PRIMARY WINDOW: {remaining} minutes remaining")
+        lines.append(f"Urgency: {urgency}")
+    else:
+        lines.append(f"⏰ EXTENDED WINDOW: {extended_remaining} minutes remaining")
+        lines.append("Primary window closed, but protein intake still beneficial")
+
+    if was_fasted:
+        lines.append("⚠️ FASTED WORKOUT - protein intake is CRITICAL within 30min!")
+
+    lines.append(f"Workout type: {workout_type}")
+    lines.append("Recommendation: 30-40g complete protein (whey, eggs, chicken)")
+
+    # Urgency-specific messaging
+    if urgency == "CRITICAL":
+        lines.append("\n🚨 CRITICAL: Less than 10 minutes left! Prioritize immediate protein intake!")
+    elif urgency == "HIGH":
+        lines.append("\n⚡ HIGH PRIORITY: Window closing soon. Suggest quick protein options.")
+
+    return "\n".join(lines), [], ""
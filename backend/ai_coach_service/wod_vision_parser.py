@@ -9,7 +9,11 @@ import base64
 import re
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
-from openai import OpenAI
+
+try:
+    from ai_coach_service.openai_pool import chat_completion
+except ImportError:
+    from .openai_pool import chat_completion
 
 
 class WodVisionParser:
@@ -19,14 +23,12 @@ class WodVisionParser:
     """
 
     def __init__(self):
-        api_key = os.environ.get("OPENAI_API_KEY")
-        if not api_key:
+        if not os.environ.get("OPENAI_API_KEY"):
             raise ValueError("OPENAI_API_KEY environment variable is required")
 
-        self.client = OpenAI(api_key=api_key)
         self.model = "gpt-4o"  # Vision-capable model
 
-    def parse_wod_image(
+    async def parse_wod_image(
         self,
         image_base64: str,
         image_type: str = "image/jpeg",
@@ -54,7 +56,8 @@ class WodVisionParser:
             image_url = f"data:{image_type};base64,{image_base64}"
 
             # Call Vision API
-            response = self.client.chat.completions.create(
+            response = await chat_completion(
+                "scan_wod",
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -327,7 +330,7 @@ Return ONLY valid JSON with the workout structure. Do not include any explanatio
 
         return wod_data
 
-    def parse_wod_from_url(self, image_url: str, additional_context: Optional[str] = None) -> Dict:
+    async def parse_wod_from_url(self, image_url: str, additional_context: Optional[str] = None) -> Dict:
         """
         Parse a WOD from an image URL (e.g., Supabase Storage URL)
 
@@ -344,7 +347,8 @@ Return ONLY valid JSON with the workout structure. Do not include any explanatio
             system_prompt = self._build_system_prompt()
             user_prompt = self._build_user_prompt(additional_context)
 
-            response = self.client.chat.completions.create(
+            response = await chat_completion(
+                "scan_wod_url",
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -653,7 +657,8 @@ if __name__ == "__main__":
         with open(image_path, "rb") as f:
             image_data = base64.b64encode(f.read()).decode("utf-8")
 
-        result = parser.parse_wod_image(image_data)
+        import asyncio
+        result = asyncio.run(parser.parse_wod_image(image_data))
         print(json.dumps(result, indent=2))
     else:
         print("Usage: python wod_vision_parser.py <image_path>")
\ No newline at end of file
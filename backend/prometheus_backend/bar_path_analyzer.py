@@ -0,0 +1,478 @@
+"""
+Bar Path Analyzer - Per-rep trajectory analytics for VBT
+
+Computes coaching metrics from the tracked bar trajectory:
+- Bar path deviation (max horizontal distance from the rep's start line)
+- Horizontal drift (net horizontal displacement start -> end of rep)
+- Sticking point (slowest point of the concentric phase)
+- Time under tension (eccentric + concentric duration)
+
+The trajectory can come from the Neiro BarbellTracker (pixel positions)
+or from MediaPipe wrist landmarks (normalized positions in pose_data).
+All per-rep metrics are computed in one vectorized NumPy pass over the
+whole set instead of looping over reps. The trajectory is resampled to a
+uniform grid and zero-phase low-pass filtered (signal_kernels) first, so
+sticking-point velocities are not skewed by frame skipping or lag.
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from .signal_kernels import differentiate, estimate_sample_rate, lowpass_filter, resample_uniform
+
+
+class BarPathAnalyzer:
+    """Vectorized bar path, drift, sticking point and TUT analysis per rep"""
+
+    # MediaPipe wrist landmarks (bar sits in the hands)
+    WRIST_LANDMARKS = (15, 16)
+    MIN_VISIBILITY = 0.5
+
+    # A rep must travel at least this fraction of the set's vertical range
+    MIN_ROM_FRACTION = 0.35
+    # ...and at least this fraction of the frame height (ignores idle jitter)
+    MIN_ROM_FRAME_FRACTION = 0.03
+
+    # Zero-phase low-pass cutoff applied before segmentation (bar motion
+    # during a lift stays well below this; tracker/landmark jitter does not)
+    CUTOFF_HZ = 6.0
+
+    # Sticking point search window (fraction of concentric ROM)
+    STICKING_SEARCH_RANGE = (0.1, 0.9)
+
+    def __init__(self, calibration_manager=None, verbose: bool = False):
+        """
+        Initialize the analyzer.
+
+        Args:
+            calibration_manager: Optional CalibrationManager for m conversion
+            verbose: Enable verbose logging
+        """
+        self.calibration_manager = calibration_manager
+        self.verbose = verbose
+
+    # ═══════════════════════════════════════════════════════════════
+    # TRAJECTORY SOURCES
+    # ═══════════════════════════════════════════════════════════════
+
+    def trajectory_from_pose_data(
+        self,
+        pose_data: Dict
+    ) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Build a bar trajectory from the wrist landmarks in pose_data.
+
+        Uses the visibility-weighted midpoint of both wrists, converted to
+        pixel coordinates so it matches BarbellTracker output.
+
+        Returns:
+            (timestamps_s, x_px, y_px) or None if not enough visible frames
+        """
+        frames = pose_data.get("frames", []) if pose_data else []
+        if len(frames) < 3:
+            return None
+
+        width = pose_data.get("width") or 1
+        height = pose_data.get("height") or 1
+
+        # (F, 2 wrists, 3) -> x, y, visibility
+        wrists = np.array([
+            [
+                [
+                    frame["landmarks"][idx]["x"],
+                    frame["landmarks"][idx]["y"],
+                    frame["landmarks"][idx]["visibility"]
+                ]
+                for idx in self.WRIST_LANDMARKS
+            ]
+            for frame in frames
+        ], dtype=np.float64)
+        timestamps = np.array([frame["timestamp"] for frame in frames], dtype=np.float64)
+
+        weights = (wrists[:, :, 2] > self.MIN_VISIBILITY).astype(np.float64)
+        visible = weights.sum(axis=1)
+        valid = visible > 0
+        if valid.sum() < 3:
+            return None
+
+        x = (wrists[valid, :, 0] * weights[valid]).sum(axis=1) / visible[valid] * width
+        y = (wrists[valid, :, 1] * weights[valid]).sum(axis=1) / visible[valid] * height
+
+        return timestamps[valid], x, y
+
+    @staticmethod
+    def trajectory_from_tracker(
+        points: List[Dict]
+    ) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Build a bar trajectory from BarbellTracker results.
+
+        Args:
+            points: List of {"t": seconds, "x": px, "y": px, "conf": float};
+                    frames without a detection (conf == 0) are skipped
+
+        Returns:
+            (timestamps_s, x_px, y_px) or None if not enough detections
+        """
+        if not points:
+            return None
+
+        data = np.array(
+            [[p.get("t", 0.0), p.get("x", 0.0), p.get("y", 0.0), p.get("conf", 0.0)] for p in points],
+            dtype=np.float64
+        )
+        data = data[data[:, 3] > 0]
+        if len(data) < 3:
+            return None
+
+        return data[:, 0], data[:, 1], data[:, 2]
+
+    # ═══════════════════════════════════════════════════════════════
+    # ANALYSIS
+    # ═══════════════════════════════════════════════════════════════
+
+    def analyze_pose_data(self, pose_data: Dict) -> Dict:
+        """Analyze the wrist-landmark trajectory of a processed video"""
+        trajectory = self.trajectory_from_pose_data(pose_data)
+        if trajectory is None:
+            return self._empty_result("wrist_landmarks", "Not enough visible wrist landmarks")
+
+        t, x, y = trajectory
+
+        # Depth-calibrated videos: perspective-correct scale per sample
+        pixels_per_meter = None
+        if self.calibration_manager is not None and self.calibration_manager.has_per_frame_scale():
+            fps = pose_data.get("fps") or 30.0
+            pixels_per_meter = self.calibration_manager.pixels_per_meter_at(t * fps)
+
+        return self.analyze(
+            t, x, y,
+            frame_height=pose_data.get("height"),
+            source="wrist_landmarks",
+            pixels_per_meter=pixels_per_meter,
+            frame_width=pose_data.get("width")
+        )
+
+    def analyze_tracker_points(self, points: List[Dict], frame_height: Optional[float] = None) -> Dict:
+        """Analyze a BarbellTracker trajectory"""
+        trajectory = self.trajectory_from_tracker(points)
+        if trajectory is None:
+            return self._empty_result("barbell_tracker", "Not enough barbell detections")
+
+        t, x, y = trajectory
+        return self.analyze(t, x, y, frame_height=frame_height, source="barbell_tracker")
+
+    def analyze(
+        self,
+        t: np.ndarray,
+        x: np.ndarray,
+        y: np.ndarray,
+        frame_height: Optional[float] = None,
+        source: str = "trajectory",
+        pixels_per_meter: Optional[np.ndarray] = None,
+        frame_width: Optional[float] = None
+    ) -> Dict:
+        """
+        Segment reps and compute per-rep bar path metrics.
+
+        Args:
+            t: Sample timestamps in seconds (may be irregularly spaced)
+            x: Horizontal bar position in pixels
+            y: Vertical bar position in pixels (image coordinates, y down)
+            frame_height: Frame height in pixels (used for relative units)
+            source: Label for the trajectory source
+            pixels_per_meter: Optional per-sample scale (depth calibration);
+                positions are converted to meters before filtering
+            frame_width: Frame width in pixels (principal point for pixels_per_meter)
+
+        Returns:
+            Dict with per-rep "rep_data" and a set "summary"
+        """
+        if pixels_per_meter is not None:
+            # Pinhole model: X = (x - cx) * Z / f, measured from the image center
+            ppm = np.asarray(pixels_per_meter, dtype=np.float64)
+            x = np.asarray(x, dtype=np.float64)
+            y = np.asarray(y, dtype=np.float64)
+            cx = frame_width / 2 if frame_width else float(np.median(x))
+            cy = frame_height / 2 if frame_height else float(np.median(y))
+            x = (x - cx) / ppm
+            y = (y - cy) / ppm
+            frame_height = frame_height / float(np.median(ppm)) if frame_height else None
+            scale, unit = 1.0, "m"
+        else:
+            scale, unit = self._distance_scale(frame_height)
+
+        t, x, y, v_up = self._filtered_trajectory(t, x, y)
+
+        extrema = self._segment_reps(y, frame_height)
+        if len(extrema) < 3:
+            return self._empty_result(source, "No complete reps detected")
+
+        extrema = np.asarray(extrema)
+        n_reps = (len(extrema) - 1) // 2
+        starts = extrema[0:2 * n_reps:2]
+        turns = extrema[1:2 * n_reps:2]
+        ends = extrema[2:2 * n_reps + 1:2]
+
+        # Lifter starts at the top (squat/bench) or bottom (deadlift)
+        starts_at_top = bool(y[starts[0]] < y[turns[0]])
+        bottoms = turns if starts_at_top else starts
+        tops = ends if starts_at_top else turns
+
+        # ── Bar path deviation: max |x - x_start| over each rep ──
+        # Reps are contiguous (end of rep i == start of rep i+1), so
+        # reduceat over the start indices covers every rep in one pass.
+        span = slice(starts[0], ends[-1] + 1)
+        seg_lengths = np.diff(np.append(starts, ends[-1] + 1))
+        x_ref = np.repeat(x[starts], seg_lengths)
+        deviation = np.maximum.reduceat(np.abs(x[span] - x_ref), starts - starts[0]) * scale
+
+        drift = (x[ends] - x[starts]) * scale
+        rom = np.abs(y[bottoms] - y[tops]) * scale
+
+        # ── Phase durations ──
+        time_under_tension = t[ends] - t[starts]
+        if starts_at_top:
+            eccentric = t[turns] - t[starts]
+            concentric = t[ends] - t[turns]
+        else:
+            concentric = t[turns] - t[starts]
+            eccentric = t[ends] - t[turns]
+
+        # ── Sticking point: slowest upward velocity mid-concentric ──
+        sticking_height, sticking_time = self._sticking_points(t, y, v_up, bottoms, tops)
+
+        rep_data = []
+        for i in range(n_reps):
+            rep_data.append({
+                "rep_number": i + 1,
+                "start_time_s": round(float(t[starts[i]]), 3),
+                "end_time_s": round(float(t[ends[i]]), 3),
+                "bar_path_rom": round(float(rom[i]), 4),
+                "bar_path_deviation": round(float(deviation[i]), 4),
+                "horizontal_drift": round(float(drift[i]), 4),
+                "sticking_point_height": None if np.isnan(sticking_height[i]) else round(float(sticking_height[i]), 3),
+                "sticking_point_time_s": None if np.isnan(sticking_time[i]) else round(float(sticking_time[i]), 3),
+                "time_under_tension_s": round(float(time_under_tension[i]), 3),
+                "eccentric_duration_s": round(float(eccentric[i]), 3),
+                "concentric_duration_s": round(float(concentric[i]), 3)
+            })
+
+        valid_sticking = sticking_height[~np.isnan(sticking_height)]
+        summary = {
+            "avg_bar_path_deviation": round(float(deviation.mean()), 4),
+            "max_bar_path_deviation": round(float(deviation.max()), 4),
+            "avg_horizontal_drift": round(float(drift.mean()), 4),
+            "total_time_under_tension_s": round(float(time_under_tension.sum()), 3),
+            "avg_sticking_point_height": round(float(valid_sticking.mean()), 3) if len(valid_sticking) else None
+        }
+
+        if self.verbose:
+            print(f"📐 Bar path: {n_reps} reps, avg deviation {summary['avg_bar_path_deviation']:.3f} {unit}, "
+                  f"TUT {summary['total_time_under_tension_s']:.1f}s ({source})")
+
+        return {
+            "source": source,
+            "unit": unit,
+            "reps_detected": n_reps,
+            "rep_data": rep_data,
+            "summary": summary
+        }
+
+    # ═══════════════════════════════════════════════════════════════
+    # HELPERS
+    # ═══════════════════════════════════════════════════════════════
+
+    def _filtered_trajectory(
+        self,
+        t: np.ndarray,
+        x: np.ndarray,
+        y: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Resample to a uniform grid, low-pass filter and differentiate.
+
+        Returns:
+            (t, x, y, upward velocity in px/s) on the uniform grid
+        """
+        t = np.asarray(t, dtype=np.float64)
+        xy = np.column_stack((x, y)).astype(np.float64)
+
+        fs = estimate_sample_rate(t)
+        if fs > 0:
+            t, xy = resample_uniform(t, xy, fs)
+            xy = lowpass_filter(xy, self.CUTOFF_HZ, fs)
+
+        # Upward velocity (image y grows downward)
+        v_up = -differentiate(xy[:, 1], fs=fs) if fs > 0 else np.zeros(len(t))
+        return t, xy[:, 0], xy[:, 1], v_up
+
+    def _segment_reps(self, y: np.ndarray, frame_height: Optional[float]) -> List[int]:
+        """
+        Find alternating turning points of the vertical trajectory.
+
+        Returns sample indices [start, turn, end/start, turn, end, ...] where
+        every (start, turn, end) triplet is one rep.
+        """
+        y_range = float(y.max() - y.min())
+        threshold = self.MIN_ROM_FRACTION * y_range
+        if frame_height:
+            threshold = max(threshold, self.MIN_ROM_FRAME_FRACTION * frame_height)
+        if y_range <= 0 or y_range < threshold:
+            return []
+
+        # Candidate extrema = slope sign changes (vectorized), plus both ends
+        slope = np.sign(np.diff(y))
+        # Forward-fill flat segments so plateaus don't create fake extrema
+        filled = slope[np.maximum.accumulate(np.where(slope != 0, np.arange(len(slope)), 0))]
+        changes = np.flatnonzero(filled[1:] != filled[:-1]) + 1
+        candidates = np.concatenate(([0], changes, [len(y) - 1]))
+
+        # Zigzag filter over the (few) candidates
+        lo = hi = int(candidates[0])
+        extrema: List[int] = []
+        direction = 0
+        for idx in candidates[1:]:
+            idx = int(idx)
+            if direction == 0:
+                if y[idx] < y[lo]:
+                    lo = idx
+                if y[idx] > y[hi]:
+                    hi = idx
+                if y[idx] - y[lo] >= threshold:
+                    extrema, direction = [lo, idx], 1
+                elif y[hi] - y[idx] >= threshold:
+                    extrema, direction = [hi, idx], -1
+                continue
+
+            move = y[idx] - y[extrema[-1]]
+            if np.sign(move) == direction:
+                extrema[-1] = idx
+            elif abs(move) >= threshold:
+                extrema.append(idx)
+                direction = -direction
+
+        return extrema
+
+    def _sticking_points(
+        self,
+        t: np.ndarray,
+        y: np.ndarray,
+        v_up: np.ndarray,
+        bottoms: np.ndarray,
+        tops: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Locate the minimum upward velocity inside each concentric phase.
+
+        Returns:
+            (height fraction of concentric ROM, seconds after concentric start);
+            NaN for reps without enough samples in the search window
+        """
+        n_reps = len(bottoms)
+        heights = np.full(n_reps, np.nan)
+        times = np.full(n_reps, np.nan)
+
+        # Flattened sample indices of every concentric window + rep labels
+        lo = np.minimum(bottoms, tops)
+        hi = np.maximum(bottoms, tops)
+        lengths = hi - lo + 1
+        labels = np.repeat(np.arange(n_reps), lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        idx = np.repeat(lo, lengths) + offsets
+
+        denom = np.repeat(y[bottoms] - y[tops], lengths)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            progress = (np.repeat(y[bottoms], lengths) - y[idx]) / denom
+
+        low, high = self.STICKING_SEARCH_RANGE
+        mask = (progress >= low) & (progress <= high) & np.isfinite(progress)
+        if not mask.any():
+            return heights, times
+
+        labels, idx, progress = labels[mask], idx[mask], progress[mask]
+
+        # Per-rep argmin of v_up: sort by (rep, velocity), take first of each rep
+        order = np.lexsort((v_up[idx], labels))
+        first = order[np.flatnonzero(np.diff(np.concatenate(([-1], labels[order]))))]
+
+        reps = labels[first]
+        heights[reps] = progress[first]
+        times[reps] = t[idx[first]] - t[bottoms[reps]]
+        return heights, times
+
+    def _distance_scale(self, frame_height: Optional[float]) -> Tuple[float, str]:
+        """Pixel -> output unit factor: meters if calibrated, else % of frame height"""
+        if self.calibration_manager is not None and self.calibration_manager.is_calibrated():
+            return 1.0 / self.calibration_manager.pixels_per_meter, "m"
+        if frame_height:
+            return 100.0 / frame_height, "relative"
+        return 1.0, "px"
+
+    @staticmethod
+    def _empty_result(source: str, message: str) -> Dict:
+        return {
+            "source": source,
+            "unit": None,
+            "reps_detected": 0,
+            "rep_data": [],
+            "summary": {},
+            "message": message
+        }
+
+
+def _best_overlap(rep: Dict, bar_reps: List[Dict]) -> Optional[Dict]:
+    """Bar path rep overlapping rep the longest in time (None if none overlap)"""
+    start, end = rep.get("start_time_s"), rep.get("end_time_s")
+    if start is None or end is None:
+        return None
+
+    best, best_overlap = None, 0.0
+    for bar_rep in bar_reps:
+        overlap = min(end, bar_rep["end_time_s"]) - max(start, bar_rep["start_time_s"])
+        if overlap > best_overlap:
+            best, best_overlap = bar_rep, overlap
+    return best
+
+
+def merge_bar_path_metrics(velocity_metrics: Dict, bar_path: Dict) -> Dict:
+    """
+    Attach bar path analytics to velocity_metrics.
+
+    Bar path reps come from their own segmentation, so they are matched to
+    velocity reps by time overlap, not rep number (existing velocity fields
+    win). Without velocity reps the bar path reps are used as rep_data, so
+    they flow through to SupabaseFormAnalysisClient and the rep_metrics table.
+    """
+    velocity_metrics["bar_path"] = {
+        key: value for key, value in bar_path.items() if key != "rep_data"
+    }
+
+    bar_reps = bar_path.get("rep_data", [])
+    if not bar_reps:
+        return velocity_metrics
+
+    rep_data = velocity_metrics.get("rep_data") or []
+    if not rep_data:
+        rep_data = [dict(bar_rep) for bar_rep in bar_reps]
+    else:
+        unmatched = list(bar_reps)
+        for rep in rep_data:
+            bar_rep = _best_overlap(rep, unmatched)
+            if bar_rep is None:
+                continue
+            unmatched.remove(bar_rep)
+            for key, value in bar_rep.items():
+                if rep.get(key) is None:
+                    rep[key] = value
+
+    # Rep durations are tier-independent, fill them for the DB columns
+    for rep in rep_data:
+        if rep.get("duration_s") is None and rep.get("time_under_tension_s") is not None:
+            rep["duration_s"] = rep["time_under_tension_s"]
+
+    velocity_metrics["rep_data"] = rep_data
+    if not velocity_metrics.get("reps_detected"):
+        velocity_metrics["reps_detected"] = len(rep_data)
+
+    return velocity_metrics
@@ -1,13 +1,13 @@
 """
 Calibration Manager - Honest 3-Tier Velocity Measurement System
 
-TIER 1: LiDAR/ToF Depth (Premium - Exact m/s) - Future
+TIER 1: LiDAR/ToF Depth (Premium - Exact m/s) - per-frame via depth_metadata
 TIER 2: Reference Object (Standard - Calibrated m/s) - Current
 TIER 3: Relative Speed Index (Fallback - Honest arbitrary units)
 """
 
 import numpy as np
-from typing import Dict, Optional, Tuple
+from typing import Dict, Optional, Tuple, Union
 import cv2
 
 
@@ -41,6 +41,7 @@ class CalibrationManager:
         self.confidence = None
         self.reference_object = None
         self.user_height_m = None
+        self.depth_track = None  # Per-frame ppm (DepthTrack) when depth is uploaded
         self.verbose = verbose
 
     def detect_calibration_method(
@@ -81,9 +82,13 @@ class CalibrationManager:
         """
         Use LiDAR/ToF depth for exact calibration
 
-        Future implementation for:
+        Sources:
         - iOS: ARKit Depth API (iPhone 12 Pro+)
         - Android: ARCore Depth API (Samsung S20+, Pixel 4+)
+
+        depth_data may carry a "depth_track" (DepthTrack) for per-frame
+        pixels per meter; average_depth/focal_length then give the
+        set-level fallback value.
         """
         distance_to_person = depth_data.get('average_depth', 2.0)  # meters
         focal_length = depth_data.get('focal_length', 1000)  # pixels
@@ -91,11 +96,16 @@ class CalibrationManager:
         # Calculate pixels per meter based on depth and focal length
         # ppm = focal_length / distance
         self.pixels_per_meter = focal_length / distance_to_person
+        self.depth_track = depth_data.get('depth_track')
         self.calibration_method = "lidar"
         self.confidence = 0.95
 
         if self.verbose:
             print(f"✅ TIER 1 Active: LiDAR calibration ({self.pixels_per_meter:.1f} px/m)")
+            if self.depth_track is not None:
+                ppm = self.depth_track.focal_length / self.depth_track.depths_m
+                print(f"   Per-frame depth: {len(self.depth_track)} frames, "
+                      f"{ppm.min():.1f}-{ppm.max():.1f} px/m")
 
         return "lidar"
 
@@ -154,6 +164,7 @@ class CalibrationManager:
         - Clear communication that values are relative
         """
         self.pixels_per_meter = None
+        self.depth_track = None
         self.calibration_method = "relative"
         self.confidence = 0.50
 
@@ -176,7 +187,8 @@ class CalibrationManager:
                     "text": "Pro Mode - LiDAR Active",
                     "color": "#00FF88"
                 },
-                "note": "Accurate velocity measurements using depth sensor"
+                "note": "Accurate velocity measurements using depth sensor",
+                "per_frame": self.depth_track is not None
             }
 
         elif self.calibration_method == "reference":
@@ -207,14 +219,38 @@ class CalibrationManager:
                 "note": "Values are relative for consistency tracking, not absolute m/s"
             }
 
-    def convert_pixels_to_meters(self, pixels: float) -> float:
+    def pixels_per_meter_at(
+        self,
+        frame_idx: Union[float, np.ndarray]
+    ) -> Optional[Union[float, np.ndarray]]:
+        """
+        Pixels per meter at one or many frame indices.
+
+        Uses the per-frame depth track when available (perspective-corrected),
+        otherwise the set-level pixels_per_meter. None if not calibrated.
+        """
+        if self.depth_track is not None:
+            return self.depth_track.pixels_per_meter_at(frame_idx)
+        return self.pixels_per_meter
+
+    def has_per_frame_scale(self) -> bool:
+        """Check if pixels per meter varies per frame (depth track loaded)"""
+        return self.depth_track is not None
+
+    def convert_pixels_to_meters(self, pixels: float, frame_idx: Optional[float] = None) -> float:
         """
         Convert pixel distance to meters
 
+        Args:
+            pixels: Distance in pixels
+            frame_idx: Optional frame index for per-frame depth calibration
+
         Returns 0 if no calibration available (use relative speed instead)
         """
         if self.pixels_per_meter is None:
             return 0.0
+        if frame_idx is not None and self.depth_track is not None:
+            return pixels / self.depth_track.pixels_per_meter_at(frame_idx)
         return pixels / self.pixels_per_meter
 
     def is_calibrated(self) -> bool:
@@ -0,0 +1,339 @@
+"""
+Depth Metadata - Streaming parsers for TIER 1 (LiDAR/ToF) calibration input
+
+Clients can upload depth alongside the video in one of two formats:
+
+1. JSON Lines per-frame summary (.jsonl)
+   {"focal_length": 1450.0, "image_width": 1920}          <- header (optional keys)
+   {"frame": 0, "depth_m": 2.31, "confidence": 0.92}
+   {"frame": 2, "depth_m": 2.29}
+   ...
+
+2. Compact binary depth-map sidecar (.dpth), little endian
+   Header:  "DPTH" | u8 version | u8 pad | u16 map_w | u16 map_h
+            | u16 image_width | f32 focal_length | u32 frame_count
+   Frames:  u32 frame_index | map_h * map_w float16 depth in meters
+
+Both are parsed line by line / frame by frame: each low-res depth map is
+reduced to a single subject-distance summary as soon as it is read, so
+memory stays at one map regardless of clip length. The result is a
+DepthTrack giving pixels-per-meter per video frame (ppm = focal / depth),
+which corrects for the lifter moving toward or away from the camera.
+"""
+
+import json
+import math
+import struct
+import numpy as np
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple, Union
+
+
+BINARY_MAGIC = b"DPTH"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<4sBxHHHfI")
+BINARY_FRAME_INDEX = struct.Struct("<I")
+
+# Plausible subject distances for a phone on the gym floor (meters)
+MIN_DEPTH_M = 0.3
+MAX_DEPTH_M = 10.0
+
+# Central region of the depth map assumed to contain the lifter
+SUBJECT_ROI = (0.25, 0.75)
+
+
+class DepthMetadataError(ValueError):
+    """Raised when an uploaded depth file cannot be parsed"""
+
+
+def _focal_length(value, source: str) -> float:
+    """Focal length as a finite positive float"""
+    try:
+        focal = float(value)
+    except (TypeError, ValueError) as e:
+        raise DepthMetadataError(f"Invalid focal_length in {source}: {e}")
+    if not math.isfinite(focal) or focal <= 0:
+        raise DepthMetadataError(f"Invalid focal_length in {source}: {value!r}")
+    return focal
+
+
+def _image_width(value) -> Optional[int]:
+    """Header image width as a positive int (None if absent)"""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+        raise DepthMetadataError(f"Invalid image_width in depth header: {value!r}")
+    return value
+
+
+class DepthTrack:
+    """Per-frame subject depth with a focal length -> per-frame pixels per meter"""
+
+    def __init__(
+        self,
+        frames: np.ndarray,
+        depths_m: np.ndarray,
+        focal_length: float,
+        image_width: Optional[int] = None,
+        confidence: Optional[np.ndarray] = None
+    ):
+        """
+        Args:
+            frames: (F,) video frame indices (sorted, unique)
+            depths_m: (F,) subject distance per frame in meters
+            focal_length: Camera focal length in pixels at image_width
+            image_width: Width the focal length refers to (None = original video)
+            confidence: Optional (F,) per-frame confidence 0-1
+        """
+        self.frames = np.asarray(frames, dtype=np.float64)
+        self.depths_m = np.asarray(depths_m, dtype=np.float64)
+        self.focal_length = float(focal_length)
+        self.image_width = image_width
+        self.confidence = (
+            np.asarray(confidence, dtype=np.float64)
+            if confidence is not None else np.ones(len(self.frames))
+        )
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    @property
+    def average_depth(self) -> float:
+        return float(np.median(self.depths_m))
+
+    def pixels_per_meter_at(self, frame_idx: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        """
+        Pixels per meter at one or many (fractional) frame indices.
+
+        Frames between depth samples are linearly interpolated; frames
+        outside the track hold the nearest sample.
+        """
+        ppm = self.focal_length / self.depths_m
+        result = np.interp(np.asarray(frame_idx, dtype=np.float64), self.frames, ppm)
+        return float(result) if np.ndim(result) == 0 else result
+
+    def scaled(self, factor: float) -> "DepthTrack":
+        """Return a copy whose focal length matches a resized video"""
+        return DepthTrack(
+            self.frames,
+            self.depths_m,
+            self.focal_length * factor,
+            image_width=int(round(self.image_width * factor)) if self.image_width else None,
+            confidence=self.confidence
+        )
+
+    def to_depth_data(self) -> Dict:
+        """depth_data dict for CalibrationManager._calibrate_with_depth"""
+        return {
+            "average_depth": self.average_depth,
+            "focal_length": self.focal_length,
+            "depth_track": self
+        }
+
+    def summary(self) -> Dict:
+        return {
+            "frames": len(self),
+            "average_depth_m": round(self.average_depth, 3),
+            "min_depth_m": round(float(self.depths_m.min()), 3),
+            "max_depth_m": round(float(self.depths_m.max()), 3),
+            "avg_confidence": round(float(self.confidence.mean()), 3)
+        }
+
+
+# ═══════════════════════════════════════════════════════════════
+# JSON LINES PER-FRAME SUMMARY
+# ═══════════════════════════════════════════════════════════════
+
+def iter_jsonl_depth(stream) -> Iterator[Tuple[str, Dict]]:
+    """
+    Yield ("header", dict) / ("frame", dict) records one line at a time.
+
+    Args:
+        stream: Text or binary file object opened for reading
+    """
+    for line_number, line in enumerate(stream, start=1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise DepthMetadataError(f"Invalid JSON on line {line_number}: {e}")
+        if not isinstance(record, dict):
+            raise DepthMetadataError(f"Line {line_number} is not a JSON object")
+
+        yield ("frame" if "frame" in record else "header"), record
+
+
+def parse_jsonl_depth(stream, focal_length: Optional[float] = None) -> DepthTrack:
+    """
+    Build a DepthTrack from a JSON Lines per-frame depth summary.
+
+    Frame records use "depth_m" (or "average_depth"); header lines may set
+    "focal_length" and "image_width". A per-frame "focal_length" overrides
+    the header for that frame (zoom / lens switch).
+    """
+    header: Dict = {}
+    frames, ppms, depths, confidences = [], [], [], []
+
+    for kind, record in iter_jsonl_depth(stream):
+        if kind == "header":
+            header.update(record)
+            continue
+
+        depth = record.get("depth_m", record.get("average_depth"))
+        focal = record.get("focal_length") or header.get("focal_length") or focal_length
+        if depth is None or focal is None:
+            continue
+        try:
+            frame = int(record["frame"])
+            depth = float(depth)
+            confidence = float(record.get("confidence", 1.0))
+        except (TypeError, ValueError) as e:
+            raise DepthMetadataError(f"Invalid value in depth frame {record.get('frame')!r}: {e}")
+        focal = _focal_length(focal, f"depth frame {frame}")
+        if not MIN_DEPTH_M <= depth <= MAX_DEPTH_M:
+            continue
+
+        frames.append(frame)
+        depths.append(depth)
+        ppms.append(focal / depth)
+        confidences.append(confidence)
+
+    if not frames:
+        raise DepthMetadataError("No valid depth frames in JSON Lines upload")
+
+    # Per-frame focal lengths are folded into an equivalent depth at the
+    # reference focal length so the track stays a single (frames, depth) pair
+    reference_focal = _focal_length(
+        header.get("focal_length") or focal_length or ppms[0] * depths[0], "depth header"
+    )
+    image_width = _image_width(header.get("image_width"))
+    order = np.argsort(frames, kind="stable")
+    frames_arr, unique = np.unique(np.asarray(frames)[order], return_index=True)
+    equivalent_depths = reference_focal / np.asarray(ppms)[order][unique]
+
+    return DepthTrack(
+        frames_arr,
+        equivalent_depths,
+        reference_focal,
+        image_width=image_width,
+        confidence=np.asarray(confidences)[order][unique]
+    )
+
+
+# ═══════════════════════════════════════════════════════════════
+# BINARY DEPTH-MAP SIDECAR
+# ═══════════════════════════════════════════════════════════════
+
+def summarize_depth_map(depth_map: np.ndarray) -> Tuple[float, float]:
+    """
+    Reduce one low-res depth map to (subject depth m, confidence).
+
+    Uses the median of valid depths in the central ROI; confidence is the
+    fraction of ROI pixels with a valid reading. Depth is NaN if none.
+    """
+    h, w = depth_map.shape
+    lo, hi = SUBJECT_ROI
+    roi = depth_map[int(h * lo):max(int(h * hi), int(h * lo) + 1),
+                    int(w * lo):max(int(w * hi), int(w * lo) + 1)].astype(np.float32)
+    valid = roi[np.isfinite(roi) & (roi >= MIN_DEPTH_M) & (roi <= MAX_DEPTH_M)]
+    if valid.size == 0:
+        return float("nan"), 0.0
+    return float(np.median(valid)), valid.size / roi.size
+
+
+def parse_binary_depth(stream: BinaryIO, focal_length: Optional[float] = None) -> DepthTrack:
+    """
+    Build a DepthTrack from a binary depth-map sidecar, one map at a time.
+    """
+    raw_header = stream.read(BINARY_HEADER.size)
+    if len(raw_header) < BINARY_HEADER.size:
+        raise DepthMetadataError("Depth sidecar header is truncated")
+
+    magic, version, map_w, map_h, image_width, header_focal, frame_count = BINARY_HEADER.unpack(raw_header)
+    if magic != BINARY_MAGIC:
+        raise DepthMetadataError("Not a depth sidecar (bad magic)")
+    if version != BINARY_VERSION:
+        raise DepthMetadataError(f"Unsupported depth sidecar version {version}")
+    if map_w == 0 or map_h == 0:
+        raise DepthMetadataError("Depth sidecar has an empty depth map size")
+
+    # A NaN header value is truthy, so 0 is the only "unset" value
+    if header_focal != 0:
+        focal = _focal_length(header_focal, "depth sidecar header")
+    elif focal_length is not None:
+        focal = _focal_length(focal_length, "request")
+    else:
+        raise DepthMetadataError("Depth sidecar has no focal length")
+
+    # frame_count is untrusted: allocate no more than the upload can hold
+    map_bytes = map_w * map_h * 2
+    position = stream.tell()
+    available = (stream.seek(0, 2) - position) // (BINARY_FRAME_INDEX.size + map_bytes)
+    stream.seek(position)
+    if frame_count > available:
+        raise DepthMetadataError(
+            f"Depth sidecar declares {frame_count} frames but holds at most {available}"
+        )
+
+    # One reusable buffer for the current map
+    buffer = bytearray(map_bytes)
+    view = memoryview(buffer)
+    depth_map = np.frombuffer(buffer, dtype="<f2").reshape(map_h, map_w)
+
+    frames = np.empty(frame_count, dtype=np.int64)
+    depths = np.empty(frame_count, dtype=np.float64)
+    confidences = np.empty(frame_count, dtype=np.float64)
+    count = 0
+
+    for _ in range(frame_count):
+        raw_index = stream.read(BINARY_FRAME_INDEX.size)
+        if len(raw_index) < BINARY_FRAME_INDEX.size or stream.readinto(view) < map_bytes:
+            break  # Truncated upload - keep what we have
+        frames[count] = BINARY_FRAME_INDEX.unpack(raw_index)[0]
+        depths[count], confidences[count] = summarize_depth_map(depth_map)
+        count += 1
+
+    valid = np.isfinite(depths[:count])
+    if not valid.any():
+        raise DepthMetadataError("No valid depth frames in depth sidecar")
+
+    frames, depths, confidences = frames[:count][valid], depths[:count][valid], confidences[:count][valid]
+    frames, unique = np.unique(frames, return_index=True)
+
+    return DepthTrack(
+        frames,
+        depths[unique],
+        focal,
+        image_width=image_width or None,  # u16, so only 0 (unset) is invalid
+        confidence=confidences[unique]
+    )
+
+
+# ═══════════════════════════════════════════════════════════════
+# ENTRY POINT
+# ═══════════════════════════════════════════════════════════════
+
+def load_depth_metadata(path: Path, focal_length: Optional[float] = None) -> DepthTrack:
+    """
+    Parse an uploaded depth file, detecting the format from its first bytes.
+
+    Args:
+        path: File on disk (the upload is streamed there first)
+        focal_length: Fallback focal length in pixels if the file has none
+
+    Returns:
+        DepthTrack
+
+    Raises:
+        DepthMetadataError: If the file is malformed or has no usable frames
+    """
+    with open(path, "rb") as f:
+        is_binary = f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+        f.seek(0)
+        if is_binary:
+            return parse_binary_depth(f, focal_length)
+        return parse_jsonl_depth(f, focal_length)
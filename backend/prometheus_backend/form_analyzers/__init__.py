@@ -0,0 +1,23 @@
+"""
+Form Analyzers - Exercise-specific form analysis plugins
+
+Each module registers one ExerciseAnalyzer for its exercise types.
+To add an exercise: create a module with an @register_analyzer class
+and import it below.
+"""
+
+from .base import ExerciseAnalyzer, compute_joint_angles, compute_features, pose_arrays
+from .registry import register_analyzer, get_analyzer, registered_exercise_types
+
+# Built-in analyzers (importing registers them)
+from . import general, squat, deadlift, bench_press, overhead_press, row
+
+__all__ = [
+    "ExerciseAnalyzer",
+    "compute_joint_angles",
+    "compute_features",
+    "pose_arrays",
+    "register_analyzer",
+    "get_analyzer",
+    "registered_exercise_types",
+]
@@ -0,0 +1,414 @@
+"""
+Form Analyzer Base - Shared pipeline for exercise-specific form analysis
+
+Pipeline (identical for every exercise):
+1. pose_data -> (F, 33, 4) landmark array (x, y, z, visibility)
+2. Only the joint angles / features the analyzer declares are computed,
+   all frames at once
+3. Resample to a uniform grid and low-pass filter (signal_kernels)
+4. Segment reps from the analyzer's rep signal (angle valleys)
+5. Per-rep min / max / range of every series via reduceat
+6. Evaluate the analyzer's declarative checks as boolean masks over reps
+
+Exercise plugins only declare data (joints, features, targets, checks)
+and register themselves - see registry.py.
+"""
+
+import warnings
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from ..signal_kernels import estimate_sample_rate, find_peaks, lowpass_filter, resample_uniform
+
+
+MIN_VISIBILITY = 0.5
+
+# Joint angle = angle at the middle landmark, (left triplet, right triplet)
+JOINT_TRIPLETS = {
+    "knee": ((23, 25, 27), (24, 26, 28)),
+    "hip": ((11, 23, 25), (12, 24, 26)),
+    "elbow": ((11, 13, 15), (12, 14, 16)),
+    "shoulder": ((13, 11, 23), (14, 12, 24)),
+    "ankle": ((25, 27, 31), (26, 28, 32)),
+}
+
+# Landmark indices used by the non-angle features
+L_SHOULDER, R_SHOULDER = 11, 12
+L_ELBOW, R_ELBOW = 13, 14
+L_WRIST, R_WRIST = 15, 16
+L_HIP, R_HIP = 23, 24
+L_KNEE, R_KNEE = 25, 26
+
+
+# ═══════════════════════════════════════════════════════════════
+# VECTORIZED POSE FEATURES
+# ═══════════════════════════════════════════════════════════════
+
+def pose_arrays(pose_data: Dict) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert pose_data frames to arrays.
+
+    Returns:
+        (timestamps (F,), landmarks (F, 33, 4) with x, y, z, visibility)
+    """
+    frames = pose_data.get("frames", []) if pose_data else []
+    if not frames:
+        return np.zeros(0), np.zeros((0, 33, 4))
+
+    landmarks = np.array([
+        [[lm["x"], lm["y"], lm["z"], lm["visibility"]] for lm in frame["landmarks"]]
+        for frame in frames
+    ], dtype=np.float64)
+    timestamps = np.array([frame["timestamp"] for frame in frames], dtype=np.float64)
+    return timestamps, landmarks
+
+
+def _nanmean(values: np.ndarray, axis: int) -> np.ndarray:
+    """nanmean without the all-NaN RuntimeWarning (invisible joints are expected)"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        return np.nanmean(values, axis=axis)
+
+
+def _masked_points(landmarks: np.ndarray, idx) -> np.ndarray:
+    """(F, len(idx), 2) x/y with NaN where the landmark is not visible"""
+    points = landmarks[:, idx, :2].copy()
+    points[landmarks[:, idx, 3] <= MIN_VISIBILITY] = np.nan
+    return points
+
+
+def compute_joint_angles(landmarks: np.ndarray, joints) -> Dict[str, np.ndarray]:
+    """
+    Bilateral joint angles (degrees) for the requested joints only.
+
+    Left and right sides are averaged where both are visible; frames where
+    neither side is visible are NaN.
+
+    Args:
+        landmarks: (F, 33, 4) landmark array
+        joints: Names from JOINT_TRIPLETS
+
+    Returns:
+        Dict joint name -> (F,) angle array
+    """
+    joints = [j for j in joints if j in JOINT_TRIPLETS]
+    if not joints or len(landmarks) == 0:
+        return {}
+
+    # (J * 2 sides, 3) landmark indices -> one gather for every angle
+    triplets = np.array([side for j in joints for side in JOINT_TRIPLETS[j]])
+    points = _masked_points(landmarks, triplets.ravel()).reshape(len(landmarks), len(triplets), 3, 2)
+
+    v1 = points[:, :, 0] - points[:, :, 1]
+    v2 = points[:, :, 2] - points[:, :, 1]
+    cos_angle = (v1 * v2).sum(axis=-1) / (np.linalg.norm(v1, axis=-1) * np.linalg.norm(v2, axis=-1) + 1e-9)
+    angles = np.degrees(np.arccos(np.clip(cos_angle, -1.0, 1.0)))
+
+    bilateral = _nanmean(angles.reshape(len(landmarks), len(joints), 2), axis=2)
+
+    return {joint: bilateral[:, i] for i, joint in enumerate(joints)}
+
+
+def _midpoint(landmarks: np.ndarray, left: int, right: int) -> np.ndarray:
+    return _masked_points(landmarks, [left, right]).mean(axis=1)
+
+
+def compute_features(landmarks: np.ndarray, features) -> Dict[str, np.ndarray]:
+    """
+    Non-angle posture features (all vectorized over frames).
+
+    - torso_lean: shoulder-mid -> hip-mid angle from vertical (deg)
+    - knee_width_ratio: knee width / hip width (< 1 = knees caving in)
+    - shoulder_tilt / hip_tilt: left/right height difference (normalized)
+    - wrist_stack: horizontal wrist-elbow offset / forearm length
+    """
+    result: Dict[str, np.ndarray] = {}
+    if len(landmarks) == 0:
+        return result
+
+    for name in features:
+        if name == "torso_lean":
+            shoulder = _midpoint(landmarks, L_SHOULDER, R_SHOULDER)
+            hip = _midpoint(landmarks, L_HIP, R_HIP)
+            dx = shoulder[:, 0] - hip[:, 0]
+            dy = shoulder[:, 1] - hip[:, 1]
+            result[name] = np.abs(np.degrees(np.arctan2(dx, -dy)))  # -dy: image y grows downward
+
+        elif name == "knee_width_ratio":
+            hips = _masked_points(landmarks, [L_HIP, R_HIP])
+            knees = _masked_points(landmarks, [L_KNEE, R_KNEE])
+            hip_width = np.abs(hips[:, 0, 0] - hips[:, 1, 0])
+            knee_width = np.abs(knees[:, 0, 0] - knees[:, 1, 0])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                result[name] = np.where(hip_width > 1e-3, knee_width / hip_width, np.nan)
+
+        elif name in ("shoulder_tilt", "hip_tilt"):
+            pair = [L_SHOULDER, R_SHOULDER] if name == "shoulder_tilt" else [L_HIP, R_HIP]
+            points = _masked_points(landmarks, pair)
+            result[name] = np.abs(points[:, 0, 1] - points[:, 1, 1])
+
+        elif name == "wrist_stack":
+            elbows = _masked_points(landmarks, [L_ELBOW, R_ELBOW])
+            wrists = _masked_points(landmarks, [L_WRIST, R_WRIST])
+            forearm = np.linalg.norm(wrists - elbows, axis=-1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                offset = np.abs(wrists[:, :, 0] - elbows[:, :, 0]) / forearm
+            result[name] = _nanmean(offset, axis=1)
+
+    return result
+
+
+def _fill_gaps(matrix: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """Linearly interpolate NaN gaps per column (all-NaN columns stay NaN)"""
+    filled = matrix.copy()
+    for col in range(matrix.shape[1]):
+        valid = np.isfinite(matrix[:, col])
+        if valid.any() and not valid.all():
+            filled[:, col] = np.interp(t, t[valid], matrix[valid, col])
+    return filled
+
+
+# ═══════════════════════════════════════════════════════════════
+# ANALYZER BASE CLASS
+# ═══════════════════════════════════════════════════════════════
+
+class ExerciseAnalyzer:
+    """
+    Base class for exercise-specific form analyzers.
+
+    Subclasses declare:
+        name: Analyzer id
+        exercise_types: exercise_type values handled (lowercase)
+        required_joints: JOINT_TRIPLETS keys to compute
+        required_features: compute_features names to compute
+        rep_signal: Series whose valleys mark the bottom of each rep
+        target_angles: Reference ranges reported to the client
+        checks: Declarative checks, each a dict with
+            stat: "<series>_min" | "<series>_max" | "<series>_range"
+            op: "<" or ">"
+            threshold, penalty, message
+            per_frame: True if the check is meaningful on a single frame
+            group: Optional - within a group only the first failing check counts
+    """
+
+    name = "base"
+    exercise_types: Tuple[str, ...] = ()
+    required_joints: Tuple[str, ...] = ()
+    required_features: Tuple[str, ...] = ()
+    rep_signal: Optional[str] = None
+    target_angles: Dict = {}
+    notes = ""
+    checks: List[Dict] = []
+
+    # Features and checks every analyzer gets
+    COMMON_FEATURES = ("shoulder_tilt", "hip_tilt")
+    COMMON_CHECKS = [
+        {"stat": "shoulder_tilt_max", "op": ">", "threshold": 0.05, "penalty": 0.5,
+         "message": "Uneven shoulders - check bar position", "per_frame": True},
+        {"stat": "hip_tilt_max", "op": ">", "threshold": 0.05, "penalty": 0.5,
+         "message": "Uneven hips - check stance width", "per_frame": True},
+    ]
+
+    MIN_FRAMES = 10
+    CUTOFF_HZ = 4.0
+    MIN_REP_RANGE_DEG = 25.0
+    MIN_REP_SPACING_S = 0.6
+
+    def __init__(self, verbose: bool = False):
+        self.verbose = verbose
+
+    # ─── Series computation ───────────────────────────────────────
+
+    def compute_series(self, landmarks: np.ndarray) -> Dict[str, np.ndarray]:
+        """Compute only the joint angles and features this analyzer needs"""
+        series = compute_joint_angles(landmarks, self.required_joints)
+        series.update(compute_features(landmarks, tuple(self.required_features) + self.COMMON_FEATURES))
+        return series
+
+    # ─── Checks ───────────────────────────────────────────────────
+
+    def all_checks(self) -> List[Dict]:
+        return list(self.checks) + self.COMMON_CHECKS
+
+    def evaluate_checks(self, stats: Dict[str, np.ndarray], per_frame_only: bool = False) -> List[Tuple[Dict, np.ndarray]]:
+        """
+        Evaluate checks over all reps at once.
+
+        Args:
+            stats: "<series>_<min|max|range>" -> (R,) arrays
+            per_frame_only: Only evaluate checks marked per_frame
+
+        Returns:
+            List of (check, failed (R,) bool mask); checks whose stat is
+            missing (joint never visible) are skipped
+        """
+        results = []
+        already_failed: Dict[str, np.ndarray] = {}
+
+        for check in self.all_checks():
+            if per_frame_only and not check.get("per_frame"):
+                continue
+            values = stats.get(check["stat"])
+            if values is None:
+                continue
+
+            with np.errstate(invalid="ignore"):
+                if check["op"] == "<":
+                    failed = values < check["threshold"]
+                else:
+                    failed = values > check["threshold"]
+            failed &= np.isfinite(values)
+
+            group = check.get("group")
+            if group is not None:
+                previous = already_failed.get(group, np.zeros_like(failed))
+                failed &= ~previous
+                already_failed[group] = previous | failed
+
+            results.append((check, failed))
+        return results
+
+    # ─── Rep segmentation ─────────────────────────────────────────
+
+    def segment_reps(self, signal: np.ndarray, fs: float) -> np.ndarray:
+        """
+        Rep boundaries from valleys of the rep signal.
+
+        Returns:
+            (R + 1,) boundary indices; rep i spans [b[i], b[i+1])
+        """
+        n = len(signal)
+        if not np.isfinite(signal).all():
+            return np.array([0, n])
+
+        valleys = find_peaks(
+            -signal,
+            distance=max(1, int(self.MIN_REP_SPACING_S * fs)),
+            prominence=self.MIN_REP_RANGE_DEG
+        )
+        if len(valleys) == 0:
+            return np.array([0, n])
+
+        mids = (valleys[:-1] + valleys[1:]) // 2
+        return np.concatenate(([0], mids, [n]))
+
+    # ─── Full analysis ────────────────────────────────────────────
+
+    def analyze(self, pose_data: Dict) -> Dict:
+        """
+        Run the form analysis pipeline on processed pose data.
+
+        Returns:
+            Dict for form_metrics in the /analyze-form response
+        """
+        result = {
+            "exercise": None,
+            "analyzer": self.name,
+            "analysis_available": False,
+            "target_angles": self.target_angles,
+            "notes": self.notes
+        }
+
+        t, landmarks = pose_arrays(pose_data)
+        if len(t) < self.MIN_FRAMES:
+            result["message"] = "Not enough pose frames for form analysis"
+            return result
+
+        series = self.compute_series(landmarks)
+        names = [name for name, values in series.items() if np.isfinite(values).any()]
+        if not names:
+            result["message"] = "Required joints were not visible"
+            return result
+
+        matrix = _fill_gaps(np.column_stack([series[name] for name in names]), t)
+
+        fs = estimate_sample_rate(t)
+        if fs > 0:
+            t, matrix = resample_uniform(t, matrix, fs)
+            matrix = lowpass_filter(matrix, self.CUTOFF_HZ, fs)
+
+        if self.rep_signal in names:
+            boundaries = self.segment_reps(matrix[:, names.index(self.rep_signal)], fs)
+        else:
+            boundaries = np.array([0, len(t)])
+
+        # Per-rep min / max for every series in one reduceat each
+        starts = boundaries[:-1]
+        mins = np.minimum.reduceat(matrix, starts, axis=0)
+        maxs = np.maximum.reduceat(matrix, starts, axis=0)
+
+        stats: Dict[str, np.ndarray] = {}
+        for i, name in enumerate(names):
+            stats[f"{name}_min"] = mins[:, i]
+            stats[f"{name}_max"] = maxs[:, i]
+            stats[f"{name}_range"] = maxs[:, i] - mins[:, i]
+
+        n_reps = len(starts)
+        penalties = np.zeros(n_reps)
+        issues: List[List[str]] = [[] for _ in range(n_reps)]
+        for check, failed in self.evaluate_checks(stats):
+            penalties += failed * check["penalty"]
+            for rep in np.flatnonzero(failed):
+                issues[rep].append(check["message"])
+
+        scores = np.clip(10.0 - penalties, 0.0, 10.0)
+
+        rep_data = []
+        for r in range(n_reps):
+            rep = {
+                "rep_number": r + 1,
+                "start_time_s": round(float(t[starts[r]]), 3),
+                "end_time_s": round(float(t[boundaries[r + 1] - 1]), 3),
+                "score": round(float(scores[r]), 1),
+                "issues": issues[r]
+            }
+            for joint in self.required_joints:
+                if joint in names:
+                    rep[f"{joint}_min_angle"] = round(float(stats[f"{joint}_min"][r]), 1)
+                    rep[f"{joint}_max_angle"] = round(float(stats[f"{joint}_max"][r]), 1)
+            rep_data.append(rep)
+
+        # Most frequent issues first
+        counts: Dict[str, int] = {}
+        for rep_issues in issues:
+            for message in rep_issues:
+                counts[message] = counts.get(message, 0) + 1
+        feedback = sorted(counts, key=lambda message: -counts[message]) or ["Good form!"]
+
+        result.update({
+            "analysis_available": True,
+            "reps_analyzed": n_reps,
+            "form_score": round(float(scores.mean()), 1),
+            "feedback": feedback,
+            "rep_data": rep_data
+        })
+
+        if self.verbose:
+            print(f"🏋️ Form analysis ({self.name}): {n_reps} reps, score {result['form_score']}/10")
+
+        return result
+
+    def score_frame(self, landmarks: np.ndarray) -> Tuple[float, List[str]]:
+        """
+        Score a single frame with the per-frame checks.
+
+        Args:
+            landmarks: (33, 4) landmark array
+
+        Returns:
+            Tuple of (score 0-10, feedback messages)
+        """
+        series = self.compute_series(landmarks[None])
+        stats: Dict[str, np.ndarray] = {}
+        for name, values in series.items():
+            stats[f"{name}_min"] = values
+            stats[f"{name}_max"] = values
+
+        score = 10.0
+        feedback = []
+        for check, failed in self.evaluate_checks(stats, per_frame_only=True):
+            if failed[0]:
+                score -= check["penalty"]
+                feedback.append(check["message"])
+
+        return round(max(0.0, min(10.0, score)), 1), feedback or ["Good form!"]
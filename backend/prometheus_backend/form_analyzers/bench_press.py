@@ -0,0 +1,30 @@
+"""
+Bench Press Analyzer - range of motion, elbow flare and wrist stacking
+"""
+
+from .base import ExerciseAnalyzer
+from .registry import register_analyzer
+
+
+@register_analyzer
+class BenchPressAnalyzer(ExerciseAnalyzer):
+    name = "bench_press"
+    exercise_types = ("bench_press", "incline_bench", "incline_bench_press", "dumbbell_bench_press")
+    required_joints = ("elbow", "shoulder")
+    required_features = ("wrist_stack",)
+    rep_signal = "elbow"
+    target_angles = {
+        "elbow": {"min": 75, "max": 90},
+        "shoulder": {"min": 45, "max": 75},
+    }
+    notes = "Bar path and shoulder safety analysis"
+    checks = [
+        {"stat": "elbow_min", "op": ">", "threshold": 100, "penalty": 1.0,
+         "message": "Partial range - lower the bar to your chest"},
+        {"stat": "elbow_max", "op": "<", "threshold": 155, "penalty": 0.5,
+         "message": "Incomplete lockout at the top"},
+        {"stat": "shoulder_max", "op": ">", "threshold": 80, "penalty": 1.0,
+         "message": "Elbows flared - tuck them to 45-75° from your torso", "per_frame": True},
+        {"stat": "wrist_stack_max", "op": ">", "threshold": 0.35, "penalty": 0.5,
+         "message": "Wrists not stacked over elbows", "per_frame": True},
+    ]
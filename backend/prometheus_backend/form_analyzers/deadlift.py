@@ -0,0 +1,32 @@
+"""
+Deadlift Analyzer - hip hinge, lockout and back angle
+"""
+
+from .base import ExerciseAnalyzer
+from .registry import register_analyzer
+
+
+@register_analyzer
+class DeadliftAnalyzer(ExerciseAnalyzer):
+    name = "deadlift"
+    exercise_types = ("deadlift", "romanian_deadlift", "sumo_deadlift", "conventional_deadlift")
+    required_joints = ("hip", "knee")
+    required_features = ("torso_lean", "knee_width_ratio")
+    rep_signal = "hip"
+    target_angles = {
+        "hip": {"min": 90, "max": 180},
+        "knee": {"min": 160, "max": 180},
+    }
+    notes = "Hip hinge and bar path analysis"
+    checks = [
+        {"stat": "hip_max", "op": "<", "threshold": 165, "penalty": 1.0,
+         "message": "Incomplete lockout - finish with hips fully extended"},
+        {"stat": "torso_lean_max", "op": ">", "threshold": 60, "penalty": 2.0, "group": "lean",
+         "message": "Excessive forward lean - maintain upright torso", "per_frame": True},
+        {"stat": "torso_lean_max", "op": ">", "threshold": 45, "penalty": 1.0, "group": "lean",
+         "message": "Forward lean detected - keep chest up", "per_frame": True},
+        {"stat": "knee_width_ratio_min", "op": "<", "threshold": 0.85, "penalty": 1.5, "group": "valgus",
+         "message": "Knee valgus detected - keep knees tracking over toes", "per_frame": True},
+        {"stat": "knee_width_ratio_min", "op": "<", "threshold": 0.95, "penalty": 0.5, "group": "valgus",
+         "message": "Slight knee cave - focus on knee position", "per_frame": True},
+    ]
@@ -0,0 +1,25 @@
+"""
+General Analyzer - fallback for exercises without a dedicated analyzer
+
+Only posture checks that hold for any standing lift (knee tracking,
+shoulder / hip symmetry); no rep-specific targets.
+"""
+
+from .base import ExerciseAnalyzer
+from .registry import register_analyzer
+
+
+@register_analyzer
+class GeneralAnalyzer(ExerciseAnalyzer):
+    name = "general"
+    exercise_types = ("general",)
+    required_joints = ("knee", "hip")
+    required_features = ("knee_width_ratio",)
+    rep_signal = "knee"
+    notes = "General posture analysis"
+    checks = [
+        {"stat": "knee_width_ratio_min", "op": "<", "threshold": 0.85, "penalty": 1.5, "group": "valgus",
+         "message": "Knee valgus detected - keep knees tracking over toes", "per_frame": True},
+        {"stat": "knee_width_ratio_min", "op": "<", "threshold": 0.95, "penalty": 0.5, "group": "valgus",
+         "message": "Slight knee cave - focus on knee position", "per_frame": True},
+    ]
@@ -0,0 +1,30 @@
+"""
+Overhead Press Analyzer - lockout, bar overhead and lumbar extension
+"""
+
+from .base import ExerciseAnalyzer
+from .registry import register_analyzer
+
+
+@register_analyzer
+class OverheadPressAnalyzer(ExerciseAnalyzer):
+    name = "overhead_press"
+    exercise_types = ("overhead_press", "military_press", "shoulder_press", "push_press")
+    required_joints = ("elbow", "shoulder")
+    required_features = ("torso_lean", "wrist_stack")
+    rep_signal = "elbow"
+    target_angles = {
+        "elbow": {"min": 165, "max": 180},
+        "shoulder": {"min": 160, "max": 180},
+    }
+    notes = "Lockout and torso position analysis"
+    checks = [
+        {"stat": "elbow_max", "op": "<", "threshold": 160, "penalty": 1.0,
+         "message": "Incomplete lockout - press to straight arms"},
+        {"stat": "shoulder_max", "op": "<", "threshold": 150, "penalty": 1.0,
+         "message": "Bar not fully overhead - finish over the mid-foot"},
+        {"stat": "torso_lean_max", "op": ">", "threshold": 20, "penalty": 1.0,
+         "message": "Leaning back - brace your core and squeeze glutes", "per_frame": True},
+        {"stat": "wrist_stack_max", "op": ">", "threshold": 0.35, "penalty": 0.5,
+         "message": "Wrists not stacked over elbows", "per_frame": True},
+    ]
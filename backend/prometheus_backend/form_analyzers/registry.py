@@ -0,0 +1,42 @@
+"""
+Form Analyzer Registry - exercise_type -> ExerciseAnalyzer plugin
+
+New exercises are added by decorating an ExerciseAnalyzer subclass with
+@register_analyzer in its own module (and importing that module in the
+package __init__); the analysis pipeline itself never changes.
+"""
+
+from typing import Dict, List, Optional, Type
+
+from .base import ExerciseAnalyzer
+
+
+_REGISTRY: Dict[str, Type[ExerciseAnalyzer]] = {}
+
+
+def register_analyzer(cls: Type[ExerciseAnalyzer]) -> Type[ExerciseAnalyzer]:
+    """Class decorator: register an analyzer for all of its exercise_types"""
+    for exercise_type in cls.exercise_types:
+        key = exercise_type.lower()
+        if key in _REGISTRY and _REGISTRY[key] is not cls:
+            print(f"⚠️ Form analyzer for '{key}' replaced: {_REGISTRY[key].name} -> {cls.name}")
+        _REGISTRY[key] = cls
+    return cls
+
+
+def get_analyzer(exercise_type: Optional[str], verbose: bool = False) -> Optional[ExerciseAnalyzer]:
+    """
+    Get an analyzer instance for an exercise type.
+
+    Returns:
+        ExerciseAnalyzer or None if the exercise has no registered analyzer
+    """
+    if not exercise_type:
+        return None
+    cls = _REGISTRY.get(exercise_type.lower())
+    return cls(verbose=verbose) if cls else None
+
+
+def registered_exercise_types() -> List[str]:
+    """All exercise types with a registered analyzer"""
+    return sorted(_REGISTRY)
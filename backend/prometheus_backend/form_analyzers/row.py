@@ -0,0 +1,28 @@
+"""
+Row Analyzer - pull range, hinge angle and torso stability
+"""
+
+from .base import ExerciseAnalyzer
+from .registry import register_analyzer
+
+
+@register_analyzer
+class RowAnalyzer(ExerciseAnalyzer):
+    name = "row"
+    exercise_types = ("row", "barbell_row", "bent_over_row", "pendlay_row", "dumbbell_row")
+    required_joints = ("elbow", "hip")
+    required_features = ("torso_lean",)
+    rep_signal = "elbow"
+    target_angles = {
+        "elbow": {"min": 60, "max": 90},
+        "hip": {"min": 90, "max": 135},
+    }
+    notes = "Pull range and hinge stability analysis"
+    checks = [
+        {"stat": "elbow_min", "op": ">", "threshold": 100, "penalty": 1.0,
+         "message": "Short pull - row the bar to your torso"},
+        {"stat": "torso_lean_range", "op": ">", "threshold": 20, "penalty": 1.0,
+         "message": "Torso swinging - keep the hinge angle fixed"},
+        {"stat": "torso_lean_min", "op": "<", "threshold": 30, "penalty": 1.0,
+         "message": "Too upright - hinge further forward", "per_frame": True},
+    ]
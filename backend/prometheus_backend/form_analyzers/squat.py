@@ -0,0 +1,32 @@
+"""
+Squat Analyzer - depth, torso lean and knee tracking
+"""
+
+from .base import ExerciseAnalyzer
+from .registry import register_analyzer
+
+
+@register_analyzer
+class SquatAnalyzer(ExerciseAnalyzer):
+    name = "squat"
+    exercise_types = ("squat", "back_squat", "front_squat", "goblet_squat")
+    required_joints = ("knee", "hip")
+    required_features = ("torso_lean", "knee_width_ratio")
+    rep_signal = "knee"
+    target_angles = {
+        "knee": {"min": 80, "max": 130},
+        "hip": {"min": 70, "max": 120},
+    }
+    notes = "Squat depth and form analysis"
+    checks = [
+        {"stat": "knee_min", "op": ">", "threshold": 110, "penalty": 1.5,
+         "message": "Squat depth above parallel - sink deeper"},
+        {"stat": "torso_lean_max", "op": ">", "threshold": 60, "penalty": 2.0, "group": "lean",
+         "message": "Excessive forward lean - maintain upright torso", "per_frame": True},
+        {"stat": "torso_lean_max", "op": ">", "threshold": 45, "penalty": 1.0, "group": "lean",
+         "message": "Forward lean detected - keep chest up", "per_frame": True},
+        {"stat": "knee_width_ratio_min", "op": "<", "threshold": 0.85, "penalty": 1.5, "group": "valgus",
+         "message": "Knee valgus detected - keep knees tracking over toes", "per_frame": True},
+        {"stat": "knee_width_ratio_min", "op": "<", "threshold": 0.95, "penalty": 0.5, "group": "valgus",
+         "message": "Slight knee cave - focus on knee position", "per_frame": True},
+    ]
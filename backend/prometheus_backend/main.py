@@ -12,7 +12,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Import routers
-from .routers import form_analysis, ai_coach, admin, partner
+from .routers import form_analysis, ai_coach, admin, partner, neiro
 
 app = FastAPI(
     title="Prometheus Form Analysis API",
@@ -45,7 +45,7 @@ async def root():
         "service": "Prometheus Form Analysis API",
         "status": "running",
         "version": "2.0.0",
-        "modules": ["form_analysis", "ai_coach", "admin", "partner"]
+        "modules": ["form_analysis", "ai_coach", "admin", "partner", "neiro"]
     }
 
 
@@ -66,6 +66,16 @@ app.include_router(admin.router)
 # Partner Portal Router
 app.include_router(partner.router)
 
+# Neiro Live Tracking Router (WebSocket barbell tracking)
+app.include_router(neiro.router)
+
+
+@app.on_event("shutdown")
+async def close_openai_clients():
+    """Close the pooled OpenAI connections"""
+    from ai_coach_service.openai_pool import close_clients
+    await close_clients()
+
 
 if __name__ == "__main__":
     import uvicorn
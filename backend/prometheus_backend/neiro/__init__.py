@@ -0,0 +1,13 @@
+"""
+Neiro - Live barbell tracking engine (used by routers/neiro.py)
+
+- model_registry: process-wide detector, loaded once and shared by sessions
+- tracker: lightweight per-connection BarbellTracker session state
+- batching: cross-session micro-batching inference server
+"""
+
+from .model_registry import get_model_registry, DetectorBackend
+from .tracker import BarbellTracker
+from .batching import BatchInferenceServer, get_batch_server
+
+__all__ = ["get_model_registry", "DetectorBackend", "BarbellTracker", "BatchInferenceServer", "get_batch_server"]
@@ -0,0 +1,193 @@
+"""
+Neiro Batch Inference Server - cross-session micro-batching
+
+Frames from all live sessions are queued and collected for at most
+max_wait_ms (or until max_batch_size frames are waiting), then run
+through the shared detector in ONE batched forward pass on a dedicated
+worker thread. Each session awaits a future that receives only its own
+boxes, so throughput scales with connection count instead of paying the
+per-call overhead for every frame, and the event loop never blocks on
+inference.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .metrics import LatencyWindow
+from .model_registry import IMGSZ, get_model_registry
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = int(os.getenv("NEIRO_MAX_BATCH_SIZE", "8"))
+MAX_BATCH_WAIT_MS = float(os.getenv("NEIRO_MAX_BATCH_WAIT_MS", "5"))
+
+
+class BatchInferenceServer:
+    """Collects frames from all sessions and runs batched detector passes"""
+
+    def __init__(
+        self,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_wait_ms: float = MAX_BATCH_WAIT_MS,
+        detector=None
+    ):
+        """
+        Args:
+            max_batch_size: Largest batch sent to the detector
+            max_wait_ms: Longest time the first queued frame waits for company
+            detector: Optional DetectorBackend (default: shared model registry)
+        """
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000.0
+        self._detector = detector
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # Single worker: one forward pass at a time, never on the event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="neiro-infer")
+
+        # Metrics
+        self.batches = 0
+        self.frames = 0
+        self.max_batch_seen = 0
+        self.last_batch_ms = 0.0
+        self.latency = LatencyWindow()
+
+    # ─── Lifecycle ────────────────────────────────────────────────
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the collector task on the running event loop"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._collect_loop())
+        logger.info(f"Batch inference server started (max_batch={self.max_batch_size}, "
+                    f"max_wait={self.max_wait_s * 1000:.0f}ms)")
+
+    async def stop(self):
+        """Stop collecting; pending frames fail with CancelledError"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, _, future = self._queue.get_nowait()
+                if not future.done():
+                    future.cancel()
+
+    # ─── Submission ───────────────────────────────────────────────
+
+    async def submit(self, frame: np.ndarray, imgsz: int = IMGSZ) -> Tuple[np.ndarray, float]:
+        """
+        Queue one frame and wait for its detections.
+
+        Returns:
+            ((K, 5) x1, y1, x2, y2, conf boxes, inference ms of its batch)
+        """
+        if not self.running:
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((frame, imgsz, future))
+        return await future
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    # ─── Collector ────────────────────────────────────────────────
+
+    async def _collect_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait_s
+
+            while len(batch) < self.max_batch_size:
+                # Frames that queued up during the last forward pass go
+                # straight into this batch without waiting
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Sessions may ask for different input sizes (ROI crops)
+            by_size: Dict[int, List] = {}
+            for item in batch:
+                by_size.setdefault(item[1], []).append(item)
+
+            for imgsz, items in by_size.items():
+                await self._run_batch(loop, imgsz, items)
+
+    async def _run_batch(self, loop, imgsz: int, items: List):
+        items = [item for item in items if not item[2].done()]
+        if not items:
+            return
+
+        frames = [item[0] for item in items]
+        start_time = time.time()
+        try:
+            detector = self._detector or get_model_registry().get_detector()
+            if detector is None:
+                raise RuntimeError("Model not initialized")
+            results = await loop.run_in_executor(self._executor, detector.detect_batch, frames, imgsz)
+        except Exception as e:
+            logger.error(f"Batch inference error: {e}")
+            for _, _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        batch_ms = (time.time() - start_time) * 1000
+        self.batches += 1
+        self.frames += len(items)
+        self.max_batch_seen = max(self.max_batch_seen, len(items))
+        self.last_batch_ms = batch_ms
+        self.latency.add(batch_ms)
+
+        for (_, _, future), boxes in zip(items, results):
+            if not future.done():
+                future.set_result((boxes, batch_ms))
+
+    def stats(self) -> Dict:
+        return {
+            "running": self.running,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": round(self.max_wait_s * 1000, 1),
+            "queue_depth": self.queue_depth,
+            "batches": self.batches,
+            "frames": self.frames,
+            "avg_batch_size": round(self.frames / self.batches, 2) if self.batches else 0,
+            "max_batch_size_seen": self.max_batch_seen,
+            "last_batch_ms": round(self.last_batch_ms, 1),
+            "inference_latency": self.latency.percentiles()
+        }
+
+
+_batch_server: Optional[BatchInferenceServer] = None
+
+
+def get_batch_server() -> BatchInferenceServer:
+    """Process-wide batch inference server"""
+    global _batch_server
+    if _batch_server is None:
+        _batch_server = BatchInferenceServer()
+    return _batch_server
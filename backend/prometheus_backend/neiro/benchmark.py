@@ -0,0 +1,130 @@
+"""
+Neiro Backend Benchmark - cold start, RSS and latency per detector backend
+
+Each backend runs in a fresh subprocess so import time (torch vs.
+onnxruntime) and resident memory are measured honestly.
+
+Usage:
+    python -m prometheus_backend.neiro.benchmark [--images DIR] [--runs 50] [--batch 4]
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+CANDIDATES = [
+    ("ultralytics", False),
+    ("onnxruntime", False),
+    ("onnxruntime", True),
+]
+
+
+def _load_frames(images_dir: str, count: int = 16) -> List[np.ndarray]:
+    import cv2
+
+    frames = []
+    if images_dir:
+        for path in sorted(Path(images_dir).glob("*.jp*g"))[:count]:
+            frame = cv2.imread(str(path))
+            if frame is not None:
+                frames.append(frame)
+    if not frames:
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8) for _ in range(count)]
+    return frames
+
+
+def _rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_child(backend: str, quantized: bool, images_dir: str, runs: int, batch: int) -> Dict:
+    """Benchmark one backend inside this (fresh) process"""
+    start_time = time.time()
+    from prometheus_backend.neiro import model_registry
+
+    if quantized and not model_registry.QUANTIZED_MODEL_PATH.exists():
+        return {"skipped": f"{model_registry.QUANTIZED_MODEL_PATH.name} not found (run onnx_backend quantize)"}
+    if backend == "onnxruntime" and not model_registry.ONNX_MODEL_PATH.exists():
+        return {"skipped": f"{model_registry.ONNX_MODEL_PATH.name} not found"}
+
+    detector = model_registry.create_backend(backend, quantized)
+    if detector is None:
+        return {"skipped": "no model file"}
+    cold_start_s = time.time() - start_time
+
+    frames = _load_frames(images_dir)
+    detector.detect_batch(frames[:1])  # warm-up
+
+    single = []
+    for i in range(runs):
+        t0 = time.perf_counter()
+        detector.detect_batch([frames[i % len(frames)]])
+        single.append((time.perf_counter() - t0) * 1000)
+
+    batched = []
+    for i in range(max(1, runs // batch)):
+        t0 = time.perf_counter()
+        detector.detect_batch([frames[(i * batch + k) % len(frames)] for k in range(batch)])
+        batched.append((time.perf_counter() - t0) * 1000 / batch)
+
+    return {
+        "backend": detector.name,
+        "model": detector.model_path.name if detector.model_path else None,
+        "cold_start_s": round(cold_start_s, 2),
+        "rss_mb": round(_rss_mb(), 1),
+        "p50_ms": round(float(np.percentile(single, 50)), 1),
+        "p95_ms": round(float(np.percentile(single, 95)), 1),
+        f"batch{batch}_ms_per_frame": round(float(np.median(batched)), 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Neiro detector backends")
+    parser.add_argument("--images", default="", help="Directory of sample JPEG frames")
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--child", nargs=2, metavar=("BACKEND", "QUANTIZED"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        backend, quantized = args.child[0], args.child[1] == "1"
+        try:
+            result = run_child(backend, quantized, args.images, args.runs, args.batch)
+        except Exception as e:
+            result = {"error": str(e)}
+        print(json.dumps(result))
+        return
+
+    print("\n" + "=" * 60)
+    print("NEIRO DETECTOR BACKEND BENCHMARK")
+    print("=" * 60)
+    for backend, quantized in CANDIDATES:
+        label = f"{backend}{' (int8)' if quantized else ''}"
+        proc = subprocess.run(
+            [sys.executable, "-m", "prometheus_backend.neiro.benchmark",
+             "--images", args.images, "--runs", str(args.runs), "--batch", str(args.batch),
+             "--child", backend, "1" if quantized else "0"],
+            capture_output=True,
+            text=True
+        )
+        lines = proc.stdout.strip().splitlines()
+        try:
+            result = json.loads(lines[-1]) if lines else {"error": proc.stderr.strip()[-300:]}
+        except json.JSONDecodeError:
+            result = {"error": lines[-1]}
+        print(f"\n▶ {label}")
+        for key, value in result.items():
+            print(f"   {key:<22} {value}")
+
+
+if __name__ == "__main__":
+    main()
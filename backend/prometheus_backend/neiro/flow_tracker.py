@@ -0,0 +1,105 @@
+"""
+Neiro Optical Flow Tracker - cheap bar tracking between YOLO keyframes
+
+After a detection, corner features inside the bar's box are tracked with
+pyramidal Lucas-Kanade optical flow. A forward-backward consistency check
+rejects drifting points; the median displacement of the survivors moves
+the box. Confidence is the surviving fraction, so the session falls back
+to the detector as soon as tracking degrades.
+"""
+
+import logging
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAX_CORNERS = 40
+MIN_POINTS = 6
+MAX_FB_ERROR_PX = 1.0
+
+LK_PARAMS = dict(
+    winSize=(21, 21),
+    maxLevel=3,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03)
+)
+
+
+def to_gray(frame: np.ndarray) -> np.ndarray:
+    return frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+
+class OpticalFlowTracker:
+    """Lucas-Kanade point tracker seeded from the last detector box"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.prev_gray: Optional[np.ndarray] = None
+        self.points: Optional[np.ndarray] = None
+        self.center: Optional[Tuple[float, float]] = None
+        self.size: Tuple[float, float] = (0.0, 0.0)
+        self.confidence = 0.0
+
+    @property
+    def active(self) -> bool:
+        return self.points is not None
+
+    def seed(self, frame: np.ndarray, cx: float, cy: float, w: float, h: float) -> bool:
+        """
+        Start tracking the box (cx, cy, w, h) from this keyframe.
+
+        Returns:
+            True if enough trackable features were found
+        """
+        gray = to_gray(frame)
+        mask = np.zeros_like(gray)
+        x1, y1 = max(int(cx - w / 2), 0), max(int(cy - h / 2), 0)
+        x2, y2 = min(int(cx + w / 2), gray.shape[1]), min(int(cy + h / 2), gray.shape[0])
+        if x2 - x1 < 4 or y2 - y1 < 4:
+            self.reset()
+            return False
+        mask[y1:y2, x1:x2] = 255
+
+        points = cv2.goodFeaturesToTrack(gray, MAX_CORNERS, qualityLevel=0.01, minDistance=3, mask=mask)
+        if points is None or len(points) < MIN_POINTS:
+            self.reset()
+            return False
+
+        self.prev_gray = gray
+        self.points = points.astype(np.float32)
+        self.center = (cx, cy)
+        self.size = (w, h)
+        self.confidence = 1.0
+        return True
+
+    def track(self, frame: np.ndarray) -> Optional[Tuple[float, float, float]]:
+        """
+        Track the seeded box into this frame.
+
+        Returns:
+            (cx, cy, confidence) or None if tracking was lost
+        """
+        if not self.active:
+            return None
+
+        gray = to_gray(frame)
+        forward, status_f, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, self.points, None, **LK_PARAMS)
+        backward, status_b, _ = cv2.calcOpticalFlowPyrLK(gray, self.prev_gray, forward, None, **LK_PARAMS)
+
+        fb_error = np.linalg.norm((self.points - backward).reshape(-1, 2), axis=1)
+        good = (status_f.ravel() == 1) & (status_b.ravel() == 1) & (fb_error < MAX_FB_ERROR_PX)
+
+        self.confidence = float(good.sum()) / len(self.points)
+        if good.sum() < MIN_POINTS:
+            self.reset()
+            return None
+
+        shift = np.median((forward - self.points).reshape(-1, 2)[good], axis=0)
+        self.center = (self.center[0] + float(shift[0]), self.center[1] + float(shift[1]))
+        self.points = forward[good].reshape(-1, 1, 2)
+        self.prev_gray = gray
+        return self.center[0], self.center[1], self.confidence
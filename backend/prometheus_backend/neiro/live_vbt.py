@@ -0,0 +1,276 @@
+"""
+Neiro Live VBT - online bar velocity and rep detection per session
+
+Each tracking result (bar center + capture timestamp) is pushed into a
+fixed-size ring buffer, so memory per session is bounded regardless of
+set length. Position is low-pass filtered and differentiated into vertical
+bar velocity by signal_kernels.CausalDerivativeFilter (one-pole IIR,
+dt-aware, so dropped frames and jittery arrival don't skew velocity).
+
+Reps are detected online with a small state machine:
+- idle: waiting for upward velocity above START_VELOCITY
+- concentric: bottom = lowest point in the buffer since the last top;
+  ends when velocity falls below END_VELOCITY. If the bar travelled at
+  least MIN_ROM_M, a rep event is emitted with peak velocity, mean
+  concentric velocity and velocity loss versus the best rep of the set.
+  Only the last MAX_REPS rep records are kept; rep count, best and last
+  velocity are running values, so loss stays exact on long sessions.
+
+Scale comes from a calibrate command sent at session start (explicit
+px/m, a reference object, or the current barbell plate box). Without it
+the session runs in relative mode (px/s, like CalibrationManager tier 3).
+"""
+
+import os
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..calibration_manager import CalibrationManager
+from ..signal_kernels import CausalDerivativeFilter
+from ..velocity_autoregulation import DEFAULT_VELOCITY_LOSS_THRESHOLD, velocity_loss_recommendation
+
+BUFFER_SIZE = int(os.getenv("NEIRO_VBT_BUFFER_SIZE", "512"))  # ~17 s at 30 fps
+MAX_REPS = int(os.getenv("NEIRO_VBT_MAX_REPS", "100"))  # Rep records kept for summary()
+
+CUTOFF_HZ = 6.0
+START_VELOCITY = 0.10   # m/s upward to enter the concentric phase
+END_VELOCITY = 0.02     # m/s; below this the concentric phase is over
+MIN_ROM_M = 0.10        # Minimum concentric displacement for a rep
+MAX_GAP_S = 0.5         # Longer tracking gaps restart the filter
+
+# Relative mode: nominal scale so the thresholds above stay meaningful in px
+RELATIVE_PIXELS_PER_METER = 500.0
+
+
+class LiveVBT:
+    """Rolling trajectory, instantaneous velocity and online rep events"""
+
+    def __init__(self, buffer_size: int = BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self.calibration = CalibrationManager(verbose=False)
+        self.velocity_loss_threshold = DEFAULT_VELOCITY_LOSS_THRESHOLD
+        self.reset()
+
+    def reset(self):
+        """Clear the trajectory and rep history (calibration is kept)"""
+        self._t = np.zeros(self.buffer_size, dtype=np.float64)
+        self._y = np.zeros(self.buffer_size, dtype=np.float64)
+        self._v = np.zeros(self.buffer_size, dtype=np.float64)
+        self._count = 0  # Total samples ever pushed (ring index = count % size)
+
+        self._filter = CausalDerivativeFilter(CUTOFF_HZ)
+        self._v_filt = 0.0
+        self._last_t: Optional[float] = None
+
+        self.phase = "idle"
+        self._top_sample = 0
+        self._bottom_sample = 0
+        self.reps: deque = deque(maxlen=MAX_REPS)
+        self.rep_count = 0
+        self._best_velocity: Optional[float] = None
+        self._last_velocity: Optional[float] = None
+        self._measured_reps = 0  # Reps with a non-zero mean velocity
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # CALIBRATION
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def calibrate(self, cmd: Dict[str, Any], box_height_px: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Apply a calibrate command.
+
+        Args:
+            cmd: {"pixels_per_meter": 410}
+                 | {"reference": {"type": "weight_plate_45", "diameter_pixels": 180}}
+                 | {"plate_diameter_m": 0.45} (uses the current bar box height)
+            box_height_px: Height of the last detected bar box
+
+        Returns:
+            Calibration status reply
+        """
+        if cmd.get("velocity_loss_threshold"):
+            self.velocity_loss_threshold = float(cmd["velocity_loss_threshold"])
+
+        if cmd.get("pixels_per_meter"):
+            self.calibration.pixels_per_meter = float(cmd["pixels_per_meter"])
+            self.calibration.calibration_method = "reference"
+            self.calibration.confidence = 0.80
+            self.calibration.reference_object = "client"
+        elif cmd.get("reference"):
+            self.calibration._calibrate_with_user_reference(cmd["reference"])
+        elif box_height_px:
+            if self.calibration.calibrate_from_barbell(box_height_px, float(cmd.get("plate_diameter_m", 0.45))):
+                # Report like any reference-object calibration (m/s badge)
+                self.calibration.calibration_method = "reference"
+        else:
+            self.calibration._use_relative_speed()
+
+        return {
+            "status": "calibrated" if self.calibrated else "relative",
+            "pixels_per_meter": self.calibration.pixels_per_meter,
+            "calibration": self.calibration.get_calibration_info()
+        }
+
+    @property
+    def calibrated(self) -> bool:
+        return self.calibration.is_calibrated()
+
+    @property
+    def unit(self) -> str:
+        return "m/s" if self.calibrated else "px/s"
+
+    def _scale(self) -> float:
+        """Pixels per meter used for thresholds"""
+        return self.calibration.pixels_per_meter or RELATIVE_PIXELS_PER_METER
+
+    def _to_output(self, value_m: float) -> float:
+        """Meters (threshold scale) -> reported unit"""
+        return value_m if self.calibrated else value_m * RELATIVE_PIXELS_PER_METER
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # ONLINE UPDATE
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def update(self, timestamp_s: float, y_px: Optional[float]) -> Optional[Dict[str, Any]]:
+        """
+        Push one bar measurement.
+
+        Args:
+            timestamp_s: Capture time of the frame (seconds)
+            y_px: Raw bar center y in pixels, or None if the bar was not found
+
+        Returns:
+            Rep event dict when a rep was completed by this sample, else None
+        """
+        if y_px is None:
+            return None
+
+        dt = timestamp_s - self._last_t if self._last_t is not None else None
+        if dt is not None and dt <= 0:
+            return None  # Out-of-order or duplicate frame
+
+        if dt is None or dt > MAX_GAP_S:
+            # (Re)start the filter; a rep in progress can't be measured across the gap
+            dt = None
+            self.phase = "idle"
+            self._top_sample = self._count
+
+        y_filt, dy_dt = self._filter.update(y_px, dt)
+        # Image y grows downward: upward bar motion is positive velocity
+        self._v_filt = -dy_dt / self._scale()
+
+        self._last_t = timestamp_s
+        i = self._count % self.buffer_size
+        self._t[i] = timestamp_s
+        self._y[i] = y_filt
+        self._v[i] = self._v_filt
+        self._count += 1
+
+        return self._step()
+
+    @property
+    def velocity(self) -> float:
+        """Current filtered vertical velocity in the reported unit"""
+        return self._to_output(self._v_filt)
+
+    def _window(self, since_sample: int):
+        """Buffered (t, y, v) from an absolute sample number to now"""
+        start = max(since_sample, self._count - self.buffer_size, 0)
+        idx = np.arange(start, self._count) % self.buffer_size
+        return start, self._t[idx], self._y[idx], self._v[idx]
+
+    def _step(self) -> Optional[Dict[str, Any]]:
+        if self.phase == "idle":
+            if self._v_filt > START_VELOCITY:
+                start, _, y, _ = self._window(self._top_sample)
+                self._bottom_sample = start + int(np.argmax(y))  # Lowest bar position
+                self.phase = "concentric"
+            return None
+
+        if self._v_filt >= END_VELOCITY:
+            return None
+
+        # Concentric phase finished
+        self.phase = "idle"
+        self._top_sample = self._count - 1
+        _, t, y, v = self._window(self._bottom_sample)
+        rom_px = y[0] - y.min()
+        rom_m = rom_px / self._scale()
+        if rom_m < MIN_ROM_M:
+            return None
+
+        # Mean concentric velocity = time-weighted mean over the samples moving
+        # up; the causal filter delays the curve but preserves its area
+        dt = np.diff(t)
+        moving = v[1:] > END_VELOCITY
+        duration = float(dt[moving].sum())
+        if duration <= 0:
+            return None
+        mean_m = float((v[1:] * dt)[moving].sum()) / duration
+
+        return self._rep_event(rom_m, mean_m, duration, float(v.max()), t[0], t[-1])
+
+    def _rep_event(
+        self, rom_m: float, mean_m: float, duration: float, peak_m: float, start_s: float, end_s: float
+    ) -> Dict[str, Any]:
+        mean_velocity = self._to_output(mean_m)
+        rep = {
+            "rep": self.rep_count + 1,
+            "mean_velocity": round(mean_velocity, 3),
+            "peak_velocity": round(self._to_output(peak_m), 3),
+            "rom": round(self._to_output(rom_m), 3),
+            "concentric_ms": round(duration * 1000, 1),
+            "start_ts_us": int(start_s * 1_000_000),
+            "end_ts_us": int(end_s * 1_000_000)
+        }
+        self.reps.append(rep)
+        self.rep_count += 1
+        if rep["mean_velocity"]:
+            self._measured_reps += 1
+            self._last_velocity = rep["mean_velocity"]
+            self._best_velocity = max(self._best_velocity or 0.0, self._last_velocity)
+
+        loss = self._velocity_loss()
+        return {
+            "event": "rep",
+            **rep,
+            "velocity_loss_percent": loss["velocity_loss_percent"],
+            "stop_set": loss["stop_set"],
+            "unit": self.unit,
+            "rom_unit": "m" if self.calibrated else "px"
+        }
+
+    def _velocity_loss(self) -> Dict[str, Any]:
+        """Velocity loss of the last rep vs the best one, from the running values"""
+        if self._measured_reps > 1:
+            velocities = [self._best_velocity, self._last_velocity]
+        else:
+            velocities = [self._last_velocity]
+        return velocity_loss_recommendation(velocities, self.velocity_loss_threshold)
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # SNAPSHOTS
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def summary(self) -> Dict[str, Any]:
+        """Set summary for the client / connections endpoint (last MAX_REPS reps)"""
+        loss = self._velocity_loss()
+        return {
+            "rep_count": self.rep_count,
+            "reps": list(self.reps),
+            "velocity_loss_percent": loss["velocity_loss_percent"],
+            "stop_set": loss["stop_set"],
+            "unit": self.unit,
+            "calibrated": self.calibrated
+        }
+
+    def trajectory(self) -> Dict[str, List[float]]:
+        """Buffered trajectory (oldest first)"""
+        _, t, y, v = self._window(0)
+        return {
+            "t": t.round(4).tolist(),
+            "y": y.round(1).tolist(),
+            "velocity": [round(self._to_output(x), 3) for x in v]
+        }
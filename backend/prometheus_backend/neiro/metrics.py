@@ -0,0 +1,26 @@
+"""
+Neiro Metrics - bounded latency windows for status endpoints
+"""
+
+from collections import deque
+from typing import Dict
+
+import numpy as np
+
+
+class LatencyWindow:
+    """Last N latency samples (ms) with p50 / p95"""
+
+    def __init__(self, size: int = 512):
+        self._samples = deque(maxlen=size)
+        self.total = 0
+
+    def add(self, ms: float):
+        self._samples.append(ms)
+        self.total += 1
+
+    def percentiles(self) -> Dict:
+        if not self._samples:
+            return {"p50_ms": None, "p95_ms": None, "samples": 0}
+        p50, p95 = np.percentile(np.fromiter(self._samples, dtype=np.float64), (50, 95))
+        return {"p50_ms": round(float(p50), 1), "p95_ms": round(float(p95), 1), "samples": len(self._samples)}
@@ -0,0 +1,185 @@
+"""
+Neiro Model Registry - one YOLO detector per worker process
+
+The detector is loaded once (at router startup, or lazily by the first
+session) and shared by every WebSocket session. Backends implement
+DetectorBackend.detect_batch so sessions never depend on ultralytics
+types directly.
+"""
+
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════════════
+
+MODEL_DIR = Path(__file__).parent.parent
+MODEL_PATH = MODEL_DIR / "bestv2.pt"
+ONNX_MODEL_PATH = MODEL_DIR / "bestv2.onnx"
+QUANTIZED_MODEL_PATH = MODEL_DIR / "bestv2.int8.onnx"
+CONFIDENCE_THRESHOLD = 0.25
+IMGSZ = 640
+
+# "auto" prefers native onnxruntime (no torch import) when an .onnx model exists
+BACKEND = os.getenv("NEIRO_BACKEND", "auto").lower()
+USE_QUANTIZED = os.getenv("NEIRO_QUANTIZED", "false").lower() in ("1", "true", "yes")
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# DETECTOR BACKENDS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class DetectorBackend:
+    """Interface for barbell detectors shared across sessions"""
+
+    name = "base"
+    model_path: Optional[Path] = None
+
+    def detect_batch(self, frames: List[np.ndarray], imgsz: int = IMGSZ) -> List[np.ndarray]:
+        """
+        Detect barbells in a batch of BGR frames.
+
+        Returns:
+            One (K, 5) float array per frame: x1, y1, x2, y2, conf in
+            frame pixel coordinates
+        """
+        raise NotImplementedError
+
+
+class UltralyticsBackend(DetectorBackend):
+    """YOLO via the ultralytics wrapper (.pt, or .onnx through ultralytics)"""
+
+    name = "ultralytics"
+
+    def __init__(self, model_path: Path):
+        from ultralytics import YOLO
+
+        self.model_path = model_path
+        self.model = YOLO(str(model_path))
+
+    def detect_batch(self, frames: List[np.ndarray], imgsz: int = IMGSZ) -> List[np.ndarray]:
+        if not frames:
+            return []
+        results = self.model(frames, imgsz=imgsz, conf=CONFIDENCE_THRESHOLD, verbose=False)
+
+        detections = []
+        for result in results:
+            boxes = result.boxes
+            if boxes is None or len(boxes) == 0:
+                detections.append(np.zeros((0, 5), dtype=np.float32))
+                continue
+            xyxy = boxes.xyxy.cpu().numpy()
+            conf = boxes.conf.cpu().numpy()
+            detections.append(np.column_stack((xyxy, conf)).astype(np.float32))
+        return detections
+
+
+def _onnxruntime_available() -> bool:
+    try:
+        import onnxruntime  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def create_backend(backend: str = "auto", quantized: bool = False) -> Optional[DetectorBackend]:
+    """
+    Instantiate a detector backend.
+
+    Args:
+        backend: "auto", "onnxruntime" or "ultralytics"
+        quantized: Prefer the INT8 ONNX model (onnxruntime only)
+
+    Returns:
+        DetectorBackend, or None if no model file is available
+    """
+    onnx_path = QUANTIZED_MODEL_PATH if quantized and QUANTIZED_MODEL_PATH.exists() else ONNX_MODEL_PATH
+
+    if backend in ("auto", "onnxruntime") and onnx_path.exists():
+        if backend == "onnxruntime" or _onnxruntime_available():
+            from .onnx_backend import OnnxRuntimeBackend
+            logger.info(f"Loading ONNX Runtime model: {onnx_path}")
+            return OnnxRuntimeBackend(onnx_path)
+
+    # Try .pt first, fall back to .onnx through ultralytics
+    if MODEL_PATH.exists():
+        logger.info(f"Loading YOLO model: {MODEL_PATH}")
+        return UltralyticsBackend(MODEL_PATH)
+    if ONNX_MODEL_PATH.exists():
+        logger.info(f"Loading ONNX model: {ONNX_MODEL_PATH}")
+        return UltralyticsBackend(ONNX_MODEL_PATH)
+    return None
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# REGISTRY
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class ModelRegistry:
+    """Loads the detector once per process; thread-safe"""
+
+    def __init__(self):
+        self._detector: Optional[DetectorBackend] = None
+        self._lock = threading.Lock()
+        self.load_error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._detector is not None
+
+    def load(self) -> Optional[DetectorBackend]:
+        """Load the detector if needed and return it (None if unavailable)"""
+        if self._detector is not None:
+            return self._detector
+
+        with self._lock:
+            if self._detector is not None:
+                return self._detector
+
+            start_time = time.time()
+            try:
+                self._detector = create_backend(BACKEND, USE_QUANTIZED)
+                if self._detector is None:
+                    self.load_error = f"No model found at {MODEL_PATH} or {ONNX_MODEL_PATH}"
+                    logger.error(self.load_error)
+                    return None
+            except Exception as e:
+                self.load_error = str(e)
+                logger.error(f"Failed to load model: {e}")
+                return None
+
+            self.load_error = None
+            self.load_seconds = time.time() - start_time
+            logger.info(f"Model loaded successfully ({self._detector.name}, {self.load_seconds:.1f}s)")
+            return self._detector
+
+    def get_detector(self) -> Optional[DetectorBackend]:
+        return self.load()
+
+    def status(self) -> Dict:
+        detector = self._detector
+        return {
+            "loaded": detector is not None,
+            "backend": detector.name if detector else None,
+            "model_path": str(detector.model_path) if detector else None,
+            "load_seconds": round(self.load_seconds, 2) if self.load_seconds else None,
+            "error": self.load_error
+        }
+
+
+_registry = ModelRegistry()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Process-wide model registry"""
+    return _registry
@@ -0,0 +1,232 @@
+"""
+Neiro ONNX Runtime Backend - YOLO inference without torch / ultralytics
+
+Native onnxruntime session with our own letterbox preprocessing and NumPy
+NMS. Importing onnxruntime is a fraction of torch's import time and RSS,
+so workers cold-start much faster.
+
+Supports YOLOv8-style exports (N, 4 + classes, anchors) and YOLOv5-style
+exports (N, anchors, 5 + classes). An INT8 variant can be produced with
+quantize_model() (dynamic quantization, no calibration set needed).
+
+Usage:
+    python -m prometheus_backend.neiro.onnx_backend quantize [src.onnx] [dst.onnx]
+"""
+
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+from .model_registry import CONFIDENCE_THRESHOLD, IMGSZ, DetectorBackend
+
+logger = logging.getLogger(__name__)
+
+IOU_THRESHOLD = 0.45
+MAX_DETECTIONS = 100
+LETTERBOX_COLOR = (114, 114, 114)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# PRE / POST PROCESSING
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def letterbox(frame: np.ndarray, imgsz: int) -> Tuple[np.ndarray, float, Tuple[float, float]]:
+    """
+    Resize keeping aspect ratio and pad to a square imgsz x imgsz image.
+
+    Returns:
+        (padded BGR image, scale ratio, (pad_x, pad_y))
+    """
+    h, w = frame.shape[:2]
+    ratio = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * ratio)), int(round(h * ratio))
+    if (new_w, new_h) != (w, h):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    pad_x, pad_y = (imgsz - new_w) / 2, (imgsz - new_h) / 2
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    padded = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR)
+    return padded, ratio, (left, top)
+
+
+def to_input_tensor(images: List[np.ndarray]) -> np.ndarray:
+    """Stack letterboxed BGR images into an (N, 3, H, W) float32 RGB tensor"""
+    batch = np.stack(images)[..., ::-1]  # BGR -> RGB
+    return np.ascontiguousarray(batch.transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float = IOU_THRESHOLD) -> np.ndarray:
+    """
+    Greedy non-maximum suppression.
+
+    Args:
+        boxes: (K, 4) x1, y1, x2, y2
+        scores: (K,)
+
+    Returns:
+        Indices of kept boxes, highest score first
+    """
+    order = np.argsort(-scores)
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep = []
+    while len(order) and len(keep) < MAX_DETECTIONS:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        xx1 = np.maximum(boxes[i, 0], boxes[rest, 0])
+        yy1 = np.maximum(boxes[i, 1], boxes[rest, 1])
+        xx2 = np.minimum(boxes[i, 2], boxes[rest, 2])
+        yy2 = np.minimum(boxes[i, 3], boxes[rest, 3])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def decode_predictions(
+    output: np.ndarray,
+    conf_threshold: float = CONFIDENCE_THRESHOLD
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Raw head output for one image -> (boxes xyxy in letterbox pixels, scores).
+
+    Accepts (4 + C, A) YOLOv8 layout or (A, 5 + C) YOLOv5 layout.
+    """
+    if output.shape[0] < output.shape[1]:
+        # YOLOv8: rows are features, no objectness
+        preds = output.T
+        scores = preds[:, 4:].max(axis=1)
+    else:
+        preds = output
+        class_scores = preds[:, 5:] if preds.shape[1] > 5 else np.ones((len(preds), 1), dtype=preds.dtype)
+        scores = preds[:, 4] * class_scores.max(axis=1)
+
+    mask = scores >= conf_threshold
+    preds, scores = preds[mask], scores[mask]
+    if len(preds) == 0:
+        return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32)
+
+    cx, cy, w, h = preds[:, 0], preds[:, 1], preds[:, 2], preds[:, 3]
+    boxes = np.column_stack((cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2))
+    return boxes.astype(np.float32), scores.astype(np.float32)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# BACKEND
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class OnnxRuntimeBackend(DetectorBackend):
+    """YOLO detector on a native onnxruntime InferenceSession"""
+
+    name = "onnxruntime"
+
+    def __init__(self, model_path: Path, intra_op_threads: int = 0):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = intra_op_threads or int(os.getenv("NEIRO_ORT_THREADS", "0"))
+        if threads:
+            options.intra_op_num_threads = threads
+
+        self.model_path = model_path
+        self.session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+
+        # Static exports fix the batch size and/or input size
+        batch_dim, _, height_dim, _ = model_input.shape
+        self.fixed_batch = batch_dim if isinstance(batch_dim, int) else None
+        self.fixed_imgsz = height_dim if isinstance(height_dim, int) else None
+        if "int8" in model_path.name or "quant" in model_path.name:
+            self.name = "onnxruntime-int8"
+
+    def detect_batch(self, frames: List[np.ndarray], imgsz: int = IMGSZ) -> List[np.ndarray]:
+        if not frames:
+            return []
+        imgsz = self.fixed_imgsz or imgsz
+
+        prepared = [letterbox(frame, imgsz) for frame in frames]
+        tensor = to_input_tensor([image for image, _, _ in prepared])
+
+        outputs = self._run(tensor)
+
+        detections = []
+        for output, (_, ratio, (pad_x, pad_y)), frame in zip(outputs, prepared, frames):
+            boxes, scores = decode_predictions(output)
+            if len(boxes):
+                keep = nms(boxes, scores)
+                boxes, scores = boxes[keep], scores[keep]
+                # Undo letterbox -> original frame pixels
+                boxes[:, [0, 2]] = (boxes[:, [0, 2]] - pad_x) / ratio
+                boxes[:, [1, 3]] = (boxes[:, [1, 3]] - pad_y) / ratio
+                h, w = frame.shape[:2]
+                boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w)
+                boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h)
+            detections.append(np.column_stack((boxes, scores)).astype(np.float32))
+        return detections
+
+    def _run(self, tensor: np.ndarray) -> np.ndarray:
+        """
+        Run the model on an (N, 3, H, W) tensor of any N.
+
+        Static-batch exports get chunks of exactly fixed_batch images; the
+        last chunk is padded with blank images whose outputs are dropped.
+        """
+        batch = self.fixed_batch
+        if not batch or len(tensor) == batch:
+            return self.session.run(None, {self.input_name: tensor})[0]
+
+        outputs = []
+        for start in range(0, len(tensor), batch):
+            chunk = tensor[start:start + batch]
+            count = len(chunk)
+            if count < batch:
+                padding = np.zeros((batch - count,) + chunk.shape[1:], dtype=chunk.dtype)
+                chunk = np.concatenate((chunk, padding))
+            outputs.append(self.session.run(None, {self.input_name: chunk})[0][:count])
+        return np.concatenate(outputs)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# QUANTIZATION
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def quantize_model(src: Path, dst: Path) -> Path:
+    """
+    Write an INT8 (dynamic, per-channel weight) quantized copy of a model.
+
+    Dynamic quantization needs no calibration images; activations are
+    quantized at runtime. Check accuracy with the benchmark before
+    enabling NEIRO_QUANTIZED in production.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(
+        model_input=str(src),
+        model_output=str(dst),
+        weight_type=QuantType.QUInt8,
+        per_channel=True,
+        op_types_to_quantize=["Conv", "MatMul"]
+    )
+    logger.info(f"Quantized model written: {dst}")
+    return dst
+
+
+if __name__ == "__main__":
+    from .model_registry import ONNX_MODEL_PATH, QUANTIZED_MODEL_PATH
+
+    if len(sys.argv) < 2 or sys.argv[1] != "quantize":
+        print(__doc__)
+        sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO)
+    source = Path(sys.argv[2]) if len(sys.argv) > 2 else ONNX_MODEL_PATH
+    target = Path(sys.argv[3]) if len(sys.argv) > 3 else QUANTIZED_MODEL_PATH
+    quantize_model(source, target)
@@ -0,0 +1,145 @@
+"""
+Neiro Wire Protocol - negotiated compact binary results with timestamps
+
+Negotiation (text message, first thing after connect; optional):
+    -> {"action": "hello", "protocol": "binary"}         (or "json")
+       {"action": "hello", "protocol": "json", "frame_header": true}
+    <- {"status": "hello", "protocol": "binary", "result_size": 52, ...}
+
+Clients that never send hello keep the legacy protocol: raw JPEG in,
+JSON out (the server then stamps seq / receive time itself).
+
+Binary frames (client -> server, when frame_header is on):
+    FRAME_HEADER  "<2sHIQ"  magic b"NF" | flags u16 | seq u32 | capture_ts_us u64
+    followed by the JPEG bytes
+
+Binary results (server -> client, protocol "binary"):
+    RESULT        "<2sHIQQ6fI"  magic b"NR" | flags u16 | seq u32
+                  | capture_ts_us u64 (echoed) | server_ts_us u64
+                  | x, y, w, h, conf, inference_ms f32 | dropped_frames u32
+    Every frame gets exactly one result; frames over the rate limit get an
+    error result with FLAG_RATE_LIMITED set.
+
+Commands, acknowledgements and events stay JSON text in both modes.
+"""
+
+import struct
+import time
+from typing import Any, Dict, Optional, Tuple
+
+PROTOCOL_JSON = "json"
+PROTOCOL_BINARY = "binary"
+
+FRAME_MAGIC = b"NF"
+RESULT_MAGIC = b"NR"
+FRAME_HEADER = struct.Struct("<2sHIQ")
+RESULT = struct.Struct("<2sHIQQ6fI")
+
+# RESULT flags
+FLAG_DETECTED = 0x1
+FLAG_FLOW = 0x2
+FLAG_ERROR = 0x4
+FLAG_RATE_LIMITED = 0x8
+
+
+class ProtocolError(ValueError):
+    """Raised for malformed binary frames"""
+
+
+def now_us() -> int:
+    """Server wall clock in microseconds"""
+    return int(time.time() * 1_000_000)
+
+
+def decode_frame(data: bytes) -> Tuple[int, int, bytes]:
+    """
+    Split a header-prefixed frame.
+
+    Returns:
+        (seq, capture_ts_us, jpeg_bytes)
+    """
+    if len(data) < FRAME_HEADER.size:
+        raise ProtocolError("Frame shorter than header")
+    magic, _flags, seq, capture_ts_us = FRAME_HEADER.unpack_from(data)
+    if magic != FRAME_MAGIC:
+        raise ProtocolError("Bad frame magic")
+    return seq, capture_ts_us, data[FRAME_HEADER.size:]
+
+
+def encode_frame(jpeg: bytes, seq: int, capture_ts_us: int) -> bytes:
+    """Client-side helper (used by tests and the replay tool)"""
+    return FRAME_HEADER.pack(FRAME_MAGIC, 0, seq & 0xFFFFFFFF, capture_ts_us) + jpeg
+
+
+def encode_result(result: Dict[str, Any]) -> bytes:
+    """Pack a tracker result dict (with seq / capture_ts_us) into RESULT"""
+    flags = 0
+    if result.get("conf"):
+        flags |= FLAG_DETECTED
+    if result.get("source") == "flow":
+        flags |= FLAG_FLOW
+    if "error" in result:
+        flags |= FLAG_ERROR
+    if result.get("rate_limited"):
+        flags |= FLAG_RATE_LIMITED
+
+    return RESULT.pack(
+        RESULT_MAGIC,
+        flags,
+        int(result.get("seq", 0)) & 0xFFFFFFFF,
+        int(result.get("capture_ts_us", 0)),
+        int(result.get("server_ts_us", now_us())),
+        float(result.get("x", 0)),
+        float(result.get("y", 0)),
+        float(result.get("w", 0)),
+        float(result.get("h", 0)),
+        float(result.get("conf", 0)),
+        float(result.get("inference_ms", 0)),
+        int(result.get("dropped_frames", 0))
+    )
+
+
+def decode_result(data: bytes) -> Dict[str, Any]:
+    """Inverse of encode_result (client side / tests)"""
+    (magic, flags, seq, capture_ts_us, server_ts_us,
+     x, y, w, h, conf, inference_ms, dropped_frames) = RESULT.unpack(data)
+    if magic != RESULT_MAGIC:
+        raise ProtocolError("Bad result magic")
+    return {
+        "seq": seq,
+        "capture_ts_us": capture_ts_us,
+        "server_ts_us": server_ts_us,
+        "x": x, "y": y, "w": w, "h": h,
+        "conf": conf,
+        "inference_ms": inference_ms,
+        "dropped_frames": dropped_frames,
+        "source": "flow" if flags & FLAG_FLOW else "detector",
+        "error": bool(flags & FLAG_ERROR),
+        "rate_limited": bool(flags & FLAG_RATE_LIMITED)
+    }
+
+
+def negotiate(cmd: Dict[str, Any]) -> Tuple[str, bool, Dict[str, Any]]:
+    """
+    Handle a hello command.
+
+    Returns:
+        (protocol, frame_header, hello reply)
+    """
+    protocol = cmd.get("protocol", PROTOCOL_JSON)
+    if protocol not in (PROTOCOL_JSON, PROTOCOL_BINARY):
+        protocol = PROTOCOL_JSON
+    frame_header = protocol == PROTOCOL_BINARY or bool(cmd.get("frame_header", False))
+
+    reply = {
+        "status": "hello",
+        "protocol": protocol,
+        "frame_header": frame_header,
+        "server_ts_us": now_us()
+    }
+    if frame_header:
+        reply["frame_header_format"] = FRAME_HEADER.format
+    if protocol == PROTOCOL_BINARY:
+        reply["result_format"] = RESULT.format
+        reply["result_size"] = RESULT.size
+    return protocol, frame_header, reply
@@ -0,0 +1,139 @@
+"""
+Neiro Session Recorder - compact on-disk log of one tracking session
+
+Opt-in: recording needs NEIRO_RECORD_DIR, and then either a
+{"action": "record"} command from the client or NEIRO_RECORD_ALL=1.
+
+File layout (<session_id>_<unix_ts>.nrec):
+    FILE_HEADER   "<4sH"   magic b"NREC" | version u16
+    records       "<BQI"   kind u8 | server_ts_us u64 | length u32, payload
+
+Record kinds:
+    FRAME    protocol.encode_frame(jpeg, seq, capture_ts_us) - the frames the
+             tracker actually processed (latest-frame-wins drops excluded)
+    COMMAND  JSON command text as received
+    RESULT   JSON result / event as sent (compact separators)
+
+JPEGs are stored as received, so a recording costs about the same as the
+uploaded stream. Writes happen on a background thread behind a bounded
+queue; if the disk can't keep up, records are dropped and counted rather
+than stalling the session.
+"""
+
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from .protocol import decode_frame, encode_frame, now_us
+
+logger = logging.getLogger(__name__)
+
+RECORD_DIR = os.getenv("NEIRO_RECORD_DIR", "")
+RECORD_ALL = os.getenv("NEIRO_RECORD_ALL", "0") == "1"
+QUEUE_SIZE = int(os.getenv("NEIRO_RECORD_QUEUE", "256"))
+
+FILE_MAGIC = b"NREC"
+FILE_VERSION = 1
+FILE_HEADER = struct.Struct("<4sH")
+RECORD_HEADER = struct.Struct("<BQI")
+
+KIND_FRAME = 1
+KIND_COMMAND = 2
+KIND_RESULT = 3
+
+
+def recording_enabled() -> bool:
+    return bool(RECORD_DIR)
+
+
+class SessionRecorder:
+    """Append-only session log written by a background thread"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=QUEUE_SIZE)
+        self.records = 0
+        self.dropped_records = 0
+        self._thread = threading.Thread(target=self._write_loop, name="neiro-recorder", daemon=True)
+        self._thread.start()
+        logger.info(f"Recording session to {self.path}")
+
+    @classmethod
+    def for_session(cls, session_id: str) -> Optional["SessionRecorder"]:
+        """New recorder in NEIRO_RECORD_DIR (None if recording is disabled)"""
+        if not recording_enabled():
+            return None
+        safe_id = "".join(c if c.isalnum() else "_" for c in session_id)
+        return cls(Path(RECORD_DIR) / f"{safe_id}_{int(time.time())}.nrec")
+
+    def _put(self, kind: int, payload: bytes):
+        try:
+            self._queue.put_nowait(RECORD_HEADER.pack(kind, now_us(), len(payload)) + payload)
+            self.records += 1
+        except queue.Full:
+            self.dropped_records += 1
+
+    def frame(self, jpeg: bytes, seq: int, capture_ts_us: int):
+        self._put(KIND_FRAME, encode_frame(jpeg, seq, capture_ts_us))
+
+    def command(self, text: str):
+        self._put(KIND_COMMAND, text.encode("utf-8"))
+
+    def result(self, result: Dict[str, Any]):
+        self._put(KIND_RESULT, json.dumps(result, separators=(",", ":")).encode("utf-8"))
+
+    def close(self):
+        """Flush pending records and stop the writer thread"""
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+        if self.dropped_records:
+            logger.warning(f"Recorder dropped {self.dropped_records} records ({self.path.name})")
+
+    def _write_loop(self):
+        with open(self.path, "wb") as f:
+            f.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION))
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    break
+                f.write(record)
+
+
+def read_recording(path: str) -> Iterator[Tuple[int, int, Any]]:
+    """
+    Iterate a recording.
+
+    Yields:
+        (kind, server_ts_us, payload) where payload is
+        (seq, capture_ts_us, jpeg) for frames, the command text for
+        commands and the result dict for results
+    """
+    with open(path, "rb") as f:
+        magic, version = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+        if magic != FILE_MAGIC:
+            raise ValueError(f"{path} is not a Neiro recording")
+        if version != FILE_VERSION:
+            raise ValueError(f"Unsupported recording version {version}")
+
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return  # End of file (or a truncated final record)
+            kind, server_ts_us, length = RECORD_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                return
+
+            if kind == KIND_FRAME:
+                yield kind, server_ts_us, decode_frame(payload)
+            elif kind == KIND_COMMAND:
+                yield kind, server_ts_us, payload.decode("utf-8")
+            elif kind == KIND_RESULT:
+                yield kind, server_ts_us, json.loads(payload)
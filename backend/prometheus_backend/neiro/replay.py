@@ -0,0 +1,179 @@
+"""
+Neiro Replay - feed a session recording through BarbellTracker offline
+
+Frames are decoded up front and replayed through the synchronous
+BarbellTracker.detect at maximum speed, with recorded commands (lock,
+unlock, reset, calibrate) applied at their logged position. This gives:
+- a throughput benchmark (frames/s and per-frame latency of the tracker)
+- a regression test: replayed positions are compared per seq with the
+  results recorded live; --check exits non-zero on any drift beyond
+  --tolerance pixels (smoothing, locking, keyframe or ROI changes)
+
+Usage:
+    python -m prometheus_backend.neiro.replay SESSION.nrec [--backend auto]
+        [--quantized] [--tolerance 1.0] [--check] [--output replay.jsonl]
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .live_vbt import LiveVBT
+from .model_registry import create_backend
+from .recorder import KIND_COMMAND, KIND_FRAME, KIND_RESULT, read_recording
+from .session import decode_jpeg
+from .tracker import BarbellTracker
+
+
+def load_recording(path: str) -> Tuple[List[Tuple[str, Any]], Dict[int, Dict[str, Any]]]:
+    """
+    Split a recording into replay steps and the live results.
+
+    Returns:
+        (steps, recorded) - steps are ("frame", (seq, capture_ts_us, frame))
+        or ("command", cmd) in log order; recorded maps seq -> live result
+    """
+    steps: List[Tuple[str, Any]] = []
+    recorded: Dict[int, Dict[str, Any]] = {}
+
+    for kind, _server_ts_us, payload in read_recording(path):
+        if kind == KIND_FRAME:
+            seq, capture_ts_us, jpeg = payload
+            frame = decode_jpeg(jpeg)
+            if frame is not None:
+                steps.append(("frame", (seq, capture_ts_us, frame)))
+        elif kind == KIND_COMMAND:
+            try:
+                steps.append(("command", json.loads(payload)))
+            except json.JSONDecodeError:
+                continue
+        elif kind == KIND_RESULT and "seq" in payload and "event" not in payload:
+            recorded[payload["seq"]] = payload
+
+    return steps, recorded
+
+
+def apply_command(tracker: BarbellTracker, vbt: LiveVBT, cmd: Dict[str, Any]):
+    """Mirror the state-changing WebSocket commands"""
+    action = cmd.get("action", "")
+    if action == "lock":
+        tracker.lock_to_position(cmd.get("x", 0), cmd.get("y", 0))
+    elif action == "unlock":
+        tracker.unlock()
+    elif action == "reset":
+        tracker.reset()
+        vbt.reset()
+    elif action == "calibrate":
+        vbt.calibrate(cmd, tracker.last_box_size[1] or None)
+
+
+def replay(
+    steps: List[Tuple[str, Any]],
+    tracker: BarbellTracker,
+    recorded: Optional[Dict[int, Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Run the replay and compare with the recorded results.
+
+    Returns:
+        Report dict (throughput, latency percentiles, drift, rep events)
+    """
+    vbt = LiveVBT()
+    recorded = recorded or {}
+    latencies = []
+    deviations = []
+    results = []
+    reps = []
+
+    start_time = time.perf_counter()
+    for kind, payload in steps:
+        if kind == "command":
+            apply_command(tracker, vbt, payload)
+            continue
+
+        seq, capture_ts_us, frame = payload
+        t0 = time.perf_counter()
+        result = tracker.detect(frame)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+        measurement = tracker.last_measurement
+        rep_event = vbt.update(capture_ts_us / 1_000_000, measurement[1] if measurement else None)
+        if rep_event is not None:
+            reps.append(rep_event)
+
+        result["seq"] = seq
+        results.append(result)
+
+        live = recorded.get(seq)
+        if live is not None and "error" not in live and "error" not in result:
+            deviations.append(max(abs(result["x"] - live["x"]), abs(result["y"] - live["y"])))
+
+    elapsed = time.perf_counter() - start_time
+    frames = len(latencies)
+
+    return {
+        "frames": frames,
+        "elapsed_s": round(elapsed, 3),
+        "fps": round(frames / elapsed, 1) if elapsed > 0 else None,
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2) if latencies else None,
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2) if latencies else None,
+        "detector_frames": frames - tracker.flow_frame_count,
+        "flow_frames": tracker.flow_frame_count,
+        "roi_frames": tracker.roi_count,
+        "compared": len(deviations),
+        "max_deviation_px": round(max(deviations), 3) if deviations else None,
+        "mean_deviation_px": round(float(np.mean(deviations)), 3) if deviations else None,
+        "reps": reps,
+        "results": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a Neiro session recording")
+    parser.add_argument("recording", help="Path to a .nrec file")
+    parser.add_argument("--backend", default="auto", help="ultralytics | onnxruntime | auto")
+    parser.add_argument("--quantized", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="Allowed drift in pixels")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if drift exceeds tolerance")
+    parser.add_argument("--output", default="", help="Write replayed results as JSON lines")
+    args = parser.parse_args()
+
+    steps, recorded = load_recording(args.recording)
+    detector = create_backend(args.backend, args.quantized)
+    if detector is None:
+        print("❌ No detector model available")
+        sys.exit(2)
+
+    report = replay(steps, BarbellTracker(detector), recorded)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            for result in report["results"]:
+                f.write(json.dumps(result, separators=(",", ":")) + "\n")
+
+    print("\n" + "=" * 60)
+    print(f"NEIRO REPLAY: {args.recording}")
+    print("=" * 60)
+    for key, value in report.items():
+        if key in ("results", "reps"):
+            continue
+        print(f"   {key:<20} {value}")
+    print(f"   {'reps':<20} {len(report['reps'])}")
+    for rep in report["reps"]:
+        print(f"      #{rep['rep']}: mean {rep['mean_velocity']} {rep['unit']}, "
+              f"peak {rep['peak_velocity']}, loss {rep['velocity_loss_percent']}%")
+
+    if args.check:
+        drift = report["max_deviation_px"] or 0.0
+        if drift > args.tolerance:
+            print(f"\n❌ Drift {drift:.2f}px exceeds tolerance {args.tolerance:.2f}px")
+            sys.exit(1)
+        print(f"\n✅ Replay matches recording ({report['compared']} frames compared)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Neiro Session - per-connection frame pipeline off the event loop
+
+Each WebSocket connection gets one NeiroSession with a single-slot
+mailbox and one worker task:
+- The receive loop only drops the latest JPEG into the slot (never blocks)
+- If a frame is still waiting when the next one arrives, the stale frame
+  is replaced (latest-frame-wins) and counted in dropped_frames
+- The worker decodes on a thread pool, awaits batched inference and sends
+  the result, so frames of one session are processed strictly in order
+- Every result carries the frame's seq and capture timestamp (client
+  supplied with the negotiated frame header, else server receive time)
+- Results feed the session's LiveVBT; completed reps are pushed as JSON
+  "rep" events
+- Frames above max_fps (token bucket, FPS_BURST frames of jitter) are
+  rejected before they reach the mailbox and answered right away with a
+  rate_limited result (rate_limited_frames); receive -> send latency
+  feeds p50/p95
+- Optionally everything is logged by a SessionRecorder for offline replay
+- Tracker commands (lock / unlock / reset) are queued and applied by the
+  worker between frames, never while optical flow runs on the thread pool
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .live_vbt import LiveVBT
+from .metrics import LatencyWindow
+from .protocol import PROTOCOL_BINARY, PROTOCOL_JSON, decode_frame, encode_result, now_us
+from .recorder import SessionRecorder
+from .tracker import BarbellTracker
+
+logger = logging.getLogger(__name__)
+
+DECODE_WORKERS = int(os.getenv("NEIRO_DECODE_WORKERS", "2"))
+MAX_FPS = float(os.getenv("NEIRO_MAX_FPS", "30"))
+FPS_BURST = float(os.getenv("NEIRO_FPS_BURST", "3"))
+
+# cv2.imdecode releases the GIL, so a small shared pool decodes in parallel
+_decode_executor = ThreadPoolExecutor(max_workers=DECODE_WORKERS, thread_name_prefix="neiro-decode")
+
+
+def decode_jpeg(data: bytes) -> Optional[np.ndarray]:
+    """Decode a JPEG/PNG frame to a BGR array (None if invalid)"""
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+class NeiroSession:
+    """Latest-frame-wins processing pipeline for one WebSocket connection"""
+
+    def __init__(
+        self,
+        tracker: BarbellTracker,
+        send: Callable[[Dict[str, Any]], Awaitable[None]],
+        inference_server,
+        send_bytes: Optional[Callable[[bytes], Awaitable[None]]] = None,
+        client_id: str = "",
+        max_fps: float = MAX_FPS
+    ):
+        """
+        Args:
+            tracker: Session tracker state (lock, EMA, counters)
+            send: Coroutine that delivers a JSON dict to the client
+            inference_server: BatchInferenceServer shared by all sessions
+            send_bytes: Coroutine for binary results (binary protocol)
+            client_id: Remote host:port (informational; sessions are keyed by session_id)
+            max_fps: Per-session frame-rate cap (0 disables)
+        """
+        self.session_id = uuid.uuid4().hex
+        self.client_id = client_id
+        self.connected_at = time.time()
+        self.last_activity = time.monotonic()
+        self.tracker = tracker
+        self._send = send
+        self._send_bytes = send_bytes
+        self._send_lock = asyncio.Lock()
+        self.inference_server = inference_server
+        self.vbt = LiveVBT()
+        self.recorder: Optional[SessionRecorder] = None
+
+        # Negotiated via hello (legacy clients: JSON, no frame header)
+        self.protocol = PROTOCOL_JSON
+        self.frame_header = False
+        self._next_seq = 0
+
+        # Token bucket: max_fps frames per second, bursts up to FPS_BURST
+        self.max_fps = max_fps
+        self._frame_tokens = FPS_BURST
+        self._tokens_updated = time.monotonic()
+
+        self._pending: Optional[Tuple[bytes, int, int, float]] = None
+        self._commands: Deque[Callable[[], None]] = deque()
+        self._frame_ready = asyncio.Event()
+        self._worker: Optional[asyncio.Task] = None
+
+        self.frames_received = 0
+        self.dropped_frames = 0
+        self.rate_limited_frames = 0
+        self.latency = LatencyWindow()
+
+    def start(self):
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self.recorder is not None:
+            recorder, self.recorder = self.recorder, None
+            await asyncio.get_running_loop().run_in_executor(None, recorder.close)
+
+    def start_recording(self) -> bool:
+        """Start logging this session (needs NEIRO_RECORD_DIR)"""
+        if self.recorder is None:
+            self.recorder = SessionRecorder.for_session(self.session_id)
+        return self.recorder is not None
+
+    def record_command(self, text: str):
+        if self.recorder is not None:
+            self.recorder.command(text)
+
+    async def send(self, payload: Dict[str, Any]):
+        """Send to the client (serialized with the worker's results)"""
+        async with self._send_lock:
+            await self._send(payload)
+
+    async def send_result(self, result: Dict[str, Any]):
+        """Send a tracking result in the negotiated protocol"""
+        if self.protocol == PROTOCOL_BINARY and self._send_bytes is not None:
+            async with self._send_lock:
+                await self._send_bytes(encode_result(result))
+        else:
+            await self.send(result)
+
+    def configure_protocol(self, protocol: str, frame_header: bool):
+        self.protocol = protocol
+        self.frame_header = frame_header
+
+    def _take_frame_token(self, now: float) -> bool:
+        if self.max_fps <= 0:
+            return True
+        elapsed = now - self._tokens_updated
+        self._frame_tokens = min(FPS_BURST, self._frame_tokens + elapsed * self.max_fps)
+        self._tokens_updated = now
+        if self._frame_tokens < 1:
+            return False
+        self._frame_tokens -= 1
+        return True
+
+    def offer_frame(self, data: bytes) -> Optional[Dict[str, Any]]:
+        """
+        Hand a frame to the worker; replaces a frame that is still waiting.
+
+        Returns:
+            A rate_limited result to send back (see send_result) if the
+            frame is over the rate limit, else None
+
+        Raises:
+            ProtocolError: If the negotiated frame header is malformed
+        """
+        received = time.monotonic()
+        self.last_activity = received
+
+        if self.frame_header:
+            seq, capture_ts_us, data = decode_frame(data)
+        else:
+            seq, capture_ts_us = self._next_seq, now_us()
+            self._next_seq += 1
+
+        if not self._take_frame_token(received):
+            self.rate_limited_frames += 1
+            return {
+                "error": "Rate limited",
+                "rate_limited": True,
+                "max_fps": self.max_fps,
+                "seq": seq,
+                "capture_ts_us": capture_ts_us,
+                "server_ts_us": now_us(),
+                "dropped_frames": self.dropped_frames,
+                "rate_limited_frames": self.rate_limited_frames
+            }
+
+        self.frames_received += 1
+        if self._pending is not None:
+            self.dropped_frames += 1
+        self._pending = (data, seq, capture_ts_us, received)
+        self._frame_ready.set()
+        return None
+
+    def submit_command(self, command: Callable[[], None]):
+        """
+        Queue a tracker state change for the worker.
+
+        The worker applies commands before the next frame, so they never
+        overlap optical flow running on the thread pool; frames offered
+        after the command see its effect.
+        """
+        self._commands.append(command)
+        self._frame_ready.set()
+
+    def _apply_commands(self):
+        while self._commands:
+            command = self._commands.popleft()
+            try:
+                command()
+            except Exception as e:
+                logger.error(f"Command error: {e}")
+
+    @property
+    def queue_depth(self) -> int:
+        return 1 if self._pending is not None else 0
+
+    def touch(self):
+        """Mark activity (commands count as activity for the idle timeout)"""
+        self.last_activity = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "client": self.client_id,
+            "connected_s": round(time.time() - self.connected_at, 1),
+            "idle_s": round(time.monotonic() - self.last_activity, 1),
+            "protocol": self.protocol,
+            "frames_received": self.frames_received,
+            "dropped_frames": self.dropped_frames,
+            "rate_limited_frames": self.rate_limited_frames,
+            "queue_depth": self.queue_depth,
+            "latency": self.latency.percentiles(),
+            "recording": self.recorder is not None
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._frame_ready.wait()
+            self._frame_ready.clear()
+            self._apply_commands()
+            pending, self._pending = self._pending, None
+            if pending is None:
+                continue
+            data, seq, capture_ts_us, received = pending
+            if self.recorder is not None:
+                self.recorder.frame(data, seq, capture_ts_us)
+
+            try:
+                frame = await loop.run_in_executor(_decode_executor, decode_jpeg, data)
+                if frame is None:
+                    await self.send({"error": "Invalid image data", "seq": seq, "dropped_frames": self.dropped_frames})
+                    continue
+
+                result = await self.tracker.detect_batched(frame, self.inference_server, _decode_executor)
+                result["seq"] = seq
+                result["capture_ts_us"] = capture_ts_us
+                result["server_ts_us"] = now_us()
+                result["dropped_frames"] = self.dropped_frames
+
+                measurement = self.tracker.last_measurement
+                rep_event = self.vbt.update(capture_ts_us / 1_000_000, measurement[1] if measurement else None)
+                result["velocity"] = round(self.vbt.velocity, 3)
+
+                await self.send_result(result)
+                self.latency.add((time.monotonic() - received) * 1000)
+                if rep_event is not None:
+                    rep_event["seq"] = seq
+                    await self.send(rep_event)
+
+                if self.recorder is not None:
+                    self.recorder.result(result)
+                    if rep_event is not None:
+                        self.recorder.result(rep_event)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Frame processing error: {e}")
+                try:
+                    await self.send({"error": str(e)})
+                except Exception:
+                    return  # Socket is gone; the receive loop cleans up
@@ -0,0 +1,363 @@
+"""
+Neiro Barbell Tracker - per-connection session state
+
+A BarbellTracker holds only what belongs to one lifter's session (lock
+position, EMA smoothing, counters); the YOLO model itself is the shared
+detector from the model registry.
+
+Locked sessions run hybrid tracking: YOLO on keyframes (every
+KEYFRAME_INTERVAL frames, or as soon as optical-flow confidence drops)
+and Lucas-Kanade optical flow around the locked bar in between.
+
+Locked keyframes only run the detector on a square window around the
+lock (lock_radius plus the bar box) at ROI_IMGSZ instead of the full
+frame at IMGSZ; boxes are mapped back to frame coordinates. If the bar
+is not found in the window the same frame is re-run full-frame, so a
+lost bar is re-acquired immediately. (ONNX models exported with a fixed
+input size still run at that size; they gain accuracy, not speed.)
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from .flow_tracker import OpticalFlowTracker
+from .model_registry import DetectorBackend, IMGSZ, get_model_registry
+
+logger = logging.getLogger(__name__)
+
+KEYFRAME_INTERVAL = int(os.getenv("NEIRO_KEYFRAME_INTERVAL", "5"))
+MIN_FLOW_CONFIDENCE = float(os.getenv("NEIRO_MIN_FLOW_CONFIDENCE", "0.5"))
+ROI_IMGSZ = int(os.getenv("NEIRO_ROI_IMGSZ", "320"))
+ROI_ENABLED = os.getenv("NEIRO_ROI", "1") != "0"
+# Skip the crop when the window would cover most of the frame anyway
+MAX_ROI_AREA_FRACTION = 0.6
+
+
+class BarbellTracker:
+    """YOLO-based barbell tracker with position locking and smoothing"""
+
+    def __init__(self, detector: Optional[DetectorBackend] = None):
+        self.detector = detector
+        self.locked_position: Optional[tuple] = None
+        self.lock_radius = 200
+        self.ema_alpha = 0.4
+        self.smoothed_x: Optional[float] = None
+        self.smoothed_y: Optional[float] = None
+        self.frame_count = 0
+        self.detection_count = 0
+        self.last_inference_ms = 0
+        self.last_measurement: Optional[Tuple[float, float]] = None  # Raw (x, y) of the last frame
+
+        # Hybrid keyframe / optical-flow tracking (locked sessions only)
+        self.flow = OpticalFlowTracker()
+        self.keyframe_interval = KEYFRAME_INTERVAL
+        self.frames_since_keyframe = 0
+        self.flow_frame_count = 0
+        self.last_box_size: Tuple[float, float] = (0.0, 0.0)
+
+        # Region-of-interest keyframes (locked sessions only)
+        self.roi_enabled = ROI_ENABLED
+        self.roi_count = 0
+        self.roi_miss_count = 0
+
+    def initialize(self) -> bool:
+        """Attach the shared detector (loads it on first use only)"""
+        if self.detector is None:
+            self.detector = get_model_registry().get_detector()
+        return self.detector is not None
+
+    def lock_to_position(self, x: float, y: float):
+        """Lock detection to a specific position (tap-to-lock)"""
+        self.locked_position = (x, y)
+        self.smoothed_x = x
+        self.smoothed_y = y
+        self.flow.reset()  # New target: next frame is a keyframe
+        logger.info(f"Locked to position: ({x:.0f}, {y:.0f})")
+
+    def unlock(self):
+        """Unlock position tracking"""
+        self.locked_position = None
+        self.flow.reset()
+        logger.info("Position unlocked")
+
+    def reset(self):
+        """Reset tracker state for new session"""
+        self.locked_position = None
+        self.smoothed_x = None
+        self.smoothed_y = None
+        self.frame_count = 0
+        self.detection_count = 0
+        self.flow_frame_count = 0
+        self.roi_count = 0
+        self.roi_miss_count = 0
+        self.last_measurement = None
+        self.flow.reset()
+        logger.info("Tracker reset")
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # KEYFRAME SCHEDULING
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def needs_detection(self) -> bool:
+        """True if this frame must go through the detector"""
+        return (
+            self.locked_position is None
+            or not self.flow.active
+            or self.frames_since_keyframe >= self.keyframe_interval
+            or self.flow.confidence < MIN_FLOW_CONFIDENCE
+        )
+
+    def _seed_flow(self, frame: np.ndarray, result: Dict[str, Any]):
+        """After a keyframe detection, start optical flow on the raw box"""
+        self.frames_since_keyframe = 0
+        if self.locked_position is None or not result.get("conf"):
+            self.flow.reset()
+            return
+        self.flow.seed(frame, result["raw_x"], result["raw_y"], result["w"], result["h"])
+
+    def apply_flow(self, measurement: Optional[Tuple[float, float, float]], elapsed_ms: float) -> Optional[Dict[str, Any]]:
+        """
+        Apply an optical-flow position like a detection (EMA + lock follow).
+
+        Returns:
+            Result dict, or None if flow lost the bar (run the detector)
+        """
+        if measurement is None:
+            return None
+
+        x, y, confidence = measurement
+        self.frame_count += 1
+        self.flow_frame_count += 1
+        self.frames_since_keyframe += 1
+        self.last_inference_ms = elapsed_ms
+
+        w, h = self.last_box_size
+        result = self._update_position(x, y, w, h, confidence)
+        result["source"] = "flow"
+        return result
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # REGION OF INTEREST
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def roi_window(self, frame_shape: Tuple[int, ...]) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Square crop around the lock that contains every acceptable detection.
+
+        Returns:
+            (x1, y1, x2, y2) in frame pixels, or None to run full-frame
+        """
+        if not self.roi_enabled or self.locked_position is None:
+            return None
+
+        frame_h, frame_w = frame_shape[:2]
+        half = self.lock_radius + max(self.last_box_size) / 2
+        cx, cy = self.locked_position
+        x1, y1 = max(int(cx - half), 0), max(int(cy - half), 0)
+        x2, y2 = min(int(cx + half), frame_w), min(int(cy + half), frame_h)
+
+        if x2 - x1 < 32 or y2 - y1 < 32:
+            return None
+        if (x2 - x1) * (y2 - y1) > MAX_ROI_AREA_FRACTION * frame_w * frame_h:
+            return None
+        return x1, y1, x2, y2
+
+    @staticmethod
+    def _to_frame_coords(boxes: np.ndarray, roi: Tuple[int, int, int, int]) -> np.ndarray:
+        """Shift ROI boxes back to full-frame coordinates"""
+        if len(boxes):
+            boxes = boxes.copy()
+            boxes[:, [0, 2]] += roi[0]
+            boxes[:, [1, 3]] += roi[1]
+        return boxes
+
+    def _has_locked_candidate(self, boxes: np.ndarray) -> bool:
+        if not len(boxes) or self.locked_position is None:
+            return False
+        cx = (boxes[:, 0] + boxes[:, 2]) / 2
+        cy = (boxes[:, 1] + boxes[:, 3]) / 2
+        dist = np.hypot(cx - self.locked_position[0], cy - self.locked_position[1])
+        return bool((dist <= self.lock_radius).any())
+
+    def _roi_result(self, boxes: np.ndarray, roi) -> Optional[np.ndarray]:
+        """Frame-coordinate ROI boxes, or None (and count a miss) if the bar is gone"""
+        boxes = self._to_frame_coords(boxes, roi)
+        if self._has_locked_candidate(boxes):
+            self.roi_count += 1
+            return boxes
+        self.roi_miss_count += 1
+        return None
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # DETECTION
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def detect(self, frame: np.ndarray) -> Dict[str, Any]:
+        """Run hybrid tracking on a frame (synchronous, e.g. offline replay)"""
+        if self.detector is None:
+            return {"error": "Model not initialized"}
+
+        if not self.needs_detection():
+            start_time = time.time()
+            measurement = self.flow.track(frame)
+            result = self.apply_flow(measurement, (time.time() - start_time) * 1000)
+            if result is not None:
+                return result
+
+        start_time = time.time()
+        try:
+            boxes = None
+            roi = self.roi_window(frame.shape)
+            if roi is not None:
+                crop = frame[roi[1]:roi[3], roi[0]:roi[2]]
+                boxes = self._roi_result(self.detector.detect_batch([crop], ROI_IMGSZ)[0], roi)
+            if boxes is None:
+                # Unlocked, or the bar left the window: full-frame (re-)acquisition
+                boxes = self.detector.detect_batch([frame], IMGSZ)[0]
+        except Exception as e:
+            logger.error(f"Detection error: {e}")
+            self.frame_count += 1
+            self.last_measurement = None
+            return {"error": str(e), "inference_ms": 0}
+
+        result = self.process_detections(boxes, (time.time() - start_time) * 1000)
+        self._seed_flow(frame, result)
+        return self._public(result)
+
+    async def detect_batched(self, frame: np.ndarray, server, executor=None) -> Dict[str, Any]:
+        """
+        Hybrid tracking through the cross-session BatchInferenceServer.
+
+        Optical flow runs on `executor` (off the event loop); only keyframes
+        are sent to the shared detector. Other tasks must not change tracker
+        state meanwhile - lock / unlock / reset go through
+        NeiroSession.submit_command.
+        """
+        if self.detector is None:
+            return {"error": "Model not initialized"}
+
+        loop = asyncio.get_running_loop()
+
+        if not self.needs_detection():
+            start_time = time.time()
+            measurement = await loop.run_in_executor(executor, self.flow.track, frame)
+            result = self.apply_flow(measurement, (time.time() - start_time) * 1000)
+            if result is not None:
+                return result
+
+        try:
+            boxes = None
+            inference_ms = 0.0
+            roi = self.roi_window(frame.shape)
+            if roi is not None:
+                crop = frame[roi[1]:roi[3], roi[0]:roi[2]]
+                roi_boxes, inference_ms = await server.submit(crop, ROI_IMGSZ)
+                boxes = self._roi_result(roi_boxes, roi)
+            if boxes is None:
+                # Unlocked, or the bar left the window: full-frame (re-)acquisition
+                boxes, full_ms = await server.submit(frame, IMGSZ)
+                inference_ms += full_ms
+        except Exception as e:
+            logger.error(f"Detection error: {e}")
+            self.frame_count += 1
+            self.last_measurement = None
+            return {"error": str(e), "inference_ms": 0}
+
+        result = self.process_detections(boxes, inference_ms)
+        await loop.run_in_executor(executor, self._seed_flow, frame, result)
+        return self._public(result)
+
+    def process_detections(self, boxes: np.ndarray, inference_ms: float) -> Dict[str, Any]:
+        """
+        Pick the best detection, apply locking and EMA smoothing.
+
+        Args:
+            boxes: (K, 5) x1, y1, x2, y2, conf from the detector
+            inference_ms: Detector time attributed to this frame
+
+        Returns:
+            Detection result dict (raw_x / raw_y are the unsmoothed center)
+        """
+        self.frame_count += 1
+        self.last_inference_ms = inference_ms
+
+        best_detection = None
+        if len(boxes):
+            cx = (boxes[:, 0] + boxes[:, 2]) / 2
+            cy = (boxes[:, 1] + boxes[:, 3]) / 2
+            conf = boxes[:, 4]
+
+            # If locked, only consider detections near lock position
+            if self.locked_position:
+                dist = np.hypot(cx - self.locked_position[0], cy - self.locked_position[1])
+                score = np.where(dist <= self.lock_radius, conf * (1 - dist / self.lock_radius), 0.0)
+            else:
+                score = conf
+
+            best = int(np.argmax(score))
+            if score[best] > 0:
+                best_detection = {
+                    "x": float(cx[best]),
+                    "y": float(cy[best]),
+                    "w": float(boxes[best, 2] - boxes[best, 0]),
+                    "h": float(boxes[best, 3] - boxes[best, 1]),
+                    "conf": float(conf[best])
+                }
+
+        if best_detection:
+            self.detection_count += 1
+            self.last_box_size = (best_detection["w"], best_detection["h"])
+
+            result = self._update_position(
+                best_detection["x"], best_detection["y"],
+                best_detection["w"], best_detection["h"], best_detection["conf"]
+            )
+            result["raw_x"] = best_detection["x"]
+            result["raw_y"] = best_detection["y"]
+        else:
+            self.last_measurement = None
+            result = {
+                "x": 0,
+                "y": 0,
+                "w": 0,
+                "h": 0,
+                "conf": 0,
+                "inference_ms": self.last_inference_ms
+            }
+        result["source"] = "detector"
+        return result
+
+    def _update_position(self, x: float, y: float, w: float, h: float, conf: float) -> Dict[str, Any]:
+        """EMA smoothing + lock follow for a new bar measurement"""
+        self.last_measurement = (x, y)
+        if self.smoothed_x is None:
+            self.smoothed_x = x
+            self.smoothed_y = y
+        else:
+            self.smoothed_x = self.ema_alpha * x + (1 - self.ema_alpha) * self.smoothed_x
+            self.smoothed_y = self.ema_alpha * y + (1 - self.ema_alpha) * self.smoothed_y
+
+        # Update lock position to follow barbell
+        if self.locked_position:
+            self.locked_position = (self.smoothed_x, self.smoothed_y)
+
+        return {
+            "x": self.smoothed_x,
+            "y": self.smoothed_y,
+            "w": w,
+            "h": h,
+            "conf": conf,
+            "inference_ms": self.last_inference_ms
+        }
+
+    @staticmethod
+    def _public(result: Dict[str, Any]) -> Dict[str, Any]:
+        """Drop internal fields before sending to the client"""
+        result.pop("raw_x", None)
+        result.pop("raw_y", None)
+        return result
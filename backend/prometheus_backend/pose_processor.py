@@ -13,6 +13,8 @@ from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 from prometheus_backend.calibration_manager import CalibrationManager
 from prometheus_backend.movement_velocity_calculator import MovementVelocityCalculator
+from prometheus_backend.bar_path_analyzer import BarPathAnalyzer, merge_bar_path_metrics
+from prometheus_backend.form_analyzers import get_analyzer
 
 
 class PoseProcessor:
@@ -131,98 +133,21 @@ class PoseProcessor:
         """
         Calculate form score (0-10) based on pose landmarks.
 
+        Uses the per-frame checks of the exercise's registered form analyzer
+        (general posture checks if the exercise has none).
+
         Returns:
             Tuple of (score, list of feedback messages)
         """
-        score = 10.0
-        feedback = []
-
         if not landmarks:
             return 5.0, ["No pose detected"]
 
-        # Get key landmarks
-        lm = landmarks.landmark
-
-        # Helper to get landmark if visible
-        def get_point(idx):
-            if lm[idx].visibility > 0.5:
-                return (lm[idx].x, lm[idx].y, lm[idx].z)
-            return None
-
-        # Calculate angles
-        def calc_angle(p1, p2, p3):
-            """Calculate angle at p2 between p1-p2-p3"""
-            if not all([p1, p2, p3]):
-                return None
-            v1 = np.array([p1[0] - p2[0], p1[1] - p2[1]])
-            v2 = np.array([p3[0] - p2[0], p3[1] - p2[1]])
-            cos_angle = np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2) + 1e-6)
-            return np.degrees(np.arccos(np.clip(cos_angle, -1, 1)))
-
-        # Get key points
-        left_hip = get_point(self.KEY_JOINTS['LEFT_HIP'])
-        right_hip = get_point(self.KEY_JOINTS['RIGHT_HIP'])
-        left_knee = get_point(self.KEY_JOINTS['LEFT_KNEE'])
-        right_knee = get_point(self.KEY_JOINTS['RIGHT_KNEE'])
-        left_shoulder = get_point(self.KEY_JOINTS['LEFT_SHOULDER'])
-        right_shoulder = get_point(self.KEY_JOINTS['RIGHT_SHOULDER'])
-
-        # 1. CHECK KNEE VALGUS (knees caving in)
-        if all([left_hip, right_hip, left_knee, right_knee]):
-            hip_width = abs(left_hip[0] - right_hip[0])
-            knee_width = abs(left_knee[0] - right_knee[0])
-
-            if hip_width > 0:
-                knee_ratio = knee_width / hip_width
-                if knee_ratio < 0.85:  # Knees significantly inside hips
-                    score -= 1.5
-                    feedback.append("Knee valgus detected - keep knees tracking over toes")
-                elif knee_ratio < 0.95:
-                    score -= 0.5
-                    feedback.append("Slight knee cave - focus on knee position")
-
-        # 2. CHECK BACK ANGLE (for squat/deadlift - excessive forward lean)
-        if exercise_type.lower() in ["squat", "back_squat", "front_squat", "deadlift"]:
-            if all([left_shoulder, right_shoulder, left_hip, right_hip]):
-                # Calculate torso angle from vertical
-                shoulder_mid = ((left_shoulder[0] + right_shoulder[0]) / 2,
-                               (left_shoulder[1] + right_shoulder[1]) / 2)
-                hip_mid = ((left_hip[0] + right_hip[0]) / 2,
-                          (left_hip[1] + right_hip[1]) / 2)
-
-                # Angle from vertical (0 = upright, 90 = horizontal)
-                dx = shoulder_mid[0] - hip_mid[0]
-                dy = shoulder_mid[1] - hip_mid[1]
-                torso_angle = abs(np.degrees(np.arctan2(dx, -dy)))  # -dy because y increases downward
-
-                if torso_angle > 60:
-                    score -= 2.0
-                    feedback.append("Excessive forward lean - maintain upright torso")
-                elif torso_angle > 45:
-                    score -= 1.0
-                    feedback.append("Forward lean detected - keep chest up")
-
-        # 3. CHECK SHOULDER SYMMETRY
-        if left_shoulder and right_shoulder:
-            shoulder_diff = abs(left_shoulder[1] - right_shoulder[1])
-            if shoulder_diff > 0.05:  # Normalized coordinates
-                score -= 0.5
-                feedback.append("Uneven shoulders - check bar position")
-
-        # 4. CHECK HIP SYMMETRY
-        if left_hip and right_hip:
-            hip_diff = abs(left_hip[1] - right_hip[1])
-            if hip_diff > 0.05:
-                score -= 0.5
-                feedback.append("Uneven hips - check stance width")
-
-        # Clamp score
-        score = max(0.0, min(10.0, score))
-
-        if not feedback:
-            feedback.append("Good form!")
-
-        return round(score, 1), feedback
+        analyzer = get_analyzer(exercise_type) or get_analyzer("general")
+        frame = np.array(
+            [[lm.x, lm.y, lm.z, lm.visibility] for lm in landmarks.landmark],
+            dtype=np.float64
+        )
+        return analyzer.score_frame(frame)
 
     def draw_metrics_overlay(self, frame: np.ndarray, vbt_metrics: Dict,
                             current_rep: int = 0, form_score: float = None,
@@ -340,11 +265,16 @@ class PoseProcessor:
         output_dir: Path,
         save_video: bool = True,
         save_pose_data: bool = True,
-        exercise_type: str = "general"
+        exercise_type: str = "general",
+        depth_track=None
     ) -> Dict:
         """
         Process video with MediaPipe Pose
 
+        Args:
+            depth_track: Optional DepthTrack (depth_metadata) for TIER 1
+                per-frame calibration
+
         Returns:
             Dict with pose_data and output video path
         """
@@ -488,14 +418,25 @@ class PoseProcessor:
         # Calculate movement velocity metrics with honest calibration system
         print(f"\n{'='*60}\n📊 MOVEMENT VELOCITY ANALYSIS\n{'='*60}")
 
-        # Initialize calibration manager (Tier 3: Relative mode for now)
+        # Initialize calibration manager (Tier 1 with uploaded depth, else Tier 3)
+        depth_data = None
+        if depth_track is not None:
+            # Focal length is in pixels of the original (or declared) width
+            reference_width = depth_track.image_width or original_width
+            depth_data = depth_track.scaled(width / reference_width).to_depth_data()
+
         calibration_mgr = CalibrationManager(verbose=True)
-        calibration_mgr.detect_calibration_method(frame=None)  # No depth data yet
+        calibration_mgr.detect_calibration_method(frame=None, depth_data=depth_data)
 
         # Calculate velocity metrics
         velocity_calc = MovementVelocityCalculator(calibration_mgr, fps=fps, verbose=True)
         velocity_metrics = velocity_calc.calculate_movement_metrics(pose_data, exercise_type)
 
+        # Bar path, drift, sticking point and time under tension per rep
+        bar_path_analyzer = BarPathAnalyzer(calibration_mgr, verbose=True)
+        bar_path = bar_path_analyzer.analyze_pose_data(pose_data)
+        velocity_metrics = merge_bar_path_metrics(velocity_metrics, bar_path)
+
         print(f"{'='*60}\n")
 
         return {
@@ -503,5 +444,6 @@ class PoseProcessor:
             "output_video": output_video_path,
             "pose_json": pose_json_path,
             "frames_processed": frame_idx,
-            "velocity_metrics": velocity_metrics
+            "velocity_metrics": velocity_metrics,
+            "calibration": calibration_mgr.get_calibration_info()
         }
@@ -1,4 +1,4 @@
 # Routers package
-from . import form_analysis, ai_coach, admin, partner
+from . import form_analysis, ai_coach, admin, partner, neiro
 
-__all__ = ["form_analysis", "ai_coach", "admin", "partner"]
\ No newline at end of file
+__all__ = ["form_analysis", "ai_coach", "admin", "partner", "neiro"]
\ No newline at end of file
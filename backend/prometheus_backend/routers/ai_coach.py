@@ -3,7 +3,9 @@ AI Coach Router - Intelligent training assistant endpoints
 """
 
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+import asyncio
+import json
 import os
 import re
 
@@ -76,6 +78,75 @@ async def get_exercise_database_stats():
         )
 
 
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Hit/miss metrics of the shared reference-data caches"""
+    from ai_coach_service.context_cache import get_user_context_cache
+    from ai_coach_service.shared_cache import cache_stats
+
+    return {"caches": cache_stats(), "user_context": get_user_context_cache().stats()}
+
+
+@router.get("/openai/stats")
+async def get_openai_stats():
+    """OpenAI call latency, retries and token totals per endpoint"""
+    from ai_coach_service.openai_pool import openai_stats
+
+    return openai_stats()
+
+
+@router.get("/prompt/stats")
+async def get_prompt_stats():
+    """System prompt token usage per section (for tuning the token budget)"""
+    from ai_coach_service.prompt_builder import prompt_stats
+
+    return prompt_stats()
+
+
+@router.post("/cache/invalidate")
+async def invalidate_cache(request_data: dict = None):
+    """
+    Invalidate shared caches after editing templates or exercises
+
+    Request body (optional):
+    {
+        "cache": "public_templates" | "exercise_catalog"   (omit for all)
+    }
+    """
+    from ai_coach_service.shared_cache import invalidate
+
+    name = (request_data or {}).get("cache")
+    invalidated = invalidate(name)
+    if name and not invalidated:
+        raise HTTPException(status_code=404, detail=f"Unknown cache: {name}")
+    return {"success": True, "invalidated": invalidated}
+
+
+@router.post("/context/invalidate")
+async def invalidate_user_context(request_data: dict):
+    """
+    Tell the coach that a user's data changed (call after app-side saves)
+
+    Request body:
+    {
+        "user_id": "uuid",
+        "scopes": ["profile", "workouts", "nutrition"]   (omit for all)
+    }
+    """
+    from ai_coach_service.context_cache import get_user_context_cache
+    from ai_coach_service.shared_cache import nutrition_rollup_cache
+
+    user_id = request_data.get('user_id')
+    if not user_id:
+        raise HTTPException(status_code=400, detail="user_id is required")
+
+    invalidated = get_user_context_cache().invalidate(user_id, request_data.get('scopes'))
+    if "nutrition" in invalidated:
+        # Past days can be edited too (late logging)
+        nutrition_rollup_cache.invalidate_where(lambda key: key[0] == user_id)
+    return {"success": True, "invalidated": invalidated}
+
+
 @legacy_router.post("/ai-coach")
 async def get_coaching_cues(request_data: dict):
     """
@@ -83,6 +154,7 @@ async def get_coaching_cues(request_data: dict):
     """
     try:
         from ai_coach_service.ai_coach_client import AICoachClient
+        from ai_coach_service.openai_pool import chat_completion
 
         exercise = request_data.get('exercise', '')
         context = request_data.get('context', '')
@@ -125,7 +197,8 @@ Bei Begrüßungen oder Smalltalk:
             user_prompt = exercise if exercise else "Hello coach!"
 
         ai_client = AICoachClient()
-        result = ai_client.client.chat.completions.create(
+        result = await chat_completion(
+            "coaching_cues",
             model=ai_client.model,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -196,237 +269,379 @@ async def test_ai_coach():
 # AI COACH - PERSISTENT CHAT ENDPOINTS
 # ============================================================
 
-@router.post("/chat")
-async def chat_with_coach(request_data: dict):
+# ═══════════════════════════════════════════════════════════════
+# CHAT (shared by /chat and /chat/stream)
+# ═══════════════════════════════════════════════════════════════
+
+TEMPLATE_PATTERN = r'\[RECOMMEND_TEMPLATE:([^:]+):([^\]]+)\]'
+TEMPLATE_MARKER_PREFIX = "[RECOMMEND_TEMPLATE:"
+
+
+async def _prepare_chat(request_data: dict) -> dict:
     """
-    Chat with AI Coach with persistent conversation history
+    Validate the request, save the user message and build the OpenAI call
 
-    Supports image attachments for vision analysis:
-    {
-        "user_id": "uuid",
-        "conversation_id": "uuid" (optional),
-        "message": "What do you see in this image?",
-        "context": {},
-        "attachments": [
-            {
-                "type": "image",
-                "data": "base64 encoded image data",
-                "file_name": "photo.jpg",
-                "mime_type": "image/jpeg"
-            }
-        ]
-    }
+    Returns:
+        Chat state for _finish_chat (conversation, history, context, messages, model)
     """
-    try:
-        from ai_coach_service.ai_coach_client import AICoachClient
-        from ai_coach_service.conversation_manager import ConversationManager
-        from ai_coach_service.user_context_builder import UserContextBuilder
-        from ai_coach_service.workout_parser import WorkoutParser
+    from ai_coach_service.ai_coach_client import AICoachClient
+    from ai_coach_service.conversation_manager import ConversationManager
+    from ai_coach_service.history_summarizer import load_history
+    from ai_coach_service.user_context_builder import UserContextBuilder
+
+    user_id = request_data.get('user_id')
+    conversation_id = request_data.get('conversation_id')
+    message = request_data.get('message', '')
+    context = request_data.get('context', {})
+    attachments = request_data.get('attachments', [])
+
+    if not user_id:
+        raise HTTPException(status_code=400, detail="user_id is required")
+    if not message:
+        raise HTTPException(status_code=400, detail="message is required")
+
+    conv_manager = ConversationManager()
+
+    # Create new conversation if needed
+    if not conversation_id:
+        conv_result = conv_manager.create_conversation(
+            user_id=user_id,
+            title=None
+        )
+        if not conv_result.get('success'):
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to create conversation: {conv_result.get('error')}"
+            )
+        conversation_id = conv_result['conversation_id']
+        print(f"Created new conversation: {conversation_id}")
+
+    # Get conversation history (rolling summary + recent messages)
+    history_window = load_history(conv_manager, conversation_id)
+    history = history_window["messages"]
+
+    # Build system prompt with user context
+    context_builder = UserContextBuilder()
+    user_context = await context_builder.build_user_context_async(user_id)
+    system_prompt = context_builder.get_system_prompt(user_id, user_context)
+
+    print(f"User context loaded: Profile={user_context.get('profile') is not None}, "
+          f"PRs={len(user_context.get('prs', []))}, "
+          f"Exercises={len(user_context.get('exercises', []))}, "
+          f"UserWorkouts={len(user_context.get('workouts', []))}, "
+          f"PublicTemplates={len(user_context.get('public_templates', []))}")
+
+    # Build messages array
+    messages = [{"role": "system", "content": system_prompt}]
+
+    if history_window["summary"]:
+        messages.append({
+            "role": "system",
+            "content": f"Summary of the earlier conversation:\n{history_window['summary']}"
+        })
+
+    for msg in history:
+        messages.append({
+            "role": msg["role"],
+            "content": msg["content"]
+        })
+
+    # Build user message content - with or without images
+    has_images = attachments and any(att.get('type') == 'image' for att in attachments)
+
+    if has_images:
+        # Build multimodal message with images (OpenAI Vision API format)
+        user_content = [{"type": "text", "text": message}]
+
+        for attachment in attachments:
+            if attachment.get('type') == 'image':
+                image_data = attachment.get('data', '')
+                mime_type = attachment.get('mime_type', 'image/jpeg')
+
+                # OpenAI expects base64 with data URL prefix
+                if not image_data.startswith('data:'):
+                    image_data = f"data:{mime_type};base64,{image_data}"
+
+                user_content.append({
+                    "type": "image_url",
+                    "image_url": {
+                        "url": image_data,
+                        "detail": "high"  # Use high detail for better analysis
+                    }
+                })
 
-        user_id = request_data.get('user_id')
-        conversation_id = request_data.get('conversation_id')
-        message = request_data.get('message', '')
-        context = request_data.get('context', {})
-        attachments = request_data.get('attachments', [])
+                print(f"📸 Added image attachment: {attachment.get('file_name', 'unknown')}")
+
+        messages.append({"role": "user", "content": user_content})
+        print(f"🖼️ Chat with {len([a for a in attachments if a.get('type') == 'image'])} image(s)")
+    else:
+        messages.append({"role": "user", "content": message})
+
+    # Save user message (store text only in conversation history)
+    conv_manager.add_message(
+        conversation_id=conversation_id,
+        role="user",
+        content=message,
+        metadata={
+            **context,
+            "has_attachments": len(attachments) if attachments else 0,
+            "attachment_types": [att.get('type') for att in attachments] if attachments else []
+        }
+    )
+
+    # Use gpt-4o for vision capability
+    ai_client = AICoachClient()
+    model_to_use = "gpt-4o" if has_images else ai_client.model
+    print(f"🤖 Using model: {model_to_use}")
+
+    return {
+        "user_id": user_id,
+        "conversation_id": conversation_id,
+        "message": message,
+        "history": history,
+        "history_fold": history_window["fold"],
+        "user_context": user_context,
+        "conv_manager": conv_manager,
+        "ai_client": ai_client,
+        "completion_args": {
+            "model": model_to_use,
+            "messages": messages,
+            "max_tokens": 1000 if has_images else 500,  # More tokens for image analysis
+            "temperature": 0.8
+        }
+    }
 
-        if not user_id:
-            raise HTTPException(status_code=400, detail="user_id is required")
-        if not message:
-            raise HTTPException(status_code=400, detail="message is required")
 
-        conv_manager = ConversationManager()
+def _finish_chat(chat: dict, response_text: str, prompt_tokens: int, completion_tokens: int) -> dict:
+    """
+    Persist the assistant response, log usage and detect actions
 
-        # Create new conversation if needed
-        if not conversation_id:
-            conv_result = conv_manager.create_conversation(
-                user_id=user_id,
-                title=None
-            )
-            if not conv_result.get('success'):
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Failed to create conversation: {conv_result.get('error')}"
-                )
-            conversation_id = conv_result['conversation_id']
-            print(f"Created new conversation: {conversation_id}")
+    Returns:
+        {"conversation_id", "message" (cleaned), "actions"}
+    """
+    from ai_coach_service.workout_parser import WorkoutParser
+
+    user_id = chat["user_id"]
+    conversation_id = chat["conversation_id"]
+    message = chat["message"]
+    history = chat["history"]
+    conv_manager = chat["conv_manager"]
+    ai_client = chat["ai_client"]
+
+    # Save assistant response
+    conv_manager.add_message(
+        conversation_id=conversation_id,
+        role="assistant",
+        content=response_text,
+        metadata={
+            "model": ai_client.model,
+            "tokens_input": prompt_tokens,
+            "tokens_output": completion_tokens
+        }
+    )
 
-        # Get conversation history
-        history = conv_manager.get_recent_messages(conversation_id, count=20)
+    # Log usage for cost tracking
+    try:
+        from supabase import create_client
+        import os
+        supabase_url = os.environ.get("SUPABASE_URL")
+        supabase_key = os.environ.get("SUPABASE_KEY")
+        if supabase_url and supabase_key:
+            supabase = create_client(supabase_url, supabase_key)
+            supabase.rpc('log_usage_event', {
+                'p_user_id': user_id,
+                'p_event_type': 'ai_coach_chat',
+                'p_input_tokens': prompt_tokens,
+                'p_output_tokens': completion_tokens,
+                'p_metadata': {
+                    'model': ai_client.model,
+                    'conversation_id': conversation_id,
+                    'message_length': len(message)
+                },
+                'p_success': True
+            }).execute()
+            print(f"Logged AI Coach usage: {prompt_tokens}+{completion_tokens} tokens")
+    except Exception as log_error:
+        print(f"Warning: Failed to log AI Coach usage: {log_error}")
+
+    # Update conversation title if first exchange
+    if len(history) == 0:
+        title = message[:50] + "..." if len(message) > 50 else message
+        conv_manager.update_conversation_title(conversation_id, title)
+
+    print(f"Chat: {len(history)+1} messages in conversation {conversation_id}")
+
+    # Detect workout recommendations
+    workout_parser = WorkoutParser()
+    actions = []
+
+    if workout_parser.detect_workout(response_text):
+        parsed_workout = workout_parser.parse_workout(response_text)
+        if parsed_workout:
+            print(f"Detected workout: {parsed_workout['name']} with {len(parsed_workout['exercises'])} exercises")
+            actions.append({
+                "type": "workout_created",
+                "data": {"workout": parsed_workout}
+            })
 
-        # Build system prompt with user context
-        context_builder = UserContextBuilder()
-        user_context = context_builder.build_user_context(user_id)
-        system_prompt = context_builder.format_system_prompt(user_context)
-
-        print(f"User context loaded: Profile={user_context.get('profile') is not None}, "
-              f"PRs={len(user_context.get('prs', []))}, "
-              f"Exercises={len(user_context.get('exercises', []))}, "
-              f"UserWorkouts={len(user_context.get('workouts', []))}, "
-              f"PublicTemplates={len(user_context.get('public_templates', []))}")
-
-        # Build messages array
-        messages = [{"role": "system", "content": system_prompt}]
-
-        for msg in history:
-            messages.append({
-                "role": msg["role"],
-                "content": msg["content"]
+    # Detect template recommendations
+    template_matches = re.findall(TEMPLATE_PATTERN, response_text)
+
+    for template_id, template_name in template_matches:
+        template_id = template_id.strip()
+        template_name = template_name.strip()
+
+        template_data = None
+        for template in chat["user_context"].get('public_templates', []):
+            if template.get('id') == template_id:
+                template_data = template
+                break
+
+        if template_data:
+            print(f"Detected template recommendation: {template_name} (ID: {template_id})")
+            actions.append({
+                "type": "recommend_template",
+                "data": {
+                    "template": {
+                        "template_id": template_id,
+                        "name": template_name,
+                        "description": template_data.get('description', ''),
+                        "sports": template_data.get('sports', []),
+                        "exercise_count": len(template_data.get('exercises', [])),
+                        "exercise_names": [ex.get('name', '') for ex in template_data.get('exercises', [])[:5]]
+                    }
+                }
             })
+        else:
+            print(f"Template ID not found in context: {template_id}")
 
-        # Build user message content - with or without images
-        has_images = attachments and any(att.get('type') == 'image' for att in attachments)
+    # Clean response text
+    clean_response = re.sub(TEMPLATE_PATTERN, '', response_text).strip()
 
-        if has_images:
-            # Build multimodal message with images (OpenAI Vision API format)
-            user_content = [{"type": "text", "text": message}]
+    return {
+        "conversation_id": conversation_id,
+        "message": clean_response,
+        "actions": actions
+    }
 
-            for attachment in attachments:
-                if attachment.get('type') == 'image':
-                    image_data = attachment.get('data', '')
-                    mime_type = attachment.get('mime_type', 'image/jpeg')
 
-                    # OpenAI expects base64 with data URL prefix
-                    if not image_data.startswith('data:'):
-                        image_data = f"data:{mime_type};base64,{image_data}"
+class _TemplateMarkerFilter:
+    """Strips [RECOMMEND_TEMPLATE:id:name] markers from streamed deltas"""
+
+    MAX_MARKER_LENGTH = 300
+
+    def __init__(self):
+        self._pending = ""
+
+    def feed(self, delta: str) -> str:
+        self._pending += delta
+        out = []
+        while True:
+            idx = self._pending.find("[")
+            if idx == -1:
+                out.append(self._pending)
+                self._pending = ""
+                break
+            out.append(self._pending[:idx])
+            rest = self._pending[idx:]
+
+            if rest.startswith(TEMPLATE_MARKER_PREFIX):
+                match = re.match(TEMPLATE_PATTERN, rest)
+                if match:
+                    self._pending = rest[match.end():]  # Drop the marker
+                    continue
+                if "]" not in rest and len(rest) < self.MAX_MARKER_LENGTH:
+                    self._pending = rest  # Marker still arriving
+                    break
+            elif TEMPLATE_MARKER_PREFIX.startswith(rest):
+                self._pending = rest  # Could still become a marker
+                break
 
-                    user_content.append({
-                        "type": "image_url",
-                        "image_url": {
-                            "url": image_data,
-                            "detail": "high"  # Use high detail for better analysis
-                        }
-                    })
+            out.append("[")
+            self._pending = rest[1:]
+        return "".join(out)
 
-                    print(f"📸 Added image attachment: {attachment.get('file_name', 'unknown')}")
+    def flush(self) -> str:
+        pending, self._pending = self._pending, ""
+        return pending
 
-            messages.append({"role": "user", "content": user_content})
-            print(f"🖼️ Chat with {len([a for a in attachments if a.get('type') == 'image'])} image(s)")
-        else:
-            messages.append({"role": "user", "content": message})
 
-        # Save user message (store text only in conversation history)
-        conv_manager.add_message(
-            conversation_id=conversation_id,
-            role="user",
-            content=message,
-            metadata={
-                **context,
-                "has_attachments": len(attachments) if attachments else 0,
-                "attachment_types": [att.get('type') for att in attachments] if attachments else []
-            }
-        )
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-        # Call OpenAI API - use gpt-4o for vision capability
-        ai_client = AICoachClient()
-        model_to_use = "gpt-4o" if has_images else ai_client.model
 
-        result = ai_client.client.chat.completions.create(
-            model=model_to_use,
-            messages=messages,
-            max_tokens=1000 if has_images else 500,  # More tokens for image analysis
-            temperature=0.8
-        )
+# Finalisation of streams whose client went away (kept referenced until done)
+_orphan_finish_tasks = set()
 
-        print(f"🤖 Using model: {model_to_use}")
 
-        response_text = result.choices[0].message.content
+def _finish_abandoned_stream(chat: dict, response_text: str, usage):
+    """
+    Persist a stream the client disconnected from, from the text so far.
 
-        # Save assistant response
-        conv_manager.add_message(
-            conversation_id=conversation_id,
-            role="assistant",
-            content=response_text,
-            metadata={
-                "model": ai_client.model,
-                "tokens_input": result.usage.prompt_tokens,
-                "tokens_output": result.usage.completion_tokens
-            }
+    Runs as a background task so it survives the cancelled response. Without
+    the final usage chunk, tokens are estimated.
+    """
+    from ai_coach_service.prompt_builder import count_tokens
+
+    if usage is not None:
+        prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens
+    else:
+        prompt_tokens = sum(
+            count_tokens(message.get("content") if isinstance(message.get("content"), str) else "")
+            for message in chat["completion_args"]["messages"]
         )
+        completion_tokens = count_tokens(response_text)
 
-        # Log usage for cost tracking
+    async def finish():
         try:
-            from supabase import create_client
-            import os
-            supabase_url = os.environ.get("SUPABASE_URL")
-            supabase_key = os.environ.get("SUPABASE_KEY")
-            if supabase_url and supabase_key:
-                supabase = create_client(supabase_url, supabase_key)
-                supabase.rpc('log_usage_event', {
-                    'p_user_id': user_id,
-                    'p_event_type': 'ai_coach_chat',
-                    'p_input_tokens': result.usage.prompt_tokens,
-                    'p_output_tokens': result.usage.completion_tokens,
-                    'p_metadata': {
-                        'model': ai_client.model,
-                        'conversation_id': conversation_id,
-                        'message_length': len(message)
-                    },
-                    'p_success': True
-                }).execute()
-                print(f"Logged AI Coach usage: {result.usage.prompt_tokens}+{result.usage.completion_tokens} tokens")
-        except Exception as log_error:
-            print(f"Warning: Failed to log AI Coach usage: {log_error}")
-
-        # Update conversation title if first exchange
-        if len(history) == 0:
-            title = message[:50] + "..." if len(message) > 50 else message
-            conv_manager.update_conversation_title(conversation_id, title)
-
-        print(f"Chat: {len(history)+1} messages in conversation {conversation_id}")
-
-        # Detect workout recommendations
-        workout_parser = WorkoutParser()
-        actions = []
-
-        if workout_parser.detect_workout(response_text):
-            parsed_workout = workout_parser.parse_workout(response_text)
-            if parsed_workout:
-                print(f"Detected workout: {parsed_workout['name']} with {len(parsed_workout['exercises'])} exercises")
-                actions.append({
-                    "type": "workout_created",
-                    "data": {"workout": parsed_workout}
-                })
+            await asyncio.to_thread(_finish_chat, chat, response_text, prompt_tokens, completion_tokens)
+            print(f"Saved partial response of abandoned stream in conversation {chat['conversation_id']}")
+        except Exception as e:
+            print(f"Warning: Failed to save abandoned stream: {e}")
 
-        # Detect template recommendations
-        template_pattern = r'\[RECOMMEND_TEMPLATE:([^:]+):([^\]]+)\]'
-        template_matches = re.findall(template_pattern, response_text)
+    task = asyncio.get_running_loop().create_task(finish())
+    _orphan_finish_tasks.add(task)
+    task.add_done_callback(_orphan_finish_tasks.discard)
 
-        for template_id, template_name in template_matches:
-            template_id = template_id.strip()
-            template_name = template_name.strip()
 
-            template_data = None
-            for template in user_context.get('public_templates', []):
-                if template.get('id') == template_id:
-                    template_data = template
-                    break
+@router.post("/chat")
+async def chat_with_coach(request_data: dict):
+    """
+    Chat with AI Coach with persistent conversation history
 
-            if template_data:
-                print(f"Detected template recommendation: {template_name} (ID: {template_id})")
-                actions.append({
-                    "type": "recommend_template",
-                    "data": {
-                        "template": {
-                            "template_id": template_id,
-                            "name": template_name,
-                            "description": template_data.get('description', ''),
-                            "sports": template_data.get('sports', []),
-                            "exercise_count": len(template_data.get('exercises', [])),
-                            "exercise_names": [ex.get('name', '') for ex in template_data.get('exercises', [])[:5]]
-                        }
-                    }
-                })
-            else:
-                print(f"Template ID not found in context: {template_id}")
+    Supports image attachments for vision analysis:
+    {
+        "user_id": "uuid",
+        "conversation_id": "uuid" (optional),
+        "message": "What do you see in this image?",
+        "context": {},
+        "attachments": [
+            {
+                "type": "image",
+                "data": "base64 encoded image data",
+                "file_name": "photo.jpg",
+                "mime_type": "image/jpeg"
+            }
+        ]
+    }
+    """
+    try:
+        from ai_coach_service.history_summarizer import schedule_summary
+        from ai_coach_service.openai_pool import chat_completion
 
-        # Clean response text
-        clean_response = re.sub(template_pattern, '', response_text).strip()
+        chat = await _prepare_chat(request_data)
 
-        return {
-            "conversation_id": conversation_id,
-            "message": clean_response,
-            "actions": actions
-        }
+        result = await chat_completion("chat", **chat["completion_args"])
+        response_text = result.choices[0].message.content
+
+        response = _finish_chat(
+            chat,
+            response_text,
+            result.usage.prompt_tokens,
+            result.usage.completion_tokens
+        )
+        schedule_summary(chat["conv_manager"], chat["history_fold"])
+        return response
 
     except HTTPException:
         raise
@@ -438,6 +653,92 @@ async def chat_with_coach(request_data: dict):
         )
 
 
+@router.post("/chat/stream")
+async def chat_with_coach_stream(request_data: dict):
+    """
+    Streaming variant of /chat (Server-Sent Events)
+
+    Same request body as /chat. Events:
+        start   {"conversation_id"}
+        token   {"delta"}                              (template markers stripped)
+        done    {"conversation_id", "message", "actions"}   same as the /chat response
+        error   {"detail"}
+
+    The assistant message is persisted, usage logged and actions detected
+    once the stream finishes.
+    """
+    try:
+        chat = await _prepare_chat(request_data)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Chat stream error: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing chat: {str(e)}"
+        )
+
+    from ai_coach_service.history_summarizer import schedule_summary
+    from ai_coach_service.openai_pool import chat_completion_stream
+
+    async def event_stream():
+        yield _sse("start", {"conversation_id": chat["conversation_id"]})
+
+        parts = []
+        usage = None
+        finishing = False
+        marker_filter = _TemplateMarkerFilter()
+        stream = chat_completion_stream(
+            "chat_stream",
+            **chat["completion_args"],
+            stream_options={"include_usage": True}
+        )
+        try:
+            async for chunk in stream:
+                if chunk.usage is not None:
+                    usage = chunk.usage  # Final chunk (no choices)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    visible = marker_filter.feed(delta)
+                    if visible:
+                        yield _sse("token", {"delta": visible})
+
+            tail = marker_filter.flush()
+            if tail:
+                yield _sse("token", {"delta": tail})
+
+            finishing = True
+            response = await asyncio.to_thread(
+                _finish_chat,
+                chat,
+                "".join(parts),
+                usage.prompt_tokens if usage else 0,
+                usage.completion_tokens if usage else 0
+            )
+            yield _sse("done", response)
+            schedule_summary(chat["conv_manager"], chat["history_fold"])
+
+        except Exception as e:
+            print(f"Chat stream error: {str(e)}")
+            yield _sse("error", {"detail": f"Error processing chat: {str(e)}"})
+        finally:
+            # A client disconnect closes / cancels this generator (not an
+            # Exception): release the OpenAI stream and still save the text so
+            # far (also after a mid-answer error)
+            await stream.aclose()
+            if not finishing and parts:
+                _finish_abandoned_stream(chat, "".join(parts), usage)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/conversations")
 async def get_user_conversations(user_id: str):
     """Get all conversations for a user"""
@@ -575,6 +876,10 @@ async def save_ai_workout(request_data: dict):
 
             print(f"Added {len(exercises_data)} exercises to workout")
 
+        # The coach should see the new template on the next message
+        from ai_coach_service.context_cache import get_user_context_cache
+        get_user_context_cache().invalidate(user_id, ["workouts"])
+
         return {
             "success": True,
             "workout_template_id": workout_template_id,
@@ -635,7 +940,7 @@ async def scan_wod_from_image(request_data: dict):
 
         # Parse the WOD from image
         parser = WodVisionParser()
-        result = parser.parse_wod_image(
+        result = await parser.parse_wod_image(
             image_base64=image_base64,
             image_type=image_type,
             additional_context=f"From CrossFit box: {box_name}" if box_name else None
@@ -747,7 +1052,7 @@ async def scan_wod_from_url(request_data: dict):
 
         # Parse the WOD from URL
         parser = WodVisionParser()
-        result = parser.parse_wod_from_url(
+        result = await parser.parse_wod_from_url(
             image_url=image_url,
             additional_context=f"From CrossFit box: {box_name}" if box_name else None
         )
@@ -969,7 +1274,7 @@ async def create_exercise_from_ai(request_data: dict):
     }
     """
     try:
-        from ai_coach_service.ai_coach_client import AICoachClient
+        from ai_coach_service.openai_pool import chat_completion
         from supabase import create_client
         import uuid
 
@@ -1023,8 +1328,8 @@ Context: {context if context else 'CrossFit/functional fitness movement'}
 Return ONLY the JSON object."""
 
         # Call OpenAI API
-        ai_client = AICoachClient()
-        result = ai_client.client.chat.completions.create(
+        result = await chat_completion(
+            "create_exercise",
             model="gpt-4-turbo-preview",
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -1106,6 +1411,10 @@ Return ONLY the JSON object."""
 
         print(f"✅ Exercise saved to database: {exercise_id}")
 
+        # New exercise must show up in chat context / program generation
+        from ai_coach_service.shared_cache import invalidate
+        invalidate("exercise_catalog")
+
         # Log usage for cost tracking
         try:
             supabase.rpc('log_usage_event', {
@@ -5,6 +5,7 @@ Form Analysis Router - MediaPipe Pose Analysis Endpoints
 from fastapi import APIRouter, File, UploadFile, HTTPException, Form
 from fastapi.responses import JSONResponse, FileResponse
 import aiofiles
+import asyncio
 import subprocess
 import shutil
 from pathlib import Path
@@ -13,6 +14,9 @@ from datetime import datetime
 
 from ..pose_processor import PoseProcessor
 from ..supabase_client import SupabaseFormAnalysisClient
+from ..velocity_autoregulation import get_autoregulation_service
+from ..depth_metadata import load_depth_metadata, DepthMetadataError
+from ..form_analyzers import get_analyzer, registered_exercise_types
 
 router = APIRouter(prefix="/api/v1", tags=["Form Analysis"])
 
@@ -22,6 +26,9 @@ OUTPUT_DIR = Path("outputs")
 UPLOAD_DIR.mkdir(exist_ok=True)
 OUTPUT_DIR.mkdir(exist_ok=True)
 
+# Depth uploads are streamed to disk in chunks, never read whole
+DEPTH_UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 
 def find_output_video(output_dir: Path) -> Optional[Path]:
     """Find the analyzed video file in output directory"""
@@ -31,38 +38,22 @@ def find_output_video(output_dir: Path) -> Optional[Path]:
 
 def calculate_form_metrics(pose_data: dict, exercise_type: Optional[str]) -> dict:
     """
-    Calculate exercise-specific form metrics
+    Calculate exercise-specific form metrics via the form analyzer registry
     """
     if not exercise_type:
         return {"message": "No exercise type specified"}
 
-    metrics = {
-        "exercise": exercise_type,
-        "analysis_available": False,
-        "message": "Exercise-specific analysis coming soon"
-    }
-
-    if exercise_type.lower() in ["squat", "back_squat", "front_squat"]:
-        metrics["target_angles"] = {
-            "knee": {"min": 80, "max": 130},
-            "hip": {"min": 70, "max": 120},
-        }
-        metrics["notes"] = "Squat depth and form analysis"
-
-    elif exercise_type.lower() in ["deadlift", "romanian_deadlift"]:
-        metrics["target_angles"] = {
-            "hip": {"min": 90, "max": 180},
-            "knee": {"min": 160, "max": 180},
+    analyzer = get_analyzer(exercise_type, verbose=True)
+    if analyzer is None:
+        return {
+            "exercise": exercise_type,
+            "analysis_available": False,
+            "message": "No form analyzer for this exercise yet",
+            "supported_exercises": registered_exercise_types()
         }
-        metrics["notes"] = "Hip hinge and bar path analysis"
-
-    elif exercise_type.lower() in ["bench_press", "incline_bench"]:
-        metrics["target_angles"] = {
-            "elbow": {"min": 75, "max": 90},
-            "shoulder": {"min": 45, "max": 75},
-        }
-        metrics["notes"] = "Bar path and shoulder safety analysis"
 
+    metrics = analyzer.analyze(pose_data)
+    metrics["exercise"] = exercise_type
     return metrics
 
 
@@ -75,7 +66,10 @@ async def analyze_form(
     set_id: Optional[str] = Form(None),
     session_id: Optional[str] = Form(None),
     exercise_id: Optional[str] = Form(None),
-    exercise_name: Optional[str] = Form(None)
+    exercise_name: Optional[str] = Form(None),
+    load_kg: Optional[float] = Form(None),
+    depth_metadata: Optional[UploadFile] = File(None),
+    focal_length_px: Optional[float] = Form(None)
 ):
     """
     Analyze workout form from uploaded video
@@ -88,6 +82,10 @@ async def analyze_form(
     - set_id: Optional - UUID of workout set (for Supabase save)
     - exercise_id: Optional - Exercise ID (for Supabase save)
     - exercise_name: Optional - Exercise name (for Supabase save)
+    - load_kg: Optional - Bar load; feeds the user's load-velocity profile (e1RM)
+    - depth_metadata: Optional - Per-frame depth summary (.jsonl) or depth-map
+      sidecar (.dpth) for TIER 1 per-frame calibration
+    - focal_length_px: Optional - Focal length if the depth file has none
     """
 
     if not video.filename.lower().endswith(('.mp4', '.avi', '.mov')):
@@ -111,6 +109,25 @@ async def analyze_form(
             content = await video.read()
             await out_file.write(content)
 
+        # Optional depth metadata -> per-frame pixels per meter (TIER 1)
+        depth_track = None
+        if depth_metadata is not None and depth_metadata.filename:
+            depth_path = UPLOAD_DIR / f"{analysis_id}.depth"
+            try:
+                async with aiofiles.open(depth_path, 'wb') as depth_file:
+                    while True:
+                        chunk = await depth_metadata.read(DEPTH_UPLOAD_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        await depth_file.write(chunk)
+
+                depth_track = load_depth_metadata(depth_path, focal_length=focal_length_px)
+                print(f"Depth metadata loaded: {depth_track.summary()}")
+            except DepthMetadataError as e:
+                raise HTTPException(status_code=400, detail=f"Invalid depth metadata: {str(e)}")
+            finally:
+                depth_path.unlink(missing_ok=True)
+
         # Check video rotation metadata before normalizing
         rotation = 0
         try:
@@ -193,7 +210,8 @@ async def analyze_form(
                 output_dir=output_path_abs,
                 save_video=True,
                 save_pose_data=True,
-                exercise_type=exercise_type or "general"
+                exercise_type=exercise_type or "general",
+                depth_track=depth_track
             )
 
             print(f"MediaPipe processing complete: {result['frames_processed']} frames")
@@ -213,7 +231,7 @@ async def analyze_form(
 
         # Get velocity metrics with calibration info
         velocity_metrics = result.get('velocity_metrics', {})
-        calibration_info = velocity_metrics.get('calibration', {})
+        calibration_info = velocity_metrics.get('calibration') or result.get('calibration', {})
 
         response = {
             "analysis_id": analysis_id,
@@ -228,6 +246,22 @@ async def analyze_form(
             "download_url": f"/api/v1/download/{analysis_id}" if analyzed_video else None
         }
 
+        # Velocity autoregulation: live e1RM + velocity-loss stop advice
+        if user_id:
+            try:
+                # First set of an exercise reads its history from Supabase
+                response["autoregulation"] = await asyncio.to_thread(
+                    get_autoregulation_service().record_set,
+                    user_id=user_id,
+                    exercise_id=exercise_id,
+                    exercise_type=exercise_type,
+                    velocity_metrics=velocity_metrics,
+                    load_kg=load_kg,
+                    set_id=set_id
+                )
+            except Exception as e:
+                print(f"Autoregulation error: {str(e)}")
+
         # Debug output
         summary = velocity_metrics.get('summary', {})
         unit = summary.get('unit', 'speed_index')
@@ -254,7 +288,8 @@ async def analyze_form(
                     exercise_id=final_exercise_id,
                     exercise_name=final_exercise_name,
                     velocity_metrics=velocity_metrics,
-                    video_url=response.get('download_url')
+                    video_url=response.get('download_url'),
+                    weight_kg=load_kg
                 )
 
                 if supabase_result.get('success'):
@@ -285,6 +320,8 @@ async def analyze_form(
 
         return JSONResponse(content=response)
 
+    except HTTPException:
+        raise
     except subprocess.TimeoutExpired:
         raise HTTPException(
             status_code=504,
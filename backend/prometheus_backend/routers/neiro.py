@@ -13,14 +13,17 @@ Usage from Android:
 import asyncio
 import json
 import logging
-import time
-from typing import Optional, Dict, Any
-from pathlib import Path
+import os
+from typing import Dict
 
-import cv2
-import numpy as np
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from starlette.websockets import WebSocketState
+
+from ..neiro.model_registry import MODEL_PATH, ONNX_MODEL_PATH, get_model_registry
+from ..neiro.tracker import BarbellTracker
+from ..neiro.batching import get_batch_server
+from ..neiro.session import MAX_FPS, NeiroSession
+from ..neiro.protocol import ProtocolError, negotiate
+from ..neiro.recorder import RECORD_ALL
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -28,168 +31,36 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/neiro", tags=["neiro"])
 
-# ═══════════════════════════════════════════════════════════════════════════════
-# CONFIGURATION
-# ═══════════════════════════════════════════════════════════════════════════════
-
-MODEL_PATH = Path(__file__).parent.parent / "bestv2.pt"
-ONNX_MODEL_PATH = Path(__file__).parent.parent / "bestv2.onnx"
-CONFIDENCE_THRESHOLD = 0.25
-IMGSZ = 640
+# Admission control (per worker process)
+MAX_SESSIONS = int(os.getenv("NEIRO_MAX_SESSIONS", "16"))
+IDLE_TIMEOUT_S = float(os.getenv("NEIRO_IDLE_TIMEOUT_S", "30"))
 
+# WebSocket close code 1013: "Try Again Later"
+WS_TRY_AGAIN_LATER = 1013
 
 # ═══════════════════════════════════════════════════════════════════════════════
-# BARBELL TRACKER
+# MODEL STARTUP
 # ═══════════════════════════════════════════════════════════════════════════════
 
-class BarbellTracker:
-    """YOLO-based barbell tracker with position locking and smoothing"""
-
-    def __init__(self):
-        self.model = None
-        self.locked_position: Optional[tuple] = None
-        self.lock_radius = 200
-        self.ema_alpha = 0.4
-        self.smoothed_x: Optional[float] = None
-        self.smoothed_y: Optional[float] = None
-        self.frame_count = 0
-        self.detection_count = 0
-        self.last_inference_ms = 0
-        self._initialized = False
-
-    def initialize(self) -> bool:
-        """Lazy-load the YOLO model"""
-        if self._initialized:
-            return True
-
-        try:
-            from ultralytics import YOLO
-
-            # Try .pt first, fall back to .onnx
-            if MODEL_PATH.exists():
-                logger.info(f"Loading YOLO model: {MODEL_PATH}")
-                self.model = YOLO(str(MODEL_PATH))
-            elif ONNX_MODEL_PATH.exists():
-                logger.info(f"Loading ONNX model: {ONNX_MODEL_PATH}")
-                self.model = YOLO(str(ONNX_MODEL_PATH))
-            else:
-                logger.error(f"No model found at {MODEL_PATH} or {ONNX_MODEL_PATH}")
-                return False
-
-            self._initialized = True
-            logger.info("Model loaded successfully")
-            return True
-
-        except Exception as e:
-            logger.error(f"Failed to load model: {e}")
-            return False
-
-    def lock_to_position(self, x: float, y: float):
-        """Lock detection to a specific position (tap-to-lock)"""
-        self.locked_position = (x, y)
-        self.smoothed_x = x
-        self.smoothed_y = y
-        logger.info(f"Locked to position: ({x:.0f}, {y:.0f})")
-
-    def unlock(self):
-        """Unlock position tracking"""
-        self.locked_position = None
-        logger.info("Position unlocked")
-
-    def reset(self):
-        """Reset tracker state for new session"""
-        self.locked_position = None
-        self.smoothed_x = None
-        self.smoothed_y = None
-        self.frame_count = 0
-        self.detection_count = 0
-        logger.info("Tracker reset")
-
-    def detect(self, frame: np.ndarray) -> Dict[str, Any]:
-        """Run detection on a frame"""
-        if not self._initialized or self.model is None:
-            return {"error": "Model not initialized"}
-
-        self.frame_count += 1
-        start_time = time.time()
-
-        try:
-            results = self.model(frame, imgsz=IMGSZ, conf=CONFIDENCE_THRESHOLD, verbose=False)
-            self.last_inference_ms = (time.time() - start_time) * 1000
-        except Exception as e:
-            logger.error(f"Detection error: {e}")
-            return {"error": str(e), "inference_ms": 0}
-
-        best_detection = None
-        best_score = 0
-
-        for result in results:
-            boxes = result.boxes
-            if boxes is None or len(boxes) == 0:
-                continue
-
-            for box in boxes:
-                conf = float(box.conf[0])
-                x1, y1, x2, y2 = box.xyxy[0].tolist()
-                cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
-                w, h = x2 - x1, y2 - y1
-
-                # If locked, only consider detections near lock position
-                if self.locked_position:
-                    dist = np.sqrt(
-                        (cx - self.locked_position[0])**2 +
-                        (cy - self.locked_position[1])**2
-                    )
-                    if dist > self.lock_radius:
-                        continue
-                    score = conf * (1 - dist / self.lock_radius)
-                else:
-                    score = conf
-
-                if score > best_score:
-                    best_score = score
-                    best_detection = {"x": cx, "y": cy, "w": w, "h": h, "conf": conf}
-
-        if best_detection:
-            self.detection_count += 1
-
-            # Apply EMA smoothing
-            if self.smoothed_x is None:
-                self.smoothed_x = best_detection["x"]
-                self.smoothed_y = best_detection["y"]
-            else:
-                self.smoothed_x = self.ema_alpha * best_detection["x"] + (1 - self.ema_alpha) * self.smoothed_x
-                self.smoothed_y = self.ema_alpha * best_detection["y"] + (1 - self.ema_alpha) * self.smoothed_y
-
-            # Update lock position to follow barbell
-            if self.locked_position:
-                self.locked_position = (self.smoothed_x, self.smoothed_y)
-
-            return {
-                "x": self.smoothed_x,
-                "y": self.smoothed_y,
-                "w": best_detection["w"],
-                "h": best_detection["h"],
-                "conf": best_detection["conf"],
-                "inference_ms": self.last_inference_ms
-            }
-        else:
-            return {
-                "x": 0,
-                "y": 0,
-                "w": 0,
-                "h": 0,
-                "conf": 0,
-                "inference_ms": self.last_inference_ms
-            }
+@router.on_event("startup")
+async def load_shared_model():
+    """Load the detector once per worker so connects don't pay for it"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, get_model_registry().load)
+    get_batch_server().start()
+
+
+@router.on_event("shutdown")
+async def stop_batch_server():
+    await get_batch_server().stop()
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # WEBSOCKET ENDPOINT
 # ═══════════════════════════════════════════════════════════════════════════════
 
-# Per-connection tracker instances
-active_trackers: Dict[str, BarbellTracker] = {}
+# Live sessions keyed by server-generated session id (bounded by MAX_SESSIONS)
+active_sessions: Dict[str, NeiroSession] = {}
 
 
 @router.websocket("/track")
@@ -199,9 +70,26 @@ async def websocket_track(websocket: WebSocket):
 
     Protocol:
     - Binary messages: JPEG-encoded frames -> returns JSON detection result
-    - Text messages: JSON commands (lock, unlock, ping, reset)
+      (or a packed binary result after "hello"; each carries seq + timestamps)
+      (latest frame wins: frames sent faster than inference are dropped and
+      counted in "dropped_frames")
+    - Text messages: JSON commands (hello, lock, unlock, ping, reset)
+
+    Admission control: at most NEIRO_MAX_SESSIONS sessions per worker (extra
+    connections are closed with code 1013), frames above NEIRO_MAX_FPS are
+    answered with a "rate_limited" result and counted in
+    "rate_limited_frames", and a connection that
+    sends nothing for NEIRO_IDLE_TIMEOUT_S seconds is closed.
 
     Commands:
+    - {"action": "hello", "protocol": "binary"} - Negotiate the compact binary
+      protocol with seq / capture timestamps (see neiro/protocol.py)
+    - {"action": "calibrate", "pixels_per_meter": 410} - Scale for live VBT
+      (or "reference": {...}, or no scale to use the current plate box);
+      completed reps are then pushed as {"event": "rep", ...}
+    - {"action": "summary"} - Reps and velocity loss of the current set
+    - {"action": "record"} - Log this session for offline replay (needs
+      NEIRO_RECORD_DIR on the server; see neiro/recorder.py)
     - {"action": "lock", "x": 100, "y": 200} - Lock to position
     - {"action": "unlock"} - Unlock position
     - {"action": "ping"} - Health check
@@ -210,120 +98,183 @@ async def websocket_track(websocket: WebSocket):
     await websocket.accept()
 
     client_id = f"{websocket.client.host}:{websocket.client.port}"
-    logger.info(f"Client connected: {client_id}")
 
-    # Create tracker for this connection
-    tracker = BarbellTracker()
-    if not tracker.initialize():
-        await websocket.send_json({"error": "Failed to initialize model"})
-        await websocket.close()
+    if len(active_sessions) >= MAX_SESSIONS:
+        logger.warning(f"Rejected {client_id}: {len(active_sessions)}/{MAX_SESSIONS} sessions active")
+        await websocket.send_json({"error": "Server at capacity, retry later", "max_sessions": MAX_SESSIONS})
+        await websocket.close(code=WS_TRY_AGAIN_LATER)
         return
 
-    active_trackers[client_id] = tracker
+    # Lightweight session; the YOLO model is shared across connections and
+    # preloaded at startup
+    registry = get_model_registry()
+    detector = registry.get_detector() if registry.is_loaded else None
+    if detector is None:
+        # Startup load failed: retry it off the event loop
+        detector = await asyncio.get_running_loop().run_in_executor(None, registry.load)
+    if detector is None:
+        await websocket.send_json({"error": "Failed to initialize model"})
+        await websocket.close(code=WS_TRY_AGAIN_LATER)
+        return
+    tracker = BarbellTracker(detector)
+
+    # Decode + inference run in the session worker, off the receive loop
+    session = NeiroSession(
+        tracker, websocket.send_json, get_batch_server(), websocket.send_bytes, client_id=client_id
+    )
+    session_id = session.session_id
+    active_sessions[session_id] = session
+    session.start()
+    if RECORD_ALL:
+        session.start_recording()
+    logger.info(f"Client connected: {client_id} (session {session_id})")
 
     try:
         while True:
-            message = await websocket.receive()
+            try:
+                message = await asyncio.wait_for(websocket.receive(), timeout=IDLE_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                logger.info(f"Idle timeout: session {session_id}")
+                await session.send({"error": "Idle timeout", "idle_timeout_s": IDLE_TIMEOUT_S})
+                await websocket.close(code=1000)
+                break
 
             if message["type"] == "websocket.disconnect":
                 break
 
             # Handle binary data (JPEG frames)
-            if "bytes" in message:
+            if message.get("bytes") is not None:
                 try:
-                    # Decode JPEG to numpy array
-                    nparr = np.frombuffer(message["bytes"], np.uint8)
-                    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-
-                    if frame is None:
-                        await websocket.send_json({"error": "Invalid image data"})
-                        continue
-
-                    # Run detection
-                    result = tracker.detect(frame)
-                    await websocket.send_json(result)
-
-                except Exception as e:
-                    logger.error(f"Frame processing error: {e}")
-                    await websocket.send_json({"error": str(e)})
+                    rejected = session.offer_frame(message["bytes"])
+                    if rejected is not None:
+                        await session.send_result(rejected)
+                except ProtocolError as e:
+                    await session.send({"error": str(e)})
 
             # Handle text data (JSON commands)
-            elif "text" in message:
+            elif message.get("text") is not None:
                 try:
                     cmd = json.loads(message["text"])
                     action = cmd.get("action", "")
+                    session.touch()
+                    session.record_command(message["text"])
+
+                    if action == "hello":
+                        protocol, frame_header, reply = negotiate(cmd)
+                        session.configure_protocol(protocol, frame_header)
+                        reply["session_id"] = session_id
+                        reply["max_fps"] = MAX_FPS
+                        await session.send(reply)
+
+                    elif action == "calibrate":
+                        await session.send(session.vbt.calibrate(cmd, tracker.last_box_size[1] or None))
+
+                    elif action == "summary":
+                        await session.send({"status": "summary", **session.vbt.summary()})
 
-                    if action == "lock":
+                    elif action == "record":
+                        recording = session.start_recording()
+                        await session.send({"status": "recording" if recording else "recording_disabled"})
+
+                    elif action == "lock":
                         x = cmd.get("x", 0)
                         y = cmd.get("y", 0)
-                        tracker.lock_to_position(x, y)
-                        await websocket.send_json({"status": "locked", "x": x, "y": y})
+                        # Applied by the frame worker, between frames
+                        session.submit_command(lambda: tracker.lock_to_position(x, y))
+                        await session.send({"status": "locked", "x": x, "y": y})
 
                     elif action == "unlock":
-                        tracker.unlock()
-                        await websocket.send_json({"status": "unlocked"})
+                        session.submit_command(tracker.unlock)
+                        await session.send({"status": "unlocked"})
 
                     elif action == "ping":
-                        await websocket.send_json({
+                        await session.send({
                             "status": "pong",
+                            "session_id": session_id,
                             "frame_count": tracker.frame_count,
-                            "detection_count": tracker.detection_count
+                            "detection_count": tracker.detection_count,
+                            "dropped_frames": session.dropped_frames,
+                            "rate_limited_frames": session.rate_limited_frames
                         })
 
                     elif action == "reset":
-                        tracker.reset()
-                        await websocket.send_json({"status": "reset"})
+                        session.submit_command(tracker.reset)
+                        session.submit_command(session.vbt.reset)
+                        await session.send({"status": "reset"})
 
                     else:
-                        await websocket.send_json({"error": f"Unknown action: {action}"})
+                        await session.send({"error": f"Unknown action: {action}"})
 
                 except json.JSONDecodeError:
-                    await websocket.send_json({"error": "Invalid JSON"})
+                    await session.send({"error": "Invalid JSON"})
                 except Exception as e:
-                    await websocket.send_json({"error": str(e)})
+                    await session.send({"error": str(e)})
 
     except WebSocketDisconnect:
-        logger.info(f"Client disconnected: {client_id}")
+        logger.info(f"Client disconnected: {client_id} (session {session_id})")
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
     finally:
         # Cleanup
-        if client_id in active_trackers:
-            del active_trackers[client_id]
-        logger.info(f"Cleaned up tracker for: {client_id}")
+        await session.close()
+        active_sessions.pop(session_id, None)
+        logger.info(f"Cleaned up session {session_id} ({client_id})")
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # REST ENDPOINTS (for testing and status)
 # ═══════════════════════════════════════════════════════════════════════════════
 
+def _queue_depth() -> Dict[str, int]:
+    """Frames waiting for inference (shared batch queue + session mailboxes)"""
+    return {
+        "batch_queue": get_batch_server().queue_depth,
+        "session_mailboxes": sum(session.queue_depth for session in active_sessions.values())
+    }
+
+
 @router.get("/status")
 async def neiro_status():
     """Get Neiro service status"""
     model_available = MODEL_PATH.exists() or ONNX_MODEL_PATH.exists()
+    batching = get_batch_server().stats()
 
     return {
         "service": "Neiro Live Tracking",
         "status": "running",
         "model_available": model_available,
         "model_path": str(MODEL_PATH) if MODEL_PATH.exists() else str(ONNX_MODEL_PATH),
-        "active_connections": len(active_trackers),
+        "model": get_model_registry().status(),
+        "batching": batching,
+        "inference_latency": batching["inference_latency"],
+        "queue_depth": _queue_depth(),
+        "active_connections": len(active_sessions),
+        "admission": {
+            "max_sessions": MAX_SESSIONS,
+            "max_fps": MAX_FPS,
+            "idle_timeout_s": IDLE_TIMEOUT_S
+        },
         "websocket_endpoint": "/neiro/track"
     }
 
 
 @router.get("/connections")
 async def list_connections():
-    """List active WebSocket connections"""
+    """List active WebSocket sessions"""
     return {
-        "count": len(active_trackers),
+        "count": len(active_sessions),
+        "max_sessions": MAX_SESSIONS,
+        "queue_depth": _queue_depth(),
+        "inference_latency": get_batch_server().latency.percentiles(),
         "connections": [
             {
-                "client_id": client_id,
-                "frame_count": tracker.frame_count,
-                "detection_count": tracker.detection_count,
-                "locked": tracker.locked_position is not None
+                **session.stats(),
+                "frame_count": session.tracker.frame_count,
+                "detection_count": session.tracker.detection_count,
+                "locked": session.tracker.locked_position is not None,
+                "flow_frame_count": session.tracker.flow_frame_count,
+                "roi_count": session.tracker.roi_count
             }
-            for client_id, tracker in active_trackers.items()
+            for session in list(active_sessions.values())
         ]
-    }
\ No newline at end of file
+    }
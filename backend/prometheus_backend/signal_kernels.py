@@ -0,0 +1,314 @@
+"""
+Signal Processing Kernels - Shared filters for VBT, form scoring and live tracking
+
+All kernels operate on whole arrays: 1-D (T,) signals or 2-D (T, N) stacks
+of N channels sampled at the same times (e.g. x/y of several landmarks).
+Time is always axis 0.
+
+SciPy is used when installed (it is in requirements.txt); every kernel has
+a pure NumPy fallback so slim deployments keep working:
+- lowpass_filter: zero-phase Butterworth (sosfiltfilt / FFT-domain |H|^2)
+- differentiate: central differences on (possibly irregular) timestamps
+- find_peaks: peak detection with height, distance and prominence
+- resample_uniform: irregular sample times -> uniform grid (frame skipping,
+  dropped detections)
+
+Live tracking can't wait for future samples, so it uses the streaming
+CausalDerivativeFilter (one-pole IIR low-pass + filtered derivative) instead.
+"""
+
+import math
+
+import numpy as np
+from typing import Optional, Tuple
+
+try:
+    from scipy import signal as _scipy_signal
+    SCIPY_AVAILABLE = True
+except ImportError:  # pragma: no cover - depends on deployment
+    _scipy_signal = None
+    SCIPY_AVAILABLE = False
+
+
+def _as_time_major(x: np.ndarray) -> Tuple[np.ndarray, bool]:
+    """Return a float (T, N) view of x and whether x was 1-D"""
+    x = np.asarray(x, dtype=np.float64)
+    if x.ndim == 1:
+        return x[:, None], True
+    return x, False
+
+
+def estimate_sample_rate(t: np.ndarray) -> float:
+    """Sample rate (Hz) from the median timestamp spacing"""
+    t = np.asarray(t, dtype=np.float64)
+    if len(t) < 2:
+        return 0.0
+    dt = np.median(np.diff(t))
+    return float(1.0 / dt) if dt > 0 else 0.0
+
+
+# ═══════════════════════════════════════════════════════════════
+# ZERO-PHASE LOW-PASS FILTER
+# ═══════════════════════════════════════════════════════════════
+
+def lowpass_filter(
+    x: np.ndarray,
+    cutoff_hz: float,
+    fs: float,
+    order: int = 2
+) -> np.ndarray:
+    """
+    Zero-phase Butterworth low-pass filter along axis 0.
+
+    Args:
+        x: (T,) or (T, N) uniformly sampled signal
+        cutoff_hz: -3 dB cutoff of the single pass
+        fs: Sample rate in Hz
+        order: Butterworth order (forward-backward doubles the attenuation)
+
+    Returns:
+        Filtered array with the same shape as x
+    """
+    data, was_1d = _as_time_major(x)
+    if len(data) < 3 or fs <= 0 or cutoff_hz <= 0 or cutoff_hz >= fs / 2:
+        return np.asarray(x, dtype=np.float64).copy()
+
+    if SCIPY_AVAILABLE:
+        out = _lowpass_scipy(data, cutoff_hz, fs, order)
+    else:
+        out = _lowpass_numpy(data, cutoff_hz, fs, order)
+
+    return out[:, 0] if was_1d else out
+
+
+def _lowpass_scipy(data: np.ndarray, cutoff_hz: float, fs: float, order: int) -> np.ndarray:
+    sos = _scipy_signal.butter(order, cutoff_hz, btype="low", fs=fs, output="sos")
+    # Default padlen is too long for short rep clips - cap it to the signal
+    padlen = min(3 * (2 * len(sos) + 1), len(data) - 1)
+    return _scipy_signal.sosfiltfilt(sos, data, axis=0, padlen=padlen)
+
+
+def _lowpass_numpy(data: np.ndarray, cutoff_hz: float, fs: float, order: int) -> np.ndarray:
+    """
+    FFT-domain equivalent of filtfilt: apply |H(f)|^2 of a Butterworth
+    filter (zero phase by construction) on an odd-reflected signal.
+    """
+    n = len(data)
+    pad = min(n - 1, max(3, int(fs / cutoff_hz)))
+    head = 2 * data[0] - data[pad:0:-1]
+    tail = 2 * data[-1] - data[-2:-pad - 2:-1]
+    padded = np.concatenate((head, data, tail), axis=0)
+
+    freqs = np.fft.rfftfreq(len(padded), d=1.0 / fs)
+    gain = 1.0 / (1.0 + (freqs / cutoff_hz) ** (2 * order))
+    spectrum = np.fft.rfft(padded, axis=0) * gain[:, None]
+    filtered = np.fft.irfft(spectrum, n=len(padded), axis=0)
+    return filtered[pad:pad + n]
+
+
+# ═══════════════════════════════════════════════════════════════
+# DIFFERENTIATION
+# ═══════════════════════════════════════════════════════════════
+
+def differentiate(
+    x: np.ndarray,
+    t: Optional[np.ndarray] = None,
+    fs: Optional[float] = None
+) -> np.ndarray:
+    """
+    First derivative along axis 0 (second-order central differences).
+
+    Args:
+        x: (T,) or (T, N) signal
+        t: Optional (T,) timestamps - handles irregular spacing
+        fs: Sample rate for uniform signals when t is not given
+
+    Returns:
+        dx/dt with the same shape as x
+    """
+    x = np.asarray(x, dtype=np.float64)
+    if len(x) < 2:
+        return np.zeros_like(x)
+    if t is not None:
+        return np.gradient(x, np.asarray(t, dtype=np.float64), axis=0)
+    return np.gradient(x, 1.0 / fs if fs else 1.0, axis=0)
+
+
+# ═══════════════════════════════════════════════════════════════
+# CAUSAL (STREAMING) FILTER
+# ═══════════════════════════════════════════════════════════════
+
+def one_pole_alpha(cutoff_hz: float, dt: float) -> float:
+    """Smoothing factor of a one-pole low-pass for one step of dt seconds"""
+    return 1.0 - math.exp(-2.0 * math.pi * cutoff_hz * dt)
+
+
+class CausalDerivativeFilter:
+    """
+    Streaming one-pole low-pass of a scalar signal and of its derivative.
+
+    alpha is recomputed from each step's dt, so dropped frames and jittery
+    arrival don't skew the result. The output lags the input (causal), unlike
+    lowpass_filter, but a rep's velocity area is preserved.
+    """
+
+    def __init__(self, cutoff_hz: float):
+        self.cutoff_hz = cutoff_hz
+        self.reset()
+
+    def reset(self, x: Optional[float] = None):
+        """Restart from x (or empty); the derivative restarts at zero"""
+        self.value = x
+        self.derivative = 0.0
+
+    def update(self, x: float, dt: Optional[float]) -> Tuple[float, float]:
+        """
+        Push one sample.
+
+        Args:
+            x: New raw sample
+            dt: Seconds since the previous sample (None or <= 0 restarts)
+
+        Returns:
+            (filtered value, filtered derivative per second)
+        """
+        if self.value is None or dt is None or dt <= 0:
+            self.reset(x)
+            return self.value, self.derivative
+
+        alpha = one_pole_alpha(self.cutoff_hz, dt)
+        previous = self.value
+        self.value += alpha * (x - self.value)
+        self.derivative += alpha * ((self.value - previous) / dt - self.derivative)
+        return self.value, self.derivative
+
+
+# ═══════════════════════════════════════════════════════════════
+# PEAK DETECTION
+# ═══════════════════════════════════════════════════════════════
+
+def find_peaks(
+    x: np.ndarray,
+    height: Optional[float] = None,
+    distance: Optional[int] = None,
+    prominence: Optional[float] = None
+) -> np.ndarray:
+    """
+    Indices of local maxima in a 1-D signal.
+
+    Args:
+        x: (T,) signal (negate it to find minima)
+        height: Minimum peak value
+        distance: Minimum samples between peaks (taller peaks win)
+        prominence: Minimum prominence above the surrounding baseline
+
+    Returns:
+        Sorted peak indices
+    """
+    x = np.asarray(x, dtype=np.float64)
+    if x.ndim != 1:
+        raise ValueError("find_peaks expects a 1-D signal")
+    if len(x) < 3:
+        return np.array([], dtype=np.int64)
+
+    if SCIPY_AVAILABLE:
+        peaks, _ = _scipy_signal.find_peaks(x, height=height, distance=distance, prominence=prominence)
+        return peaks.astype(np.int64)
+    return _find_peaks_numpy(x, height, distance, prominence)
+
+
+def _find_peaks_numpy(
+    x: np.ndarray,
+    height: Optional[float],
+    distance: Optional[int],
+    prominence: Optional[float]
+) -> np.ndarray:
+    # Local maxima; plateaus report their middle sample like SciPy
+    rising = np.diff(x)
+    keep = np.flatnonzero(rising != 0)
+    if len(keep) < 2:
+        return np.array([], dtype=np.int64)
+    signs = np.sign(rising[keep])
+    turn = np.flatnonzero((signs[:-1] > 0) & (signs[1:] < 0))
+    peaks = (keep[turn] + 1 + keep[turn + 1]) // 2
+
+    if height is not None:
+        peaks = peaks[x[peaks] >= height]
+
+    if distance is not None and distance > 1 and len(peaks) > 1:
+        # Greedy: keep the tallest peaks, drop neighbours closer than distance
+        order = np.argsort(-x[peaks], kind="stable")
+        removed = np.zeros(len(peaks), dtype=bool)
+        for i in order:
+            if removed[i]:
+                continue
+            close = np.abs(peaks - peaks[i]) < distance
+            close[i] = False
+            removed |= close
+        peaks = peaks[~removed]
+
+    if prominence is not None and len(peaks):
+        peaks = peaks[peak_prominences(x, peaks) >= prominence]
+
+    return peaks.astype(np.int64)
+
+
+def peak_prominences(x: np.ndarray, peaks: np.ndarray) -> np.ndarray:
+    """Prominence of each peak (height above the higher of its two bases)"""
+    x = np.asarray(x, dtype=np.float64)
+    peaks = np.asarray(peaks, dtype=np.int64)
+    if SCIPY_AVAILABLE:
+        return _scipy_signal.peak_prominences(x, peaks)[0]
+
+    prominences = np.empty(len(peaks))
+    for k, p in enumerate(peaks):
+        left_higher = np.flatnonzero(x[:p] > x[p])
+        left_start = left_higher[-1] + 1 if len(left_higher) else 0
+        right_higher = np.flatnonzero(x[p + 1:] > x[p])
+        right_end = p + 1 + right_higher[0] if len(right_higher) else len(x)
+        base = max(x[left_start:p + 1].min(), x[p:right_end].min())
+        prominences[k] = x[p] - base
+    return prominences
+
+
+# ═══════════════════════════════════════════════════════════════
+# RESAMPLING
+# ═══════════════════════════════════════════════════════════════
+
+def resample_uniform(
+    t: np.ndarray,
+    x: np.ndarray,
+    fs: Optional[float] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Linearly resample irregular samples onto a uniform time grid.
+
+    Args:
+        t: (T,) increasing timestamps (duplicates are dropped)
+        x: (T,) or (T, N) values at t
+        fs: Target rate; defaults to the median input rate
+
+    Returns:
+        (t_uniform, x_uniform) with x_uniform shaped like x on the new grid
+    """
+    t = np.asarray(t, dtype=np.float64)
+    data, was_1d = _as_time_major(x)
+
+    # Drop duplicate / non-increasing timestamps
+    keep = np.concatenate(([True], np.diff(t) > 0))
+    t, data = t[keep], data[keep]
+
+    if len(t) < 2:
+        return t, (data[:, 0] if was_1d else data)
+
+    fs = fs or estimate_sample_rate(t)
+    n = int(np.floor((t[-1] - t[0]) * fs + 1e-9)) + 1
+    t_uniform = t[0] + np.arange(n) / fs
+
+    # Vectorized linear interpolation for all channels at once
+    right = np.clip(np.searchsorted(t, t_uniform, side="right"), 1, len(t) - 1)
+    left = right - 1
+    w = ((t_uniform - t[left]) / (t[right] - t[left]))[:, None]
+    out = data[left] * (1 - w) + data[right] * w
+
+    return t_uniform, (out[:, 0] if was_1d else out)
@@ -53,7 +53,8 @@ class SupabaseFormAnalysisClient:
         exercise_id: str,
         exercise_name: str,
         velocity_metrics: Dict,
-        video_url: Optional[str] = None
+        video_url: Optional[str] = None,
+        weight_kg: Optional[float] = None
     ) -> Dict:
         """
         Save form analysis to workout_sets table with JSONB velocity_metrics
@@ -65,6 +66,7 @@ class SupabaseFormAnalysisClient:
             exercise_name: Exercise name (e.g., "Barbell Back Squat")
             velocity_metrics: Dict from MovementVelocityCalculator
             video_url: Optional URL to analyzed video
+            weight_kg: Optional bar load (kept for load-velocity profiles)
 
         Returns:
             Dict with saved set_id and metrics info
@@ -118,6 +120,9 @@ class SupabaseFormAnalysisClient:
                 "velocity_drop_percent": summary.get('velocity_drop_percent', 0),
                 "avg_rom_m": summary.get('avg_rom_m', 0),
 
+                # Bar path summary (deviation, drift, sticking point, TUT)
+                "bar_path": velocity_metrics.get('bar_path', {}),
+
                 # Per-rep data
                 "rep_data": [
                     {
@@ -127,7 +132,11 @@ class SupabaseFormAnalysisClient:
                         "rom_m": rep.get('rom', 0),
                         "duration_s": rep.get('duration_s', 0),
                         "concentric_duration_s": rep.get('concentric_duration_s', 0),
-                        "eccentric_duration_s": rep.get('eccentric_duration_s', 0)
+                        "eccentric_duration_s": rep.get('eccentric_duration_s', 0),
+                        "bar_path_deviation": rep.get('bar_path_deviation'),
+                        "horizontal_drift": rep.get('horizontal_drift'),
+                        "sticking_point_height": rep.get('sticking_point_height'),
+                        "time_under_tension_s": rep.get('time_under_tension_s')
                     }
                     for i, rep in enumerate(rep_data)
                 ]
@@ -145,6 +154,8 @@ class SupabaseFormAnalysisClient:
                 "video_uploaded_at": datetime.utcnow().isoformat(),
                 "velocity_metrics": velocity_metrics_jsonb
             }
+            if weight_kg is not None:
+                workout_set_data["weight_kg"] = weight_kg
 
             response = self.client.table('workout_sets') \
                 .upsert(workout_set_data, on_conflict='id') \
@@ -220,8 +231,17 @@ class SupabaseFormAnalysisClient:
                 "velocity_metrics_id": velocity_metrics_id,
                 "form_analysis_id": form_analysis_id,
                 "rep_number": rep.get('rep_number', 0),
+                "start_time_seconds": rep.get('start_time_s'),
+                "end_time_seconds": rep.get('end_time_s'),
                 "duration_seconds": rep.get('duration_s'),
-                "unit": unit
+                "unit": unit,
+
+                # Bar path analytics (tier-independent, see BarPathAnalyzer)
+                "bar_path_deviation": rep.get('bar_path_deviation'),
+                "horizontal_drift": rep.get('horizontal_drift'),
+                "sticking_point_height": rep.get('sticking_point_height'),
+                "sticking_point_time_seconds": rep.get('sticking_point_time_s'),
+                "time_under_tension_seconds": rep.get('time_under_tension_s')
             }
 
             # Add tier-specific fields
@@ -0,0 +1,414 @@
+"""
+Velocity Autoregulation - Per-user load-velocity profiles
+
+Builds a linear load-velocity profile per (user, exercise) from historical
+sets and uses it to:
+- Estimate 1RM (load at the exercise's minimum velocity threshold)
+- Recommend stopping a set once velocity loss exceeds a target
+
+Profiles are stored as running least-squares sums, so every new set is an
+O(1) update instead of a refit over the whole history. History is read
+from Supabase only once per (user, exercise) per process; afterwards the
+cached profile answers /analyze-form without extra DB scans.
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# Mean concentric velocity at 1RM (m/s) - from VBT literature
+MINIMUM_VELOCITY_THRESHOLDS = {
+    "squat": 0.30,
+    "back_squat": 0.30,
+    "front_squat": 0.30,
+    "bench_press": 0.17,
+    "incline_bench": 0.17,
+    "deadlift": 0.15,
+    "romanian_deadlift": 0.15,
+    "overhead_press": 0.19,
+    "barbell_row": 0.40,
+}
+DEFAULT_MINIMUM_VELOCITY_THRESHOLD = 0.25
+
+# Velocity loss (%) at which a set should end
+DEFAULT_VELOCITY_LOSS_THRESHOLD = 20.0
+
+# Older sets fade out so the profile follows the lifter's current form
+PROFILE_DECAY = 0.97
+
+
+def minimum_velocity_threshold(exercise_id: Optional[str]) -> float:
+    """Look up the 1RM velocity for an exercise id/type"""
+    if not exercise_id:
+        return DEFAULT_MINIMUM_VELOCITY_THRESHOLD
+
+    key = exercise_id.lower().replace("-", "_")
+    if key in MINIMUM_VELOCITY_THRESHOLDS:
+        return MINIMUM_VELOCITY_THRESHOLDS[key]
+
+    # Exercise ids like "squat-back-barbell" -> match on keyword
+    for name, mvt in MINIMUM_VELOCITY_THRESHOLDS.items():
+        if name in key:
+            return mvt
+    return DEFAULT_MINIMUM_VELOCITY_THRESHOLD
+
+
+class LoadVelocityProfile:
+    """Incrementally fitted linear load-velocity relationship"""
+
+    MIN_POINTS = 3
+    MIN_LOAD_SPREAD_KG = 5.0
+
+    def __init__(self, user_id: str, exercise_id: str, decay: float = PROFILE_DECAY):
+        self.user_id = user_id
+        self.exercise_id = exercise_id
+        self.decay = decay
+
+        # Weighted least-squares sufficient statistics
+        self.weight_sum = 0.0
+        self.sum_load = 0.0
+        self.sum_velocity = 0.0
+        self.sum_load_sq = 0.0
+        self.sum_load_velocity = 0.0
+        self.sum_velocity_sq = 0.0
+
+        self.points = 0
+        self.min_load: Optional[float] = None
+        self.max_load: Optional[float] = None
+        self.set_ids = set()
+        self.updated_at: Optional[float] = None
+
+    def add_point(self, load_kg: float, velocity: float, set_id: Optional[str] = None) -> bool:
+        """
+        Add one (load, mean concentric velocity) observation.
+
+        Returns:
+            False if the point was rejected (invalid or already counted)
+        """
+        if load_kg is None or velocity is None or load_kg <= 0 or velocity <= 0:
+            return False
+        if set_id is not None:
+            if set_id in self.set_ids:
+                return False
+            self.set_ids.add(set_id)
+
+        d = self.decay
+        self.weight_sum = self.weight_sum * d + 1.0
+        self.sum_load = self.sum_load * d + load_kg
+        self.sum_velocity = self.sum_velocity * d + velocity
+        self.sum_load_sq = self.sum_load_sq * d + load_kg * load_kg
+        self.sum_load_velocity = self.sum_load_velocity * d + load_kg * velocity
+        self.sum_velocity_sq = self.sum_velocity_sq * d + velocity * velocity
+
+        self.points += 1
+        self.min_load = load_kg if self.min_load is None else min(self.min_load, load_kg)
+        self.max_load = load_kg if self.max_load is None else max(self.max_load, load_kg)
+        self.updated_at = time.time()
+        return True
+
+    def fit(self) -> Optional[Tuple[float, float, float]]:
+        """
+        Solve velocity = intercept + slope * load.
+
+        Returns:
+            (slope, intercept, r_squared) or None if the profile is not usable
+        """
+        if self.points < self.MIN_POINTS:
+            return None
+        if (self.max_load - self.min_load) < self.MIN_LOAD_SPREAD_KG:
+            return None
+
+        w = self.weight_sum
+        mean_load = self.sum_load / w
+        mean_velocity = self.sum_velocity / w
+        s_ll = self.sum_load_sq / w - mean_load * mean_load
+        s_lv = self.sum_load_velocity / w - mean_load * mean_velocity
+        s_vv = self.sum_velocity_sq / w - mean_velocity * mean_velocity
+
+        if s_ll <= 1e-9:
+            return None
+
+        slope = s_lv / s_ll
+        if slope >= 0:
+            # Velocity must fall as load rises - anything else is noise
+            return None
+
+        intercept = mean_velocity - slope * mean_load
+        r_squared = (s_lv * s_lv) / (s_ll * s_vv) if s_vv > 1e-12 else 0.0
+        return slope, intercept, r_squared
+
+    def predict_velocity(self, load_kg: float) -> Optional[float]:
+        """Expected mean concentric velocity at a load"""
+        fitted = self.fit()
+        if fitted is None:
+            return None
+        slope, intercept, _ = fitted
+        return intercept + slope * load_kg
+
+    def estimate_1rm(self, mvt: Optional[float] = None) -> Optional[float]:
+        """Load at which velocity drops to the minimum velocity threshold"""
+        fitted = self.fit()
+        if fitted is None:
+            return None
+        slope, intercept, _ = fitted
+        mvt = mvt if mvt is not None else minimum_velocity_threshold(self.exercise_id)
+        e1rm = (mvt - intercept) / slope
+        return e1rm if e1rm > 0 else None
+
+    def to_dict(self) -> Dict:
+        """Profile summary for API responses"""
+        fitted = self.fit()
+        mvt = minimum_velocity_threshold(self.exercise_id)
+        e1rm = self.estimate_1rm(mvt)
+        return {
+            "exercise_id": self.exercise_id,
+            "sets_in_profile": self.points,
+            "load_range_kg": [self.min_load, self.max_load] if self.points else None,
+            "slope": round(fitted[0], 5) if fitted else None,
+            "intercept": round(fitted[1], 4) if fitted else None,
+            "r_squared": round(fitted[2], 3) if fitted else None,
+            "minimum_velocity_threshold": mvt,
+            "estimated_1rm_kg": round(e1rm, 1) if e1rm else None,
+        }
+
+
+def _set_unit(velocity_metrics: Dict) -> Optional[str]:
+    return velocity_metrics.get("unit") or velocity_metrics.get("calibration", {}).get("unit")
+
+
+def set_mean_velocity(velocity_metrics: Dict) -> Optional[float]:
+    """
+    Best mean concentric velocity of a set (m/s only).
+
+    Relative speed-index sets are skipped - they are not comparable
+    across sessions, so they can't feed a load-velocity profile.
+    """
+    if not velocity_metrics:
+        return None
+
+    if _set_unit(velocity_metrics) != "m/s":
+        return None
+
+    velocities = [
+        rep.get("avg_velocity")
+        for rep in velocity_metrics.get("rep_data", [])
+        if rep.get("avg_velocity")
+    ]
+    if velocities:
+        return max(velocities)
+
+    return velocity_metrics.get("summary", {}).get("avg_mean_velocity") or velocity_metrics.get("avg_mean_velocity")
+
+
+def rep_velocities(velocity_metrics: Dict) -> List[float]:
+    """
+    Per-rep velocities of one set, in a single metric.
+
+    Mean concentric velocity for calibrated (m/s) sets, speed index for
+    relative ones. Reps without that metric are skipped rather than
+    filled from another metric, which would distort velocity loss.
+    """
+    metric = "avg_velocity" if _set_unit(velocity_metrics) == "m/s" else "speed_index"
+    return [
+        rep[metric]
+        for rep in velocity_metrics.get("rep_data", [])
+        if rep.get(metric)
+    ]
+
+
+def velocity_loss_recommendation(
+    rep_velocities: List[float],
+    threshold_percent: float = DEFAULT_VELOCITY_LOSS_THRESHOLD
+) -> Dict:
+    """
+    Velocity loss within a set and whether to stop it.
+
+    Loss is measured from the fastest rep to the last rep.
+    """
+    velocities = [v for v in rep_velocities if v]
+    if len(velocities) < 2:
+        return {
+            "velocity_loss_percent": None,
+            "threshold_percent": threshold_percent,
+            "stop_set": False,
+            "reason": "Need at least 2 reps to measure velocity loss"
+        }
+
+    best = max(velocities)
+    loss = (best - velocities[-1]) / best * 100 if best > 0 else 0.0
+    stop = loss >= threshold_percent
+
+    return {
+        "velocity_loss_percent": round(loss, 1),
+        "threshold_percent": threshold_percent,
+        "stop_set": stop,
+        "reason": (
+            f"Velocity dropped {loss:.0f}% - end the set"
+            if stop else
+            f"Velocity loss {loss:.0f}% below {threshold_percent:.0f}% target"
+        )
+    }
+
+
+class VelocityAutoregulationService:
+    """Process-wide cache of load-velocity profiles with incremental updates"""
+
+    def __init__(self, supabase_client=None):
+        """
+        Args:
+            supabase_client: Optional SupabaseFormAnalysisClient; created lazily
+                             on the first history load when omitted
+        """
+        self._supabase = supabase_client
+        self._profiles: Dict[Tuple[str, str, str], LoadVelocityProfile] = {}
+        self._lock = threading.Lock()
+
+    def get_profile(
+        self,
+        user_id: str,
+        exercise_id: Optional[str] = None,
+        exercise_type: Optional[str] = None
+    ) -> LoadVelocityProfile:
+        """
+        Cached profile, bootstrapped from history on first access.
+
+        Profiles are keyed by exercise_id when given, else by exercise_type;
+        history is read by the matching column. Blocking (Supabase) - call
+        from a worker thread in async code.
+        """
+        column, exercise = ("exercise_id", exercise_id) if exercise_id else ("exercise_type", exercise_type or "general")
+        key = (user_id, column, exercise)
+        with self._lock:
+            profile = self._profiles.get(key)
+        if profile is not None:
+            return profile
+
+        # History is read outside the lock so one slow user can't stall others
+        profile = LoadVelocityProfile(user_id, exercise)
+        for set_id, load_kg, velocity in self._load_history(user_id, column, exercise):
+            profile.add_point(load_kg, velocity, set_id=set_id)
+
+        with self._lock:
+            profile = self._profiles.setdefault(key, profile)
+        print(f"📈 Load-velocity profile ready: {exercise} ({profile.points} sets)")
+        return profile
+
+    def record_set(
+        self,
+        user_id: str,
+        exercise_id: Optional[str],
+        velocity_metrics: Dict,
+        load_kg: Optional[float] = None,
+        set_id: Optional[str] = None,
+        velocity_loss_threshold: float = DEFAULT_VELOCITY_LOSS_THRESHOLD,
+        exercise_type: Optional[str] = None
+    ) -> Dict:
+        """
+        Fold a freshly analyzed set into the profile and build recommendations.
+
+        Blocking on the first set of an exercise (history load) - run it in
+        an executor from async handlers.
+
+        Returns:
+            Dict with estimated 1RM, profile summary and set-stop advice
+        """
+        profile = self.get_profile(user_id, exercise_id, exercise_type)
+
+        mean_velocity = set_mean_velocity(velocity_metrics)
+        added = False
+        if load_kg is not None and mean_velocity is not None:
+            with self._lock:
+                added = profile.add_point(load_kg, mean_velocity, set_id=set_id)
+
+        summary = profile.to_dict()
+        result = {
+            "profile": summary,
+            "estimated_1rm_kg": summary["estimated_1rm_kg"],
+            "set_added_to_profile": added,
+            "velocity_loss": velocity_loss_recommendation(rep_velocities(velocity_metrics), velocity_loss_threshold)
+        }
+
+        if load_kg is not None and mean_velocity is not None:
+            expected = profile.predict_velocity(load_kg)
+            result["set_mean_velocity"] = round(mean_velocity, 3)
+            result["expected_velocity"] = round(expected, 3) if expected else None
+
+        return result
+
+    def invalidate(self, user_id: str, exercise: Optional[str] = None):
+        """Drop cached profiles (e.g. after a set is deleted); exercise is an id or type"""
+        with self._lock:
+            for key in list(self._profiles):
+                if key[0] == user_id and (exercise is None or key[2] == exercise):
+                    del self._profiles[key]
+
+    def _load_history(self, user_id: str, column: str, exercise: str) -> Iterable[Tuple[str, float, float]]:
+        """
+        One-time history read: (set_id, load_kg, mean velocity) per set.
+
+        Reads workout_sets.velocity_metrics and rep_metrics (via form_analysis),
+        de-duplicated by set id. Type-keyed profiles match
+        workout_sets.velocity_metrics->>exercise_type.
+        """
+        try:
+            if self._supabase is None:
+                from .supabase_client import SupabaseFormAnalysisClient
+                self._supabase = SupabaseFormAnalysisClient()
+            client = self._supabase.client
+        except Exception as e:
+            print(f"⚠️ Load-velocity history unavailable: {str(e)}")
+            return []
+
+        history: Dict[str, Tuple[float, float]] = {}
+        set_column = 'exercise_id' if column == 'exercise_id' else 'velocity_metrics->>exercise_type'
+
+        try:
+            sets = client.table('workout_sets') \
+                .select('id, weight_kg, velocity_metrics, workout_sessions!inner(user_id)') \
+                .eq(set_column, exercise) \
+                .eq('workout_sessions.user_id', user_id) \
+                .not_.is_('velocity_metrics', 'null') \
+                .execute()
+
+            for row in sets.data or []:
+                velocity = set_mean_velocity(row.get('velocity_metrics') or {})
+                if row.get('weight_kg') and velocity:
+                    history[row['id']] = (float(row['weight_kg']), velocity)
+        except Exception as e:
+            print(f"⚠️ Error loading workout_sets history: {str(e)}")
+
+        # form_analysis has no exercise_type column
+        if column == 'exercise_id':
+            try:
+                analyses = client.table('form_analysis') \
+                    .select('set_id, workout_sets(weight_kg), rep_metrics(avg_velocity, unit)') \
+                    .eq('user_id', user_id) \
+                    .eq('exercise_id', exercise) \
+                    .execute()
+
+                for row in analyses.data or []:
+                    if row.get('set_id') in history:
+                        continue
+                    load = (row.get('workout_sets') or {}).get('weight_kg')
+                    velocities = [
+                        rep['avg_velocity'] for rep in row.get('rep_metrics') or []
+                        if rep.get('unit') == 'm/s' and rep.get('avg_velocity')
+                    ]
+                    if load and velocities:
+                        history[row['set_id']] = (float(load), max(velocities))
+            except Exception as e:
+                print(f"⚠️ Error loading rep_metrics history: {str(e)}")
+
+        return [(set_id, load, velocity) for set_id, (load, velocity) in history.items()]
+
+
+_autoregulation_service: Optional[VelocityAutoregulationService] = None
+
+
+def get_autoregulation_service() -> VelocityAutoregulationService:
+    """Shared service instance (profiles are cached per process)"""
+    global _autoregulation_service
+    if _autoregulation_service is None:
+        _autoregulation_service = VelocityAutoregulationService()
+    return _autoregulation_service
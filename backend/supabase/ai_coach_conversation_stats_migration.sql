@@ -0,0 +1,109 @@
+-- ============================================================
+-- AI Coach Conversation Stats - Migration
+-- ============================================================
+-- Purpose: Denormalized message count / last message preview on
+-- ai_coach_conversations, maintained by triggers, so listing a
+-- user's conversations is a single query (no per-conversation
+-- count / last message / title lookups)
+-- ============================================================
+
+-- 1. Denormalized columns
+ALTER TABLE ai_coach_conversations
+    ADD COLUMN IF NOT EXISTS message_count INT NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS last_message TEXT,  -- Preview (first 300 chars)
+    ADD COLUMN IF NOT EXISTS last_message_role TEXT,
+    ADD COLUMN IF NOT EXISTS last_message_at TIMESTAMP WITH TIME ZONE;
+
+-- 2. Listing index (user's active conversations, most recent first)
+CREATE INDEX IF NOT EXISTS idx_conversations_user_archived_updated
+    ON ai_coach_conversations(user_id, archived, updated_at DESC);
+
+-- 3. Insert trigger: bump count, last message, timestamp and default title
+CREATE OR REPLACE FUNCTION update_ai_coach_conversation_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE ai_coach_conversations
+    SET
+        updated_at = NOW(),
+        message_count = message_count + 1,
+        last_message = LEFT(NEW.content, 300),
+        last_message_role = NEW.role,
+        last_message_at = NEW.created_at,
+        -- Title from the first user message (same rule as generate_conversation_title)
+        title = COALESCE(
+            title,
+            CASE WHEN NEW.role = 'user' THEN
+                CASE WHEN LENGTH(NEW.content) > 50
+                    THEN SUBSTRING(NEW.content FROM 1 FOR 50) || '...'
+                    ELSE NEW.content
+                END
+            END
+        )
+    WHERE id = NEW.conversation_id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 4. Delete trigger: recount and restore the previous last message
+CREATE OR REPLACE FUNCTION refresh_ai_coach_conversation_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE ai_coach_conversations c
+    SET
+        message_count = (
+            SELECT COUNT(*) FROM ai_coach_messages WHERE conversation_id = c.id
+        ),
+        last_message = latest.preview,
+        last_message_role = latest.role,
+        last_message_at = latest.created_at
+    FROM (
+        SELECT
+            OLD.conversation_id AS conversation_id,
+            (SELECT LEFT(content, 300) FROM ai_coach_messages
+             WHERE conversation_id = OLD.conversation_id ORDER BY created_at DESC LIMIT 1) AS preview,
+            (SELECT role FROM ai_coach_messages
+             WHERE conversation_id = OLD.conversation_id ORDER BY created_at DESC LIMIT 1) AS role,
+            (SELECT MAX(created_at) FROM ai_coach_messages
+             WHERE conversation_id = OLD.conversation_id) AS created_at
+    ) latest
+    WHERE c.id = latest.conversation_id;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+-- The stats trigger also maintains updated_at
+DROP TRIGGER IF EXISTS trigger_update_conversation_timestamp ON ai_coach_messages;
+DROP TRIGGER IF EXISTS trigger_update_conversation_stats ON ai_coach_messages;
+CREATE TRIGGER trigger_update_conversation_stats
+    AFTER INSERT ON ai_coach_messages
+    FOR EACH ROW
+    EXECUTE FUNCTION update_ai_coach_conversation_stats();
+
+DROP TRIGGER IF EXISTS trigger_refresh_conversation_stats ON ai_coach_messages;
+CREATE TRIGGER trigger_refresh_conversation_stats
+    AFTER DELETE ON ai_coach_messages
+    FOR EACH ROW
+    EXECUTE FUNCTION refresh_ai_coach_conversation_stats();
+
+-- 5. Backfill existing conversations
+UPDATE ai_coach_conversations c
+SET
+    message_count = stats.message_count,
+    last_message = stats.last_message,
+    last_message_role = stats.last_message_role,
+    last_message_at = stats.last_message_at,
+    title = COALESCE(c.title, NULLIF(generate_conversation_title(c.id), 'New Conversation'))
+FROM (
+    SELECT
+        m.conversation_id,
+        COUNT(*) AS message_count,
+        (ARRAY_AGG(LEFT(m.content, 300) ORDER BY m.created_at DESC))[1] AS last_message,
+        (ARRAY_AGG(m.role ORDER BY m.created_at DESC))[1] AS last_message_role,
+        MAX(m.created_at) AS last_message_at
+    FROM ai_coach_messages m
+    GROUP BY m.conversation_id
+) stats
+WHERE c.id = stats.conversation_id;
+
+-- Done!
+-- Run this migration in Supabase SQL Editor
@@ -18,6 +18,18 @@ CREATE TABLE IF NOT EXISTS ai_coach_conversations (
     -- Conversation metadata
     title TEXT,  -- Auto-generated from first user message (e.g., "Squat program discussion")
 
+    -- Rolling summary of older turns (see ai_coach_summary_migration.sql)
+    summary TEXT,
+    summary_until TIMESTAMP WITH TIME ZONE,  -- created_at of the last summarized message
+    summary_message_count INT DEFAULT 0,
+    summary_updated_at TIMESTAMP WITH TIME ZONE,
+
+    -- Denormalized listing data, maintained by triggers (see below)
+    message_count INT NOT NULL DEFAULT 0,
+    last_message TEXT,  -- Preview (first 300 chars)
+    last_message_role TEXT,
+    last_message_at TIMESTAMP WITH TIME ZONE,
+
     -- Timestamps
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
@@ -69,6 +81,10 @@ CREATE INDEX IF NOT EXISTS idx_conversations_user_id
 CREATE INDEX IF NOT EXISTS idx_conversations_updated
     ON ai_coach_conversations(updated_at DESC);
 
+-- User's active conversations, most recent first (listing)
+CREATE INDEX IF NOT EXISTS idx_conversations_user_archived_updated
+    ON ai_coach_conversations(user_id, archived, updated_at DESC);
+
 -- Fast lookup of messages in a conversation
 CREATE INDEX IF NOT EXISTS idx_messages_conversation_id
     ON ai_coach_messages(conversation_id);
@@ -77,28 +93,78 @@ CREATE INDEX IF NOT EXISTS idx_messages_conversation_id
 CREATE INDEX IF NOT EXISTS idx_messages_created
     ON ai_coach_messages(created_at DESC);
 
+-- Recent messages of a conversation (history window)
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_created
+    ON ai_coach_messages(conversation_id, created_at DESC);
+
 -- ============================================================
--- Automatic Update Timestamp Trigger
+-- Conversation Stats Triggers (updated_at, message_count, last message)
 -- ============================================================
 
--- Function to update updated_at timestamp
-CREATE OR REPLACE FUNCTION update_ai_coach_conversation_timestamp()
+-- Insert: bump count, last message, updated_at and default title
+CREATE OR REPLACE FUNCTION update_ai_coach_conversation_stats()
 RETURNS TRIGGER AS $$
 BEGIN
-    -- Update the conversation's updated_at when a new message is added
     UPDATE ai_coach_conversations
-    SET updated_at = NOW()
+    SET
+        updated_at = NOW(),
+        message_count = message_count + 1,
+        last_message = LEFT(NEW.content, 300),
+        last_message_role = NEW.role,
+        last_message_at = NEW.created_at,
+        -- Title from the first user message (same rule as generate_conversation_title)
+        title = COALESCE(
+            title,
+            CASE WHEN NEW.role = 'user' THEN
+                CASE WHEN LENGTH(NEW.content) > 50
+                    THEN SUBSTRING(NEW.content FROM 1 FOR 50) || '...'
+                    ELSE NEW.content
+                END
+            END
+        )
     WHERE id = NEW.conversation_id;
     RETURN NEW;
 END;
 $$ LANGUAGE plpgsql;
 
--- Trigger on message insert
-DROP TRIGGER IF EXISTS trigger_update_conversation_timestamp ON ai_coach_messages;
-CREATE TRIGGER trigger_update_conversation_timestamp
+-- Delete: recount and restore the previous last message
+CREATE OR REPLACE FUNCTION refresh_ai_coach_conversation_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE ai_coach_conversations c
+    SET
+        message_count = (
+            SELECT COUNT(*) FROM ai_coach_messages WHERE conversation_id = c.id
+        ),
+        last_message = latest.preview,
+        last_message_role = latest.role,
+        last_message_at = latest.created_at
+    FROM (
+        SELECT
+            OLD.conversation_id AS conversation_id,
+            (SELECT LEFT(content, 300) FROM ai_coach_messages
+             WHERE conversation_id = OLD.conversation_id ORDER BY created_at DESC LIMIT 1) AS preview,
+            (SELECT role FROM ai_coach_messages
+             WHERE conversation_id = OLD.conversation_id ORDER BY created_at DESC LIMIT 1) AS role,
+            (SELECT MAX(created_at) FROM ai_coach_messages
+             WHERE conversation_id = OLD.conversation_id) AS created_at
+    ) latest
+    WHERE c.id = latest.conversation_id;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_update_conversation_stats ON ai_coach_messages;
+CREATE TRIGGER trigger_update_conversation_stats
     AFTER INSERT ON ai_coach_messages
     FOR EACH ROW
-    EXECUTE FUNCTION update_ai_coach_conversation_timestamp();
+    EXECUTE FUNCTION update_ai_coach_conversation_stats();
+
+DROP TRIGGER IF EXISTS trigger_refresh_conversation_stats ON ai_coach_messages;
+CREATE TRIGGER trigger_refresh_conversation_stats
+    AFTER DELETE ON ai_coach_messages
+    FOR EACH ROW
+    EXECUTE FUNCTION refresh_ai_coach_conversation_stats();
 
 -- ============================================================
 -- Row Level Security (RLS) Policies
@@ -0,0 +1,22 @@
+-- ============================================================
+-- AI Coach Rolling Conversation Summary - Migration
+-- ============================================================
+-- Purpose: Older chat turns are folded into a summary stored on
+-- the conversation, so /chat only resends recent messages
+-- (see ai_coach_service/history_summarizer.py)
+-- ============================================================
+
+-- 1. Summary columns on conversations
+ALTER TABLE ai_coach_conversations
+    ADD COLUMN IF NOT EXISTS summary TEXT,
+    -- created_at of the last message folded into the summary
+    ADD COLUMN IF NOT EXISTS summary_until TIMESTAMP WITH TIME ZONE,
+    ADD COLUMN IF NOT EXISTS summary_message_count INT DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS summary_updated_at TIMESTAMP WITH TIME ZONE;
+
+-- 2. Messages after summary_until, newest first
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_created
+    ON ai_coach_messages(conversation_id, created_at DESC);
+
+-- Done!
+-- Run this migration in Supabase SQL Editor
@@ -0,0 +1,183 @@
+"""
+Unit tests and micro-benchmarks for prometheus_backend.signal_kernels
+
+Run tests:       python -m pytest test_signal_kernels.py -q
+Run benchmarks:  python test_signal_kernels.py
+"""
+
+import os
+import sys
+import timeit
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from prometheus_backend import signal_kernels as sk
+
+
+def _noisy_sine(n=600, fs=30.0, freq=0.5, noise=0.05, channels=None, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) / fs
+    clean = np.sin(2 * np.pi * freq * t)
+    if channels:
+        clean = np.repeat(clean[:, None], channels, axis=1)
+    return t, clean, clean + rng.normal(0, noise, clean.shape)
+
+
+# ═══════════════════════════════════════════════════════════════
+# LOW-PASS FILTER
+# ═══════════════════════════════════════════════════════════════
+
+def test_lowpass_removes_noise_without_phase_shift():
+    t, clean, noisy = _noisy_sine()
+    filtered = sk.lowpass_filter(noisy, cutoff_hz=4.0, fs=30.0)
+
+    assert filtered.shape == noisy.shape
+    assert np.abs(filtered - clean).std() < np.abs(noisy - clean).std() / 2
+    # Zero phase: filtering the clean signal must not shift its peaks
+    assert np.argmax(sk.lowpass_filter(clean, 4.0, 30.0)[:60]) == np.argmax(clean[:60])
+
+
+def test_lowpass_numpy_fallback_matches_scipy():
+    _, _, noisy = _noisy_sine(channels=3)
+    fallback = sk._lowpass_numpy(noisy, 4.0, 30.0, 2)
+    assert fallback.shape == noisy.shape
+
+    if sk.SCIPY_AVAILABLE:
+        reference = sk._lowpass_scipy(noisy, 4.0, 30.0, 2)
+        interior = slice(30, -30)
+        assert np.abs(fallback[interior] - reference[interior]).max() < 0.02
+
+
+def test_lowpass_handles_short_and_invalid_input():
+    short = np.array([1.0, 2.0])
+    assert np.array_equal(sk.lowpass_filter(short, 4.0, 30.0), short)
+    # Cutoff above Nyquist -> passthrough
+    _, _, noisy = _noisy_sine(n=50)
+    assert np.array_equal(sk.lowpass_filter(noisy, 20.0, 30.0), noisy)
+
+
+# ═══════════════════════════════════════════════════════════════
+# DIFFERENTIATION
+# ═══════════════════════════════════════════════════════════════
+
+def test_differentiate_uniform_and_irregular():
+    t = np.linspace(0, 2, 61)
+    x = 3.0 * t ** 2
+    assert np.allclose(sk.differentiate(x, fs=30.0)[1:-1], 6.0 * t[1:-1], atol=1e-6)
+
+    # Drop every other sample in the middle (FRAME_SAMPLE_RATE / missed poses)
+    keep = np.ones(len(t), dtype=bool)
+    keep[10:40:2] = False
+    dx = sk.differentiate(x[keep], t=t[keep])
+    assert np.allclose(dx[1:-1], 6.0 * t[keep][1:-1], atol=1e-6)
+
+
+def test_differentiate_2d_channels():
+    t = np.linspace(0, 1, 31)
+    x = np.stack([t, 2 * t, -t], axis=1)
+    dx = sk.differentiate(x, t=t)
+    assert dx.shape == x.shape
+    assert np.allclose(dx, [1.0, 2.0, -1.0])
+
+
+def test_causal_derivative_filter_tracks_ramp_with_jitter():
+    rng = np.random.default_rng(0)
+    t = np.cumsum(rng.uniform(0.02, 0.05, 300))
+    f = sk.CausalDerivativeFilter(cutoff_hz=6.0)
+
+    assert f.update(1.0, None) == (1.0, 0.0)
+    f.reset()
+    for ti, dt in zip(t, np.diff(t, prepend=t[0] - 0.03)):
+        value, slope = f.update(2.0 * ti, dt)
+
+    # Irregular spacing: still converges to the ramp slope, with a small lag
+    assert abs(slope - 2.0) < 0.05
+    assert 0 < 2.0 * t[-1] - value < 0.2
+    # Non-increasing time restarts instead of dividing by zero
+    assert f.update(5.0, 0.0) == (5.0, 0.0)
+
+
+# ═══════════════════════════════════════════════════════════════
+# PEAK DETECTION
+# ═══════════════════════════════════════════════════════════════
+
+def test_find_peaks_numpy_matches_scipy():
+    t, clean, noisy = _noisy_sine(n=900, freq=0.4, noise=0.02)
+    for kwargs in ({}, {"height": 0.5}, {"distance": 30}, {"prominence": 0.5}):
+        fallback = sk._find_peaks_numpy(noisy, kwargs.get("height"), kwargs.get("distance"), kwargs.get("prominence"))
+        if sk.SCIPY_AVAILABLE:
+            reference = sk.find_peaks(noisy, **kwargs)
+            assert np.array_equal(fallback, reference), kwargs
+
+    strong = sk._find_peaks_numpy(noisy, None, None, 1.0)
+    assert len(strong) == 12  # 0.4 Hz over 30 s
+
+
+def test_find_peaks_plateau_and_edges():
+    x = np.array([0, 1, 2, 2, 2, 1, 0, 3, 0], dtype=float)
+    assert list(sk._find_peaks_numpy(x, None, None, None)) == [3, 7]
+    assert len(sk.find_peaks(np.array([1.0, 2.0]))) == 0
+
+
+def test_peak_prominences():
+    x = np.array([0, 5, 1, 3, 0], dtype=float)
+    assert np.allclose(sk.peak_prominences(x, np.array([1, 3])), [5, 2])
+
+
+# ═══════════════════════════════════════════════════════════════
+# RESAMPLING
+# ═══════════════════════════════════════════════════════════════
+
+def test_resample_uniform_irregular_times():
+    rng = np.random.default_rng(1)
+    t = np.sort(rng.uniform(0, 5, 120))
+    x = np.stack([2 * t + 1, -t], axis=1)
+
+    t_u, x_u = sk.resample_uniform(t, x, fs=20.0)
+    assert np.allclose(np.diff(t_u), 0.05)
+    assert t_u[0] == t[0] and t_u[-1] <= t[-1]
+    assert np.allclose(x_u[:, 0], 2 * t_u + 1)
+    assert np.allclose(x_u[:, 1], -t_u)
+
+
+def test_resample_drops_duplicate_timestamps():
+    t = np.array([0.0, 0.1, 0.1, 0.2, 0.3])
+    x = np.array([0.0, 1.0, 5.0, 2.0, 3.0])
+    t_u, x_u = sk.resample_uniform(t, x, fs=10.0)
+    assert np.allclose(x_u, [0.0, 1.0, 2.0, 3.0])
+
+
+# ═══════════════════════════════════════════════════════════════
+# MICRO-BENCHMARKS
+# ═══════════════════════════════════════════════════════════════
+
+def run_benchmarks(repeat: int = 200):
+    """Time each kernel on a 10 s / 30 fps clip with 66 channels (33 landmarks x,y)"""
+    t, _, noisy = _noisy_sine(n=300, channels=66)
+    irregular_t = np.sort(np.random.default_rng(2).uniform(0, 10, 300))
+    single = noisy[:, 0]
+
+    cases = [
+        ("lowpass_filter (scipy)" if sk.SCIPY_AVAILABLE else "lowpass_filter",
+         lambda: sk.lowpass_filter(noisy, 6.0, 30.0)),
+        ("lowpass_filter (numpy fallback)", lambda: sk._lowpass_numpy(noisy, 6.0, 30.0, 2)),
+        ("differentiate (irregular t)", lambda: sk.differentiate(noisy, t=irregular_t)),
+        ("find_peaks" + (" (scipy)" if sk.SCIPY_AVAILABLE else ""),
+         lambda: sk.find_peaks(single, prominence=0.5)),
+        ("find_peaks (numpy fallback)", lambda: sk._find_peaks_numpy(single, None, None, 0.5)),
+        ("resample_uniform", lambda: sk.resample_uniform(irregular_t, noisy, fs=30.0)),
+    ]
+
+    print("\n" + "=" * 60)
+    print(f"SIGNAL KERNEL BENCHMARKS (300 samples x 66 channels, {repeat} runs)")
+    print("=" * 60)
+    for name, fn in cases:
+        seconds = min(timeit.repeat(fn, number=repeat, repeat=3)) / repeat
+        print(f"   {name:<36} {seconds * 1e6:9.1f} µs")
+
+
+if __name__ == "__main__":
+    run_benchmarks()
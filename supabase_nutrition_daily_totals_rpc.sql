@@ -0,0 +1,57 @@
+-- ═══════════════════════════════════════════════════════════════
+-- NUTRITION DAILY TOTALS RPC
+-- Daily macro totals for a date range in ONE call
+-- (replaces per-meal meal_items queries in the AI coach context)
+-- ═══════════════════════════════════════════════════════════════
+
+-- 1. INDEXES (nutrition_logs(user_id, date) is covered by its UNIQUE constraint)
+CREATE INDEX IF NOT EXISTS idx_meals_nutrition_log_id ON meals(nutrition_log_id);
+CREATE INDEX IF NOT EXISTS idx_meal_items_meal_id ON meal_items(meal_id);
+
+-- 2. DAILY TOTALS FUNCTION
+-- One row per nutrition log in [p_start_date, p_end_date], summed server-side.
+-- Days without logged items are returned with zero totals.
+CREATE OR REPLACE FUNCTION get_nutrition_daily_totals(
+    p_user_id UUID,
+    p_start_date DATE,
+    p_end_date DATE
+) RETURNS TABLE (
+    date DATE,
+    target_calories FLOAT,
+    target_protein FLOAT,
+    target_carbs FLOAT,
+    target_fat FLOAT,
+    calories FLOAT,
+    protein FLOAT,
+    carbs FLOAT,
+    fat FLOAT,
+    meals_count INT,
+    items_count INT
+) AS $$
+    SELECT
+        l.date,
+        l.target_calories::FLOAT,
+        l.target_protein::FLOAT,
+        l.target_carbs::FLOAT,
+        l.target_fat::FLOAT,
+        COALESCE(SUM(i.calories), 0)::FLOAT,
+        COALESCE(SUM(i.protein), 0)::FLOAT,
+        COALESCE(SUM(i.carbs), 0)::FLOAT,
+        COALESCE(SUM(i.fat), 0)::FLOAT,
+        COUNT(DISTINCT m.id)::INT,
+        COUNT(i.id)::INT
+    FROM nutrition_logs l
+    LEFT JOIN meals m ON m.nutrition_log_id = l.id
+    LEFT JOIN meal_items i ON i.meal_id = m.id
+    WHERE l.user_id = p_user_id
+      AND l.date BETWEEN p_start_date AND p_end_date
+    GROUP BY l.id
+    ORDER BY l.date;
+$$ LANGUAGE sql STABLE;
+
+-- 3. GRANT PERMISSIONS (runs as the caller, so RLS on the tables still applies)
+GRANT EXECUTE ON FUNCTION get_nutrition_daily_totals(UUID, DATE, DATE) TO authenticated;
+GRANT EXECUTE ON FUNCTION get_nutrition_daily_totals(UUID, DATE, DATE) TO service_role;
+
+-- Done!
+-- Run this migration in Supabase SQL Editor
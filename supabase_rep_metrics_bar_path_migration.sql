@@ -0,0 +1,45 @@
+-- =====================================================
+-- REP METRICS: BAR PATH ANALYTICS
+-- =====================================================
+-- Per-rep bar path deviation, horizontal drift, sticking point and
+-- time under tension computed by the backend BarPathAnalyzer.
+--
+-- Distance columns use the unit of the analysis:
+--   calibrated tiers -> meters
+--   relative tier    -> percent of frame height
+
+ALTER TABLE rep_metrics
+ADD COLUMN IF NOT EXISTS bar_path_deviation NUMERIC(10,4),
+ADD COLUMN IF NOT EXISTS horizontal_drift NUMERIC(10,4),
+ADD COLUMN IF NOT EXISTS sticking_point_height NUMERIC(5,3), -- Fraction of concentric ROM (0 = bottom, 1 = top)
+ADD COLUMN IF NOT EXISTS sticking_point_time_seconds NUMERIC(10,3), -- Seconds after concentric start
+ADD COLUMN IF NOT EXISTS time_under_tension_seconds NUMERIC(10,3);
+
+-- =====================================================
+-- EXAMPLE workout_sets.velocity_metrics ADDITIONS
+-- =====================================================
+/*
+{
+  "bar_path": {
+    "source": "wrist_landmarks",
+    "unit": "relative",
+    "reps_detected": 5,
+    "summary": {
+      "avg_bar_path_deviation": 1.8,
+      "max_bar_path_deviation": 2.4,
+      "avg_horizontal_drift": -0.3,
+      "total_time_under_tension_s": 14.2,
+      "avg_sticking_point_height": 0.42
+    }
+  },
+  "rep_data": [
+    {
+      "rep_number": 1,
+      "bar_path_deviation": 1.6,
+      "horizontal_drift": -0.2,
+      "sticking_point_height": 0.40,
+      "time_under_tension_s": 2.8
+    }
+  ]
+}
+*/